@@ -0,0 +1,199 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Answers POST /v1/chat/completions with canned code, as a single response or
+as a Server-Sent Events stream, with optional latency before the first byte
+and between streamed chunks.
+
+Usage:
+    with FakeLLMServer(latency=0.2) as llm:
+        os.environ['LLM_BASE_URL'] = llm.base_url
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+DEFAULT_CODE = '''```python
+partners = odoo.search_read('res.partner', [('customer_rank', '>', 0)], fields=['name', 'country_id'], limit=100)
+result_data = partners
+print(f"Found {len(partners)} customers")
+for partner in partners[:5]:
+    print(f"- {partner['name']}")
+```'''
+
+# Canned answers picked by a keyword in the question; DEFAULT_CODE otherwise
+CANNED_CODE: Dict[str, str] = {
+    'order': '''```python
+orders = odoo.search_read('sale.order', [('state', 'in', ['sale', 'done'])], fields=['name', 'partner_id', 'amount_total'], limit=200)
+result_data = orders
+total = sum(order['amount_total'] for order in orders)
+print(f"{len(orders)} confirmed orders, total {total:.2f}")
+```''',
+    'invoice': '''```python
+invoices = odoo.search_read('account.move', [('move_type', '=', 'out_invoice'), ('state', '=', 'posted')], fields=['name', 'partner_id', 'amount_total', 'payment_state'], limit=200)
+result_data = invoices
+unpaid = [invoice for invoice in invoices if invoice['payment_state'] != 'paid']
+print(f"{len(invoices)} posted invoices, {len(unpaid)} not fully paid")
+```''',
+    'per country': '''```python
+groups = odoo.read_group('res.partner', [('customer_rank', '>', 0)], fields=['id:count'], groupby=['country_id'], orderby='country_id')
+result_data = groups
+for group in groups:
+    country = group['country_id'][1] if group['country_id'] else 'No country'
+    print(f"{country}: {group['country_id_count']} customers")
+```''',
+}
+
+
+def canned_answer(question: str, responses: Optional[Dict[str, str]] = None) -> str:
+    """
+    Pick the canned code for a question.
+
+    Args:
+        question: User message of the request
+        responses: Keyword to code mapping (defaults to CANNED_CODE)
+
+    Returns:
+        Code, wrapped in a markdown fence like real model output
+    """
+    lowered = question.lower()
+    for keyword, code in (responses or CANNED_CODE).items():
+        if keyword in lowered:
+            return code
+    return DEFAULT_CODE
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server: "FakeLLMServer" = self.server.owner
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        messages = body.get('messages', [])
+        question = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+        prompt_chars = sum(len(m.get('content') or '') for m in messages)
+        answer = canned_answer(question, server.responses)
+        usage = {
+            'prompt_tokens': prompt_chars // 4,
+            'completion_tokens': len(answer) // 4,
+            'total_tokens': (prompt_chars + len(answer)) // 4
+        }
+        server.record_request()
+        if server.latency:
+            time.sleep(server.latency)
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get('model', 'fake-model')
+        if not body.get('stream'):
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': answer},
+                    'finish_reason': 'stop'
+                }],
+                'usage': usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def chunk(choices, **extra):
+            event = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                     'model': model, 'choices': choices, **extra}
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+
+        size = max(1, server.chunk_chars)
+        for start in range(0, len(answer), size):
+            if server.chunk_delay and start:
+                time.sleep(server.chunk_delay)
+            chunk([{'index': 0, 'delta': {'content': answer[start:start + size]}, 'finish_reason': None}])
+        chunk([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (body.get('stream_options') or {}).get('include_usage'):
+            chunk([], usage=usage)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer:
+    """
+    Serve canned chat completions on a local port in a background thread.
+    """
+
+    def __init__(self, latency: float = 0.0, chunk_delay: float = 0.0, chunk_chars: int = 16,
+                 responses: Optional[Dict[str, str]] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            latency: Seconds before the first byte of every response
+            chunk_delay: Seconds between streamed chunks
+            chunk_chars: Characters of content per streamed chunk
+            responses: Keyword to code mapping (defaults to CANNED_CODE)
+            host: Interface to bind
+            port: Port to bind (0 = any free port)
+        """
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.responses = responses
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
\ No newline at end of file
@@ -0,0 +1,404 @@
+"""
+Local stand-in for an Odoo server's XML-RPC endpoints.
+
+Serves /xmlrpc/2/common and /xmlrpc/2/object from synthetic res.partner,
+sale.order and account.move records, so the client, the query pipeline and
+the API can be measured without a real Odoo instance.
+
+Usage:
+    with FakeOdooServer(records=10000, latency=0.005) as odoo:
+        client = OdooClient(odoo.url, odoo.db, odoo.username, odoo.password)
+"""
+
+import random
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+MODEL_DESCRIPTIONS = {
+    'res.partner': 'Contact',
+    'sale.order': 'Sales Order',
+    'account.move': 'Journal Entry',
+}
+
+_COUNTRIES = [[233, 'United States'], [75, 'France'], [21, 'Belgium'], [104, 'India'], [38, 'Canada']]
+
+
+def build_dataset(records: int, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generate synthetic records for each supported model.
+
+    Args:
+        records: Number of records per model
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        Records keyed by model name, ordered by id
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+
+    def stamp(days: float) -> str:
+        return (start + timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    partners = []
+    for i in range(1, records + 1):
+        partners.append({
+            'id': i,
+            'name': f"Partner {i}",
+            'email': f"partner{i}@example.com",
+            'country_id': rng.choice(_COUNTRIES) if rng.random() > 0.1 else False,
+            'customer_rank': rng.randint(0, 5),
+            'supplier_rank': rng.randint(0, 2),
+            'is_company': rng.random() > 0.6,
+            'create_date': stamp(rng.uniform(0, 365)),
+            'write_date': stamp(rng.uniform(0, 365)),
+        })
+
+    def partner_ref() -> list:
+        partner = partners[rng.randrange(len(partners))]
+        return [partner['id'], partner['name']]
+
+    orders = []
+    for i in range(1, records + 1):
+        orders.append({
+            'id': i,
+            'name': f"S{i:05d}",
+            'partner_id': partner_ref(),
+            'amount_total': round(rng.uniform(10, 5000), 2),
+            'state': rng.choice(['draft', 'sent', 'sale', 'sale', 'done', 'cancel']),
+            'date_order': stamp(rng.uniform(0, 365)),
+            'write_date': stamp(rng.uniform(0, 365)),
+        })
+
+    moves = []
+    for i in range(1, records + 1):
+        move_type = rng.choice(['out_invoice', 'out_invoice', 'in_invoice', 'out_refund'])
+        moves.append({
+            'id': i,
+            'name': f"INV/2024/{i:05d}",
+            'partner_id': partner_ref(),
+            'move_type': move_type,
+            'state': rng.choice(['draft', 'posted', 'posted', 'posted', 'cancel']),
+            'payment_state': rng.choice(['not_paid', 'paid', 'partial', 'in_payment']),
+            'amount_total': round(rng.uniform(10, 8000), 2),
+            'invoice_date': stamp(rng.uniform(0, 365))[:10],
+            'write_date': stamp(rng.uniform(0, 365)),
+        })
+
+    return {'res.partner': partners, 'sale.order': orders, 'account.move': moves}
+
+
+def _field_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, list):
+        return 'many2one'
+    if isinstance(value, str) and len(value) == 19 and value[4] == '-' and value[13] == ':':
+        return 'datetime'
+    if isinstance(value, str) and len(value) == 10 and value[4] == '-':
+        return 'date'
+    return 'char'
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if isinstance(value, list):
+        # many2one: compare the id, or the display name for text operators
+        value = value[1] if operator in ('like', 'ilike', 'not ilike', '=like', '=ilike') else value[0]
+    if operator in ('=', '=='):
+        return value == operand or (operand is False and not value)
+    if operator in ('!=', '<>'):
+        return value != operand
+    if operator == 'in':
+        return value in operand
+    if operator == 'not in':
+        return value not in operand
+    if operator in ('like', '=like'):
+        return bool(value) and str(operand).strip('%') in str(value)
+    if operator in ('ilike', '=ilike'):
+        return bool(value) and str(operand).strip('%').lower() in str(value).lower()
+    if operator == 'not ilike':
+        return not value or str(operand).strip('%').lower() not in str(value).lower()
+    if value is False or value is None:
+        return False
+    if operator == '>':
+        return value > operand
+    if operator == '<':
+        return value < operand
+    if operator == '>=':
+        return value >= operand
+    if operator == '<=':
+        return value <= operand
+    raise ValueError(f"Unsupported operator: {operator}")
+
+
+def matches(record: Dict[str, Any], domain: List) -> bool:
+    """
+    Evaluate an Odoo domain (prefix '&', '|', '!' and implicit AND) on a record.
+
+    Args:
+        record: Record dictionary
+        domain: Odoo domain
+
+    Returns:
+        True if the record matches
+    """
+    stack = []
+    for token in reversed(domain):
+        if token == '&':
+            stack.append(stack.pop() & stack.pop())
+        elif token == '|':
+            stack.append(stack.pop() | stack.pop())
+        elif token == '!':
+            stack.append(not stack.pop())
+        else:
+            field, operator, operand = token
+            stack.append(_compare(record.get(field, False), operator, operand))
+    return all(stack)
+
+
+def _sort(records: List[Dict[str, Any]], order: Optional[str]) -> List[Dict[str, Any]]:
+    if not order:
+        return records
+    for part in reversed([part.strip() for part in order.split(',') if part.strip()]):
+        field, _, direction = part.partition(' ')
+        records = sorted(
+            records,
+            key=lambda record: (record.get(field) is False, record.get(field) if record.get(field) is not False else 0),
+            reverse=direction.strip().lower() == 'desc'
+        )
+    return records
+
+
+class FakeOdoo:
+    """
+    In-memory implementation of the execute_kw methods the chatbot uses.
+    """
+
+    def __init__(self, records: int = 1000, seed: int = 42):
+        self.data = build_dataset(records, seed)
+        self.by_id = {model: {record['id']: record for record in rows} for model, rows in self.data.items()}
+
+    def _rows(self, model: str) -> List[Dict[str, Any]]:
+        if model == 'ir.model':
+            return [
+                {'id': i, 'model': name, 'name': description, 'transient': False}
+                for i, (name, description) in enumerate(MODEL_DESCRIPTIONS.items(), start=1)
+            ]
+        if model == 'ir.model.fields':
+            return [
+                {'id': i, 'model': name, 'name': field, 'write_date': '2024-01-01 00:00:00'}
+                for i, (name, field) in enumerate(
+                    ((name, field) for name in MODEL_DESCRIPTIONS for field in self.data[name][0]), start=1
+                )
+            ]
+        if model not in self.data:
+            raise ValueError(f"Object {model} doesn't exist")
+        return self.data[model]
+
+    @staticmethod
+    def _project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+        if not fields:
+            return dict(record)
+        projected = {'id': record['id']}
+        for field in fields:
+            projected[field] = record.get(field, False)
+        return projected
+
+    def search(self, model: str, domain: List, offset: int = 0, limit: Optional[int] = None,
+               order: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = [record for record in self._rows(model) if matches(record, domain)]
+        rows = _sort(rows, order)
+        return rows[offset:offset + limit] if limit else rows[offset:]
+
+    def fields_get(self, model: str, attributes: Optional[List[str]] = None) -> Dict[str, Any]:
+        sample = self._rows(model)[0]
+        fields = {}
+        for name, value in sample.items():
+            description = {
+                'type': _field_type(value),
+                'string': name.replace('_id', '').replace('_', ' ').title(),
+                'readonly': name in ('id', 'create_date', 'write_date'),
+            }
+            if description['type'] == 'many2one':
+                description['relation'] = 'res.country' if name == 'country_id' else 'res.partner'
+            if name == 'state':
+                description['type'] = 'selection'
+                description['selection'] = [
+                    [value, value.title()] for value in sorted({row['state'] for row in self._rows(model)})
+                ]
+            fields[name] = {key: value for key, value in description.items()
+                            if not attributes or key in attributes}
+        return fields
+
+    def read_group(self, model: str, domain: List, fields: List[str], groupby: List[str],
+                   offset: int = 0, limit: Optional[int] = None, orderby: Optional[str] = None,
+                   lazy: bool = True) -> List[Dict[str, Any]]:
+        groupby = [groupby] if isinstance(groupby, str) else list(groupby)
+        keys = groupby[:1] if lazy else groupby
+        groups: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        for record in self.search(model, domain):
+            key = []
+            for spec in keys:
+                field, _, interval = spec.partition(':')
+                value = record.get(field, False)
+                if interval and value:
+                    value = datetime.strptime(value[:10], '%Y-%m-%d').strftime(
+                        '%B %Y' if interval == 'month' else '%Y' if interval == 'year' else '%d %b %Y'
+                    )
+                key.append(tuple(value) if isinstance(value, list) else value)
+            groups.setdefault(tuple(key), []).append(record)
+
+        aggregates = []
+        for spec in fields:
+            # 'amount_total', 'amount_total:avg' or 'total:sum(amount_total)'
+            name, _, function = spec.partition(':')
+            field = name
+            if '(' in function:
+                function, _, field = function.rstrip(')').partition('(')
+            if field not in keys and field != 'id':
+                aggregates.append((name, field, function or 'sum'))
+
+        result = []
+        for key, rows in groups.items():
+            group = {spec: list(value) if isinstance(value, tuple) else value for spec, value in zip(keys, key)}
+            group['__count' if not lazy else f"{keys[0].split(':')[0]}_count"] = len(rows)
+            for name, field, function in aggregates:
+                values = [row[field] for row in rows if isinstance(row.get(field), (int, float))
+                          and not isinstance(row.get(field), bool)]
+                if function == 'avg':
+                    group[name] = sum(values) / len(values) if values else 0
+                elif function == 'max':
+                    group[name] = max(values) if values else False
+                elif function == 'min':
+                    group[name] = min(values) if values else False
+                elif function == 'count':
+                    group[name] = len(rows)
+                else:
+                    group[name] = sum(values)
+            group['__domain'] = [[spec.split(':')[0], '=', value[0] if isinstance(value, tuple) else value]
+                                 for spec, value in zip(keys, key)] + list(domain)
+            result.append(group)
+        if orderby:
+            result = _sort(result, orderby)
+        return result[offset:offset + limit] if limit else result[offset:]
+
+    def execute_kw(self, db: str, uid: int, password: str, model: str, method: str,
+                   args: List, kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Dispatch one /xmlrpc/2/object execute_kw call.
+        """
+        kwargs = kwargs or {}
+        if method == 'search_read':
+            domain = args[0] if args else kwargs.get('domain', [])
+            fields = args[1] if len(args) > 1 else kwargs.get('fields')
+            rows = self.search(model, domain, kwargs.get('offset', 0), kwargs.get('limit'), kwargs.get('order'))
+            return [self._project(record, fields) for record in rows]
+        if method == 'search':
+            rows = self.search(model, args[0], kwargs.get('offset', 0), kwargs.get('limit'), kwargs.get('order'))
+            return [record['id'] for record in rows]
+        if method == 'search_count':
+            return len(self.search(model, args[0] if args else kwargs.get('domain', [])))
+        if method == 'read':
+            ids = args[0] if isinstance(args[0], list) else [args[0]]
+            fields = args[1] if len(args) > 1 else kwargs.get('fields')
+            by_id = self.by_id.get(model, {})
+            return [self._project(by_id[record_id], fields) for record_id in ids if record_id in by_id]
+        if method == 'fields_get':
+            return self.fields_get(model, kwargs.get('attributes'))
+        if method == 'read_group':
+            domain = args[0] if args else kwargs.get('domain', [])
+            fields = args[1] if len(args) > 1 else kwargs.get('fields', [])
+            groupby = args[2] if len(args) > 2 else kwargs.get('groupby', [])
+            return self.read_group(model, domain, fields, groupby, kwargs.get('offset', 0),
+                                   kwargs.get('limit'), kwargs.get('orderby'), kwargs.get('lazy', True))
+        raise ValueError(f"Method {method} is not supported by the fake server")
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+    # Keep-alive, like Odoo behind werkzeug
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeOdooServer:
+    """
+    Serve a FakeOdoo on a local port in a background thread.
+    """
+
+    def __init__(self, records: int = 1000, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0,
+                 db: str = 'bench', username: str = 'admin', password: str = 'admin'):
+        """
+        Initialize the server.
+
+        Args:
+            records: Synthetic records per model
+            latency: Seconds added to every XML-RPC call, to mimic network and server time
+            host: Interface to bind
+            port: Port to bind (0 = any free port)
+            db: Database name accepted by authenticate
+            username: Login accepted by authenticate
+            password: Password accepted by authenticate
+        """
+        self.odoo = FakeOdoo(records)
+        self.latency = latency
+        self.db = db
+        self.username = username
+        self.password = password
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), requestHandler=_Handler, logRequests=False, allow_none=True)
+        self._server.register_function(self._authenticate, 'authenticate')
+        self._server.register_function(lambda: {'server_version': '17.0'}, 'version')
+        self._server.register_function(self._execute_kw, 'execute_kw')
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self) -> None:
+        with self._calls_lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _authenticate(self, db: str, login: str, password: str, user_agent_env: dict):
+        self._delay()
+        return 2 if (db, login, password) == (self.db, self.username, self.password) else False
+
+    def _execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        self._delay()
+        return self.odoo.execute_kw(db, uid, password, model, method, args, kwargs)
+
+    def start(self) -> "FakeOdooServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOdooServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""
+Shared setup for the offline benchmarks: fake Odoo and LLM servers, a
+throwaway chat database, an in-process client for the FastAPI app, and
+result summaries that can be compared between runs.
+
+The chatbot modules read their configuration from the environment at import
+time, so fake_stack() must be entered before anything from odoo_chatbot is
+imported. A .env file in the working directory still wins over these values
+(load_dotenv(override=True)); run benchmarks from a directory without one.
+"""
+
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterator, List
+
+from .fake_llm import FakeLLMServer
+from .fake_odoo import FakeOdooServer
+
+
+@contextmanager
+def fake_stack(records: int = 1000, odoo_latency: float = 0.0, llm_latency: float = 0.0,
+               llm_chunk_delay: float = 0.0, **env: str) -> Iterator[Dict[str, Any]]:
+    """
+    Start fake Odoo and LLM servers and point the chatbot configuration at them.
+
+    Args:
+        records: Records per fake Odoo model
+        odoo_latency: Seconds added to every fake Odoo call
+        llm_latency: Seconds before every fake LLM response
+        llm_chunk_delay: Seconds between streamed LLM chunks
+        **env: Extra environment variables, e.g. SANDBOX_ENABLED='1'
+
+    Yields:
+        Dictionary with the 'odoo' and 'llm' servers and the 'db_path' used
+    """
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeOdooServer(records=records, latency=odoo_latency) as odoo, \
+            FakeLLMServer(latency=llm_latency, chunk_delay=llm_chunk_delay) as llm:
+        db_path = os.path.join(directory, 'bench.db')
+        settings = {
+            'ODOO_URL': odoo.url,
+            'ODOO_DB': odoo.db,
+            'ODOO_USERNAME': odoo.username,
+            'ODOO_PASSWORD': odoo.password,
+            'LLM_BASE_URL': llm.base_url,
+            'OPENROUTER_API_KEY': 'benchmark',
+            'CHATBOT_DB_PATH': db_path,
+            'SANDBOX_ENABLED': '0',
+            # Off by default in production; benchmark answers carry their XML-RPC call traces
+            'ODOO_TRACE': '1',
+            # Keep the fake server's models out of the real schema cache
+            'SCHEMA_CACHE_PATH': os.path.join(directory, 'odoo_schema.json'),
+            **env
+        }
+        previous = {key: os.environ.get(key) for key in settings}
+        os.environ.update(settings)
+        try:
+            yield {'odoo': odoo, 'llm': llm, 'db_path': db_path}
+        finally:
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+
+def load_app():
+    """
+    Import the FastAPI app, or return None if FastAPI is not installed.
+
+    Returns:
+        The app, or None
+    """
+    try:
+        from odoo_chatbot.api.main import app
+    except ImportError:
+        return None
+    return app
+
+
+@asynccontextmanager
+async def asgi_client(app, base_url: str = 'http://bench'):
+    """
+    Run the app's lifespan and yield an httpx client that calls it in-process.
+
+    Args:
+        app: The FastAPI app
+        base_url: Base URL for relative request paths
+    """
+    import httpx
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=None) as client:
+            yield client
+
+
+def time_calls(fn, repeats: int, warmup: int = 1) -> List[float]:
+    """
+    Time repeated calls of fn.
+
+    Args:
+        fn: Function without arguments
+        repeats: Timed calls
+        warmup: Untimed calls made first
+
+    Returns:
+        Milliseconds per timed call
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(timings_ms: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies.
+
+    Args:
+        timings_ms: Latencies in milliseconds
+
+    Returns:
+        Dictionary with n, mean, median, p95, p99, min and max (ms)
+    """
+    ordered = sorted(timings_ms)
+    if not ordered:
+        return {'n': 0}
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered), 4),
+        'median_ms': round(statistics.median(ordered), 4),
+        'p95_ms': round(percentile(ordered, 0.95), 4),
+        'p99_ms': round(percentile(ordered, 0.99), 4),
+        'min_ms': round(ordered[0], 4),
+        'max_ms': round(ordered[-1], 4),
+    }
+
+
+def run_meta(**extra: Any) -> Dict[str, Any]:
+    """Describe the machine and settings a run was made with."""
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        **extra
+    }
+
+
+def write_results(path: str, results: List[Dict[str, Any]], meta: Dict[str, Any]) -> None:
+    """Write results as {"meta": ..., "results": [...]} JSON."""
+    with open(path, 'w') as output:
+        json.dump({'meta': meta, 'results': results}, output, indent=2)
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, metric: str = 'median_ms',
+            tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compare results with a previous run, matched by their 'name'.
+
+    Args:
+        results: Results of this run
+        baseline_path: JSON file written by write_results()
+        metric: Latency key to compare
+        tolerance: Allowed slowdown as a fraction, e.g. 0.2 = 20%
+
+    Returns:
+        One row per benchmark present in both runs, with 'regressed' set when
+        this run is slower than the baseline by more than the tolerance
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {row['name']: row for row in json.load(baseline_file).get('results', [])}
+    rows = []
+    for row in results:
+        before = baseline.get(row['name'], {}).get(metric)
+        after = row.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        rows.append({
+            'name': row['name'],
+            'baseline': before,
+            'current': after,
+            'change': round(change, 4),
+            'regressed': change > tolerance
+        })
+    return rows
\ No newline at end of file
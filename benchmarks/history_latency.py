@@ -0,0 +1,193 @@
+"""
+Benchmark /session/{id}/history query latency against chat_messages table size.
+
+Builds throwaway databases with the original schema (no indexes, rollback
+journal), measures the original full-history query, then migrates them in
+place with init_database() and measures the keyset query the endpoint now
+runs: the whole history, the latest page and the page before it.
+
+Usage:
+    python -m benchmarks.history_latency --sizes 1000 10000 100000 --json results.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from odoo_chatbot.api import database
+
+# The history query before keyset paging
+LEGACY_HISTORY_QUERY = (
+    "SELECT question, answer, created_at FROM chat_messages "
+    "WHERE session_id = ? ORDER BY created_at"
+)
+
+LEGACY_SCHEMA = [
+    """
+    CREATE TABLE chat_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE chat_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
+    )
+    """
+]
+
+
+def build_legacy_database(path: str, total_messages: int, messages_per_session: int) -> List[str]:
+    """Create a database with the pre-index schema and synthetic messages."""
+    connection = sqlite3.connect(path)
+    for statement in LEGACY_SCHEMA:
+        connection.execute(statement)
+
+    sessions = [str(uuid.uuid4()) for _ in range(max(1, total_messages // messages_per_session))]
+    connection.executemany(
+        "INSERT INTO chat_sessions (session_id) VALUES (?)",
+        [(session_id,) for session_id in sessions]
+    )
+    answer = "📝 Generated Code:\n```python\nresult_data = []\n```\n" + "x" * 400
+    rows = (
+        (random.choice(sessions), f"question {i}", answer, f"2024-01-01 00:00:{i % 60:02d}")
+        for i in range(total_messages)
+    )
+    connection.executemany(
+        "INSERT INTO chat_messages (session_id, question, answer, created_at) VALUES (?, ?, ?, ?)",
+        rows
+    )
+    connection.commit()
+    connection.close()
+    return sessions
+
+
+def time_history(connection: sqlite3.Connection, sessions: List[str], repeats: int,
+                 build_query: Callable[[sqlite3.Connection, str], Tuple[str, List]]) -> Dict[str, float]:
+    """Time a history query for random sessions."""
+    timings = []
+    for _ in range(repeats):
+        session_id = random.choice(sessions)
+        query, params = build_query(connection, session_id)
+        start = time.perf_counter()
+        connection.execute(query, params).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] if len(timings) > 1 else timings[0],
+    }
+
+
+def legacy_query(connection: sqlite3.Connection, session_id: str) -> Tuple[str, List]:
+    return LEGACY_HISTORY_QUERY, [session_id]
+
+
+def full_query(connection: sqlite3.Connection, session_id: str) -> Tuple[str, List]:
+    query, params, _ = database.history_query(session_id)
+    return query, params
+
+
+def latest_page_query(page_size: int) -> Callable[[sqlite3.Connection, str], Tuple[str, List]]:
+    def build(connection: sqlite3.Connection, session_id: str) -> Tuple[str, List]:
+        query, params, _ = database.history_query(session_id, limit=page_size)
+        return query, params
+    return build
+
+
+def keyset_page_query(page_size: int) -> Callable[[sqlite3.Connection, str], Tuple[str, List]]:
+    def build(connection: sqlite3.Connection, session_id: str) -> Tuple[str, List]:
+        # The page a client asks for next: before the oldest id of the latest page
+        query, params, _ = database.history_query(session_id, limit=page_size)
+        rows = connection.execute(query, params).fetchall()[:page_size]
+        before_id = rows[-1]['id'] if rows else None
+        query, params, _ = database.history_query(session_id, limit=page_size, before_id=before_id)
+        return query, params
+    return build
+
+
+def run(sizes: List[int], messages_per_session: int = 20, repeats: int = 200,
+        page_size: int = 10) -> List[Dict[str, Any]]:
+    """
+    Measure history latency before and after migration for each table size.
+
+    Returns:
+        One result dictionary per size
+    """
+    results = []
+    original_path = database.DB_PATH
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"history_{size}.db")
+            sessions = build_legacy_database(path, size, messages_per_session)
+
+            legacy = sqlite3.connect(path)
+            before = time_history(legacy, sessions, repeats, legacy_query)
+            legacy.close()
+
+            database.DB_PATH = path
+            try:
+                database.init_database()
+                tuned = database.get_db_connection()
+                after = time_history(tuned, sessions, repeats, full_query)
+                latest = time_history(tuned, sessions, repeats, latest_page_query(page_size))
+                keyset = time_history(tuned, sessions, repeats, keyset_page_query(page_size))
+                database.close_db_connection()
+            finally:
+                database.DB_PATH = original_path
+
+            results.append({
+                'benchmark': 'history_latency',
+                'messages': size,
+                'messages_per_session': messages_per_session,
+                'page_size': page_size,
+                'legacy_median_ms': round(before['median_ms'], 4),
+                'legacy_p95_ms': round(before['p95_ms'], 4),
+                'tuned_median_ms': round(after['median_ms'], 4),
+                'tuned_p95_ms': round(after['p95_ms'], 4),
+                'latest_page_median_ms': round(latest['median_ms'], 4),
+                'latest_page_p95_ms': round(latest['p95_ms'], 4),
+                'keyset_page_median_ms': round(keyset['median_ms'], 4),
+                'keyset_page_p95_ms': round(keyset['p95_ms'], 4),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--messages-per-session', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.messages_per_session, args.repeats, args.page_size)
+
+    print(f"{'messages':>10} {'legacy median':>14} {'legacy p95':>11} {'tuned median':>13} {'tuned p95':>10} "
+          f"{'latest page':>12} {'keyset page':>12}")
+    for row in results:
+        print(f"{row['messages']:>10} {row['legacy_median_ms']:>12.3f}ms {row['legacy_p95_ms']:>9.3f}ms "
+              f"{row['tuned_median_ms']:>11.3f}ms {row['tuned_p95_ms']:>8.3f}ms "
+              f"{row['latest_page_median_ms']:>10.3f}ms {row['keyset_page_median_ms']:>10.3f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Concurrent load test of the FastAPI app against local fake Odoo and LLM servers.
+
+Drives a weighted mix of /new-session, /chat and /session/{id}/history,
+either as a fixed number of virtual users sending back to back (closed loop,
+--concurrency) or as Poisson arrivals at a fixed rate (open loop, --rate).
+Open-loop latency is measured from each request's scheduled arrival, so time
+spent waiting for a free slot counts.
+
+Reports throughput, p50/p95/p99 latency, error rate and SQLite contention per
+endpoint. SQLite contention is the time each request spent in db_read /
+db_write stages (including busy-timeout waits for the write lock) compared
+with the same endpoint run alone, plus "database is locked" failures.
+
+The app runs in-process by default; --url targets a running server instead
+(no per-request database timings then).
+
+Usage:
+    python -m benchmarks.load --concurrency 32 --duration 30 --llm-latency 1.5 --odoo-latency 0.05
+    python -m benchmarks.load --rate 20 --duration 60 --mix chat=6,history=3,new-session=1 --json load.json
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+from .harness import asgi_client, fake_stack, load_app, percentile, run_meta, summarize, write_results
+
+DEFAULT_MIX = 'chat=6,history=3,new-session=1'
+ENDPOINTS = ('new-session', 'chat', 'history')
+QUESTIONS = [
+    'List our customers',
+    'Show confirmed sale orders',
+    'Which invoices are unpaid?',
+    'How many customers do we have per country?',
+]
+DB_STAGES = ('db_read', 'db_write')
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse 'chat=6,history=3,new-session=1' into endpoint weights.
+
+    Raises:
+        ValueError: On unknown endpoints or if no weight is positive
+    """
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    if not any(weight > 0 for weight in weights.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return weights
+
+
+class EndpointStats:
+    """
+    Outcomes of every request sent to one endpoint.
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.db_ms: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+        self.rejected = 0
+        self.sqlite_locked = 0
+
+    def record(self, latency_ms: float, status: int, body: str, db_ms: Optional[float]) -> None:
+        self.latencies.append(latency_ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if db_ms is not None:
+            self.db_ms.append(db_ms)
+        if status >= 400:
+            self.errors += 1
+        if status == 503:
+            self.rejected += 1
+        lowered = body.lower()
+        if status >= 500 and ('database is locked' in lowered or 'database is busy' in lowered):
+            self.sqlite_locked += 1
+
+
+class LoadTest:
+    """
+    Send a weighted mix of requests through an httpx.AsyncClient and record the outcomes.
+    """
+
+    def __init__(self, client, mix: Dict[str, float], use_code_cache: bool = False,
+                 track_db: bool = True, seed: int = 42):
+        """
+        Initialize the load test.
+
+        Args:
+            client: httpx.AsyncClient for the app
+            mix: Endpoint weights from parse_mix()
+            use_code_cache: Let /chat reuse cached generated code
+            track_db: Record per-request database stage time (in-process only)
+            seed: Random seed for the mix, questions and arrivals
+        """
+        self.client = client
+        self.endpoints = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.endpoints]
+        self.use_code_cache = use_code_cache
+        self.track_db = track_db
+        self.random = random.Random(seed)
+        self.sessions: List[str] = []
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in ENDPOINTS}
+        self.baseline_db_ms: Dict[str, float] = {}
+
+    async def _send(self, endpoint: str):
+        if endpoint == 'new-session':
+            return await self.client.post('/new-session')
+        session_id = self.random.choice(self.sessions)
+        if endpoint == 'chat':
+            return await self.client.post('/chat', json={
+                'session_id': session_id,
+                'question': self.random.choice(QUESTIONS),
+                'use_code_cache': self.use_code_cache,
+                'include_timings': False
+            })
+        return await self.client.get(f'/session/{session_id}/history', params={'limit': 50})
+
+    async def request(self, endpoint: str, started: Optional[float] = None,
+                      stats: Optional[Dict[str, EndpointStats]] = None) -> None:
+        """
+        Send one request and record it.
+
+        Args:
+            endpoint: 'new-session', 'chat' or 'history'
+            started: perf_counter() the latency is measured from (defaults to now)
+            stats: Where to record (defaults to self.stats)
+        """
+        from odoo_chatbot.core.metrics import StageTimings
+
+        timings = StageTimings() if self.track_db else None
+        started = started if started is not None else time.perf_counter()
+        try:
+            with timings.active() if timings else nullcontext():
+                response = await self._send(endpoint)
+            status, body = response.status_code, response.text
+        except Exception as e:
+            status, body = 599, str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        db_ms = None
+        if timings is not None:
+            db_ms = sum(value for kind, label, value in timings.events
+                        if kind == 'duration' and label in DB_STAGES) * 1000
+        if endpoint == 'new-session' and status == 200:
+            self.sessions.append(response.json()['session_id'])
+        (stats or self.stats)[endpoint].record(latency_ms, status, body, db_ms)
+
+    def pick(self) -> str:
+        return self.random.choices(self.endpoints, self.weights)[0]
+
+    async def setup(self, sessions: int, calibration: int) -> None:
+        """
+        Create the initial sessions, then run each endpoint alone to get its
+        uncontended database time.
+
+        Args:
+            sessions: Sessions to create before the test
+            calibration: Sequential requests per endpoint in the mix
+        """
+        scratch = {name: EndpointStats() for name in ENDPOINTS}
+        for _ in range(max(1, sessions)):
+            await self.request('new-session', stats=scratch)
+        if not self.sessions:
+            raise RuntimeError(f"Could not create sessions: {scratch['new-session'].statuses}")
+        for endpoint in self.endpoints:
+            for _ in range(calibration):
+                await self.request(endpoint, stats=scratch)
+            if scratch[endpoint].db_ms:
+                self.baseline_db_ms[endpoint] = statistics.median(scratch[endpoint].db_ms)
+
+    async def closed_loop(self, concurrency: int, duration: float, max_requests: Optional[int]) -> float:
+        """
+        Run virtual users that each send the next request as soon as the last returns.
+
+        Returns:
+            Elapsed seconds
+        """
+        deadline = time.perf_counter() + duration
+        sent = 0
+
+        async def user():
+            nonlocal sent
+            while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+                sent += 1
+                await self.request(self.pick())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(max(1, concurrency))))
+        return time.perf_counter() - start
+
+    async def open_loop(self, rate: float, duration: float, max_in_flight: int,
+                        max_requests: Optional[int]) -> float:
+        """
+        Start requests at Poisson-distributed arrival times, at most max_in_flight at once.
+
+        Returns:
+            Elapsed seconds
+        """
+        slots = asyncio.Semaphore(max(1, max_in_flight))
+        tasks = []
+
+        async def arrive(endpoint, scheduled):
+            async with slots:
+                await self.request(endpoint, started=scheduled)
+
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival < start + duration and (max_requests is None or len(tasks) < max_requests):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(arrive(self.pick(), next_arrival)))
+            next_arrival += self.random.expovariate(rate)
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> List[Dict[str, Any]]:
+        """
+        Summarize the run per endpoint, plus an 'all' row.
+
+        Args:
+            elapsed: Seconds the load phase took
+
+        Returns:
+            One row per endpoint that received requests
+        """
+        rows = []
+        everything = EndpointStats()
+        for endpoint in ENDPOINTS:
+            stats = self.stats[endpoint]
+            if stats.latencies:
+                rows.append(self._row(endpoint, stats, elapsed))
+            everything.latencies += stats.latencies
+            everything.db_ms += stats.db_ms
+            everything.errors += stats.errors
+            everything.rejected += stats.rejected
+            everything.sqlite_locked += stats.sqlite_locked
+            for status, count in stats.statuses.items():
+                everything.statuses[status] = everything.statuses.get(status, 0) + count
+        rows.append(self._row('all', everything, elapsed))
+        return rows
+
+    def _row(self, endpoint: str, stats: EndpointStats, elapsed: float) -> Dict[str, Any]:
+        requests = len(stats.latencies)
+        row = {
+            'name': f"load[{endpoint}]",
+            'endpoint': endpoint,
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(stats.errors / requests, 4) if requests else 0.0,
+            'rejected': stats.rejected,
+            'sqlite_locked': stats.sqlite_locked,
+            'statuses': {str(status): count for status, count in sorted(stats.statuses.items())},
+            **summarize(stats.latencies)
+        }
+        if stats.db_ms:
+            ordered = sorted(stats.db_ms)
+            row['db_p50_ms'] = round(statistics.median(ordered), 3)
+            row['db_p95_ms'] = round(percentile(ordered, 0.95), 3)
+            baseline = self.baseline_db_ms.get(endpoint)
+            if baseline:
+                row['db_baseline_ms'] = round(baseline, 3)
+                row['db_contention_ms'] = round(max(0.0, row['db_p50_ms'] - baseline), 3)
+        return row
+
+
+async def _run(client, args, track_db: bool) -> Dict[str, Any]:
+    test = LoadTest(client, parse_mix(args.mix), args.use_code_cache, track_db, args.seed)
+    await test.setup(args.sessions, args.calibration)
+    if args.rate:
+        elapsed = await test.open_loop(args.rate, args.duration, args.concurrency, args.requests)
+    else:
+        elapsed = await test.closed_loop(args.concurrency, args.duration, args.requests)
+    try:
+        pipeline = (await client.get('/pipeline/stats')).json()
+    except Exception:
+        pipeline = None
+    return {'elapsed_s': round(elapsed, 3), 'results': test.report(elapsed), 'pipeline': pipeline}
+
+
+def run(args) -> Dict[str, Any]:
+    """
+    Run the load test described by the parsed command line.
+
+    Returns:
+        Dictionary with 'elapsed_s', per-endpoint 'results' and the app's
+        final '/pipeline/stats'
+    """
+    if args.url:
+        import httpx
+
+        async def remote():
+            async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+                return await _run(client, args, track_db=False)
+        return asyncio.run(remote())
+
+    env = {'CODE_CACHE_ENABLED': '1' if args.use_code_cache else '0'}
+    with fake_stack(records=args.records, odoo_latency=args.odoo_latency,
+                    llm_latency=args.llm_latency, llm_chunk_delay=0.0, **env):
+        app = load_app()
+        if app is None:
+            raise SystemExit("fastapi is not installed; install requirements.txt or use --url")
+
+        async def local():
+            async with asgi_client(app) as client:
+                return await _run(client, args, track_db=True)
+        return asyncio.run(local())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Endpoint weights (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="Virtual users, or the in-flight cap with --rate")
+    parser.add_argument('--rate', type=float, help="Arrivals per second (open loop)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds of load")
+    parser.add_argument('--requests', type=int, help="Stop after this many requests")
+    parser.add_argument('--sessions', type=int, default=20, help="Sessions created before the test")
+    parser.add_argument('--calibration', type=int, default=5,
+                        help="Requests per endpoint run alone for the uncontended baseline")
+    parser.add_argument('--records', type=int, default=1000, help="Records per fake Odoo model")
+    parser.add_argument('--odoo-latency', type=float, default=0.02, help="Seconds added to every Odoo call")
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="Seconds added to every LLM call")
+    parser.add_argument('--use-code-cache', action='store_true', help="Let /chat reuse generated code")
+    parser.add_argument('--url', help="Load a running server instead of the in-process app")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    outcome = run(args)
+
+    print(f"{'endpoint':<12} {'requests':>8} {'rps':>8} {'errors':>7} {'p50':>10} {'p95':>10} {'p99':>10} "
+          f"{'db p50':>9} {'db wait':>9} {'locked':>6}")
+    for row in outcome['results']:
+        db_p50 = f"{row['db_p50_ms']:.2f}ms" if 'db_p50_ms' in row else '-'
+        db_wait = f"{row['db_contention_ms']:.2f}ms" if 'db_contention_ms' in row else '-'
+        print(f"{row['endpoint']:<12} {row['requests']:>8} {row['throughput_rps']:>8.2f} "
+              f"{row['error_rate']:>7.1%} {row['median_ms']:>8.1f}ms {row['p95_ms']:>8.1f}ms "
+              f"{row['p99_ms']:>8.1f}ms {db_p50:>9} {db_wait:>9} {row['sqlite_locked']:>6}")
+
+    if args.json:
+        meta = run_meta(**{key: value for key, value in vars(args).items() if key != 'json'})
+        meta['elapsed_s'] = outcome['elapsed_s']
+        meta['pipeline'] = outcome['pipeline']
+        write_results(args.json, outcome['results'], meta)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
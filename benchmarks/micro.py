@@ -0,0 +1,193 @@
+"""
+Offline micro-benchmarks of the query path against local fake Odoo and LLM servers.
+
+Measures OdooClient.search_read, OdooClient.execute_code,
+clean_generated_code, the /chat handler end to end and the history endpoint,
+without network access or API keys. /chat and history need FastAPI installed
+and are reported as skipped otherwise.
+
+Usage:
+    python -m benchmarks.micro --records 5000 --json micro.json
+    python -m benchmarks.micro --compare micro.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from typing import Any, Dict, List
+
+from .fake_llm import CANNED_CODE, DEFAULT_CODE
+from .harness import (asgi_client, compare, fake_stack, load_app, run_meta, summarize, time_calls,
+                      write_results)
+
+SEARCH_READ_CASES = [
+    ('res.partner', [('customer_rank', '>', 0)], ['name', 'email', 'country_id'], 80),
+    ('res.partner', [], ['name', 'email', 'country_id', 'customer_rank'], 0),
+    ('sale.order', [('state', 'in', ['sale', 'done'])], ['name', 'partner_id', 'amount_total'], 500),
+    ('account.move', [('move_type', '=', 'out_invoice'), ('state', '=', 'posted')],
+     ['name', 'partner_id', 'amount_total', 'payment_state'], 0),
+]
+
+
+def bench_search_read(repeats: int) -> List[Dict[str, Any]]:
+    from odoo_chatbot.core.client import OdooClient
+
+    odoo = OdooClient()
+    results = []
+    for model, domain, fields, limit in SEARCH_READ_CASES:
+        records = len(odoo.search_read(model, domain, fields, limit=limit))
+        timings = time_calls(lambda: odoo.search_read(model, domain, fields, limit=limit), repeats)
+        results.append({
+            'name': f"search_read[{model},limit={limit or 'all'}]",
+            'records': records,
+            **summarize(timings)
+        })
+    return results
+
+
+def bench_execute_code(repeats: int) -> List[Dict[str, Any]]:
+    from odoo_chatbot.core.client import OdooClient
+    from odoo_chatbot.core.query_processor import clean_generated_code
+
+    odoo = OdooClient()
+    results = []
+    for label, answer in [('customers', DEFAULT_CODE)] + sorted(CANNED_CODE.items()):
+        code = clean_generated_code(answer)
+        outcome = odoo.execute_code(code)
+        if outcome.get('error'):
+            raise RuntimeError(f"Benchmark code failed: {outcome['error']}")
+        timings = time_calls(lambda: odoo.execute_code(code), repeats)
+        results.append({'name': f"execute_code[{label}]", **summarize(timings)})
+    return results
+
+
+def bench_clean_generated_code(repeats: int) -> List[Dict[str, Any]]:
+    from odoo_chatbot.core.query_processor import clean_generated_code
+
+    answers = [DEFAULT_CODE] + list(CANNED_CODE.values())
+    large = DEFAULT_CODE[:-3] + "\n".join(f"print({i})" for i in range(2000)) + "\n```"
+
+    def clean_all():
+        for answer in answers:
+            clean_generated_code(answer)
+
+    return [
+        {'name': 'clean_generated_code[canned]', **summarize(time_calls(clean_all, repeats * 10))},
+        {'name': 'clean_generated_code[2000 lines]',
+         **summarize(time_calls(lambda: clean_generated_code(large), repeats * 10))},
+    ]
+
+
+async def _bench_api(app, repeats: int, history_messages: int) -> List[Dict[str, Any]]:
+    from odoo_chatbot.api.database import get_db_connection
+
+    results = []
+    async with asgi_client(app) as client:
+        session_id = (await client.post('/new-session')).json()['session_id']
+        questions = ['List our customers', 'Show confirmed sale orders', 'Which invoices are unpaid?']
+
+        async def chat(question):
+            response = await client.post('/chat', json={
+                'session_id': session_id, 'question': question, 'use_code_cache': False
+            })
+            response.raise_for_status()
+
+        await chat(questions[0])
+        timings = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            await chat(questions[i % len(questions)])
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append({'name': 'chat[end_to_end]', **summarize(timings)})
+
+        # A long session for the history endpoint
+        history_session = (await client.post('/new-session')).json()['session_id']
+        connection = get_db_connection()
+        with connection:
+            connection.executemany(
+                "INSERT INTO chat_messages (session_id, question, answer, message_uid, code, stdout, "
+                "record_count, success) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                [(history_session, f"question {i}", "answer " + "x" * 400, uuid.uuid4().hex,
+                  "result_data = []", "Found 0 records", 0) for i in range(history_messages)]
+            )
+
+        for label, params in (('all', {}), ('limit=50', {'limit': 50})):
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                response = await client.get(f'/session/{history_session}/history', params=params)
+                response.raise_for_status()
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append({
+                'name': f"history[{history_messages} messages,{label}]",
+                **summarize(timings)
+            })
+    return results
+
+
+def run(records: int = 1000, repeats: int = 50, history_messages: int = 500,
+        odoo_latency: float = 0.0, llm_latency: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    Run every micro-benchmark against freshly started fake servers.
+
+    Returns:
+        One result dictionary per benchmark, each with a unique 'name'
+    """
+    with fake_stack(records=records, odoo_latency=odoo_latency, llm_latency=llm_latency,
+                    CODE_CACHE_ENABLED='0', ODOO_CACHE='0', CHAT_WRITE_BEHIND='0'):
+        results = bench_search_read(repeats)
+        results += bench_execute_code(repeats)
+        results += bench_clean_generated_code(repeats)
+        app = load_app()
+        if app is None:
+            results += [
+                {'name': 'chat[end_to_end]', 'skipped': 'fastapi is not installed'},
+                {'name': f"history[{history_messages} messages,all]", 'skipped': 'fastapi is not installed'},
+            ]
+        else:
+            results += asyncio.run(_bench_api(app, repeats, history_messages))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1000, help="Records per fake Odoo model")
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--history-messages', type=int, default=500)
+    parser.add_argument('--odoo-latency', type=float, default=0.0, help="Seconds added to every Odoo call")
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Seconds added to every LLM call")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Compare with results written earlier with --json")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed median slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    results = run(args.records, args.repeats, args.history_messages, args.odoo_latency, args.llm_latency)
+
+    print(f"{'benchmark':<45} {'median':>10} {'p95':>10} {'p99':>10}")
+    for row in results:
+        if 'skipped' in row:
+            print(f"{row['name']:<45} skipped: {row['skipped']}")
+            continue
+        print(f"{row['name']:<45} {row['median_ms']:>8.3f}ms {row['p95_ms']:>8.3f}ms {row['p99_ms']:>8.3f}ms")
+
+    if args.json:
+        write_results(args.json, results, run_meta(
+            records=args.records, repeats=args.repeats, history_messages=args.history_messages,
+            odoo_latency=args.odoo_latency, llm_latency=args.llm_latency
+        ))
+
+    if args.compare:
+        rows = compare(results, args.compare, tolerance=args.tolerance)
+        print(f"\n{'benchmark':<45} {'baseline':>10} {'current':>10} {'change':>8}")
+        for row in rows:
+            flag = '  REGRESSED' if row['regressed'] else ''
+            print(f"{row['name']:<45} {row['baseline']:>8.3f}ms {row['current']:>8.3f}ms "
+                  f"{row['change']:>+7.1%}{flag}")
+        if any(row['regressed'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
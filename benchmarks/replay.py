@@ -0,0 +1,191 @@
+"""
+Record real question mixes into a cassette, then replay them offline.
+
+record runs each question through execute_odoo_query against the configured
+Odoo and LLM (ODOO_* and OPENROUTER_API_KEY from the environment) and appends
+every LLM completion and XML-RPC response to the cassette. replay answers the
+same questions from the cassette only, with the recorded latencies divided
+by --speed, and reports per-question latency and stage timings.
+
+Questions come from chat_messages in a chatbot.db (--db) or from a text file
+with one question per line (--questions). The generated-code cache is
+bypassed so every question reaches the LLM.
+
+Usage:
+    python -m benchmarks.replay record --db chatbot.db --cassette prod.cassette.jsonl
+    python -m benchmarks.replay replay --db chatbot.db --cassette prod.cassette.jsonl --speed 10 --json replay.json
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .harness import run_meta, summarize, write_results
+
+# Placeholders so OdooClient can be built when replaying without credentials
+REPLAY_DEFAULTS = {
+    'ODOO_URL': 'http://cassette.invalid',
+    'ODOO_DB': 'cassette',
+    'ODOO_USERNAME': 'cassette',
+    'ODOO_PASSWORD': 'cassette',
+}
+
+
+def load_questions(db_path: Optional[str] = None, questions_path: Optional[str] = None,
+                   session_id: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, Optional[float]]]:
+    """
+    Load questions in the order they were asked.
+
+    Args:
+        db_path: chatbot.db to read chat_messages from (opened read-only)
+        questions_path: Text file with one question per line
+        session_id: Only questions of this session (db only)
+        limit: Keep the first this many questions
+
+    Returns:
+        List of (question, seconds since the first question or None)
+    """
+    if questions_path:
+        with open(questions_path, encoding='utf-8') as questions_file:
+            rows = [(line.strip(), None) for line in questions_file if line.strip()]
+        return rows[:limit] if limit else rows
+
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    query = "SELECT question, created_at FROM chat_messages"
+    params: tuple = ()
+    if session_id:
+        query += " WHERE session_id = ?"
+        params = (session_id,)
+    query += " ORDER BY created_at, id"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    rows = connection.execute(query, params).fetchall()
+    connection.close()
+
+    questions = []
+    first = None
+    for question, created_at in rows:
+        try:
+            moment = datetime.fromisoformat(str(created_at)).timestamp()
+        except ValueError:
+            moment = None
+        if first is None and moment is not None:
+            first = moment
+        questions.append((question, moment - first if moment is not None and first is not None else None))
+    return questions
+
+
+def run(mode: str, questions: List[Tuple[str, Optional[float]]], cassette: str, speed: float = 1.0,
+        concurrency: int = 1, pace: bool = False) -> Dict[str, Any]:
+    """
+    Run questions with the cassette in record or replay mode.
+
+    Args:
+        mode: 'record' or 'replay'
+        questions: Output of load_questions()
+        cassette: Cassette file
+        speed: Replay speed-up; recorded latencies are divided by this
+        concurrency: Questions run at once
+        pace: Keep the original gaps between questions (divided by speed)
+
+    Returns:
+        Dictionary with per-question 'results', latency 'summary' and cassette 'stats'
+    """
+    # Also exported for sandbox workers, which build their own cassette
+    os.environ['CASSETTE_MODE'] = mode
+    os.environ['CASSETTE_PATH'] = cassette
+    os.environ['CASSETTE_LATENCY_SCALE'] = str(1.0 / speed if speed > 0 else 0.0)
+    if mode == 'replay':
+        for key, value in REPLAY_DEFAULTS.items():
+            os.environ.setdefault(key, value)
+        os.environ.setdefault('OPENROUTER_API_KEY', 'cassette')
+
+    from odoo_chatbot.core.cassette import Cassette, set_cassette
+    from odoo_chatbot.core.query_processor import execute_odoo_query
+
+    cassette_file = Cassette(cassette, mode, float(os.environ['CASSETTE_LATENCY_SCALE']))
+    set_cassette(cassette_file)
+
+    def ask(item):
+        index, (question, offset) = item
+        if pace and offset is not None:
+            delay = started + offset / (speed or 1.0) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        begin = time.perf_counter()
+        result = execute_odoo_query(question, use_code_cache=False)
+        return {
+            'index': index,
+            'question': question,
+            'latency_ms': round((time.perf_counter() - begin) * 1000, 3),
+            'success': bool(result.get('success')) and not result.get('error'),
+            'error': result.get('error'),
+            'timings': result.get('timings') or {}
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        results = list(executor.map(ask, enumerate(questions)))
+    elapsed = time.perf_counter() - started
+
+    stages: Dict[str, List[float]] = {}
+    for row in results:
+        for name, value in row['timings'].items():
+            if name.endswith('_ms'):
+                stages.setdefault(name, []).append(value)
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'results': results,
+        'summary': summarize([row['latency_ms'] for row in results]),
+        'stages': {name: summarize(values) for name, values in sorted(stages.items())},
+        'stats': dict(cassette_file.stats)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--cassette', required=True, help="Cassette file (appended to when recording)")
+    parser.add_argument('--db', help="chatbot.db to take questions from")
+    parser.add_argument('--questions', help="Text file with one question per line")
+    parser.add_argument('--session', help="Only questions of this session")
+    parser.add_argument('--limit', type=int, help="Only the first this many questions")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed-up, e.g. 10 (0 = no delays)")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--pace', action='store_true', help="Keep the original gaps between questions")
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+    if not args.db and not args.questions:
+        parser.error("one of --db or --questions is required")
+
+    questions = load_questions(args.db, args.questions, args.session, args.limit)
+    speed = args.speed if args.mode == 'replay' else 1.0
+    outcome = run(args.mode, questions, args.cassette, speed, args.concurrency, args.pace)
+
+    failed = sum(not row['success'] for row in outcome['results'])
+    summary = outcome['summary']
+    print(f"{args.mode}: {len(questions)} questions in {outcome['elapsed_s']:.2f}s, {failed} failed, "
+          f"cassette {outcome['stats']}")
+    if summary.get('n'):
+        print(f"latency median {summary['median_ms']:.1f}ms p95 {summary['p95_ms']:.1f}ms "
+              f"p99 {summary['p99_ms']:.1f}ms max {summary['max_ms']:.1f}ms")
+    for name, stage in outcome['stages'].items():
+        print(f"  {name:<24} median {stage['median_ms']:>10.1f}ms  p95 {stage['p95_ms']:>10.1f}ms")
+
+    if args.json:
+        results = [{'name': 'replay[all]', **summary}] + [
+            {'name': f"replay[{name}]", **stage} for name, stage in outcome['stages'].items()
+        ]
+        meta = run_meta(mode=args.mode, cassette=args.cassette, speed=speed, concurrency=args.concurrency,
+                        pace=args.pace, questions=len(questions), failed=failed,
+                        elapsed_s=outcome['elapsed_s'], cassette_stats=outcome['stats'])
+        meta['questions_detail'] = outcome['results']
+        write_results(args.json, results, meta)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -7,7 +7,9 @@ DB_CONFIG = {
     'user': 'root', 
     'password': '', 
     'database': 'chatbot_db',
-    'charset': 'utf8mb4'
+    'charset': 'utf8mb4',
+    # TIMESTAMP values are read and compared in UTC, like the `since` filter
+    'init_command': "SET time_zone = '+00:00'"
 }
 
 def get_db_connection():
@@ -50,10 +52,20 @@ def init_database():
                 question TEXT NOT NULL,
                 answer TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_chat_messages_session_id (session_id, id),
                 FOREIGN KEY (session_id) REFERENCES chat_sessions(session_id)
             )
         """)
         
+        # Tables created before the history index existed do not get it from CREATE TABLE
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = 'chat_messages'
+              AND index_name = 'idx_chat_messages_session_id'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("CREATE INDEX idx_chat_messages_session_id ON chat_messages (session_id, id)")
+        
         connection.commit()
         cursor.close()
         connection.close()
@@ -1,30 +1,28 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+import hashlib
+import json
 import uuid
 import pymysql
-import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from odoo_chatbot.core.llm import acomplete, close_llm_clients
 from database import get_db_connection, init_database
 from models import ChatMessage, ChatResponse, SessionResponse
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenRouter client
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
-
 # Initialize database on startup using lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_database()
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    await close_llm_clients()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(title="Chatbot API", version="1.0.0", lifespan=lifespan)
@@ -80,25 +78,7 @@ def get_system_message():
 async def get_ai_response(question: str) -> str:
     """Get response from OpenRouter AI model"""
     try:
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://localhost:8001",  # Optional
-                "X-Title": "Chatbot API",  # Optional
-            },
-            extra_body={},
-            model="deepseek/deepseek-chat-v3-0324:free",
-            messages=[
-                {
-                    "role": "system",
-                    "content": get_system_message()
-                },
-                {
-                    "role": "user",
-                    "content": question
-                }
-            ]
-        )
-        return completion.choices[0].message.content
+        return await acomplete(get_system_message(), question, title="Chatbot API")
     except Exception as e:
         # Fallback response if API fails
         return f"I'm sorry, I encountered an error: {str(e)}"
@@ -182,25 +162,98 @@ async def chat_with_bot(chat_message: ChatMessage):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+def to_utc_timestamp(value: str) -> str:
+    """Convert an ISO 8601 timestamp to a naive UTC 'YYYY-MM-DD HH:MM:SS[.ffffff]' string"""
+    try:
+        moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since timestamp: {value}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(sep=" ")
+
 @app.get("/session/{session_id}/history")
-async def get_chat_history(session_id: str):
-    """Get chat history for a session"""
+async def get_chat_history(
+    session_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[str] = None,
+):
+    """Get chat history for a session
+    
+    Without parameters every message is returned. `after_id`/`since` return
+    only newer messages (oldest first), `before_id` pages backwards, and
+    `limit` caps the page (the latest messages when no cursor is given).
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
     try:
         connection = get_db_connection()
         if not connection:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
         cursor = connection.cursor(pymysql.cursors.DictCursor)
+        
+        # Cheap fingerprint of the session's messages
         cursor.execute(
-            "SELECT question, answer, created_at FROM chat_messages WHERE session_id = %s ORDER BY created_at",
+            "SELECT COUNT(*) AS message_count, MAX(id) AS max_id FROM chat_messages WHERE session_id = %s",
             (session_id,)
         )
-        history = cursor.fetchall()
+        summary = cursor.fetchone()
+        fingerprint = json.dumps([
+            session_id, summary['message_count'], summary['max_id'], limit, before_id, after_id, since
+        ])
+        etag = f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            cursor.close()
+            connection.close()
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        conditions = ["session_id = %s"]
+        params = [session_id]
+        if after_id is not None:
+            conditions.append("id > %s")
+            params.append(after_id)
+        if before_id is not None:
+            conditions.append("id < %s")
+            params.append(before_id)
+        if since:
+            conditions.append("created_at > %s")
+            params.append(to_utc_timestamp(since))
+        
+        # Newest-first when paging backwards or taking the latest page
+        newest_first = limit is not None and after_id is None and not since
+        query = (
+            "SELECT id, question, answer, created_at FROM chat_messages WHERE "
+            + " AND ".join(conditions)
+            + (" ORDER BY id DESC" if newest_first else " ORDER BY id")
+        )
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+        cursor.execute(query, params)
+        history = list(cursor.fetchall())
         cursor.close()
         connection.close()
         
-        return {"session_id": session_id, "history": history}
+        has_more = limit is not None and len(history) > limit
+        history = history[:limit] if limit is not None else history
+        if newest_first:
+            history.reverse()
+        
+        response.headers["ETag"] = etag
+        return {
+            "session_id": session_id,
+            "history": history,
+            "has_more": has_more,
+            "next_before_id": history[0]['id'] if has_more and newest_first else None,
+            "latest_id": summary['max_id']
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chat history: {str(e)}")
 
@@ -1,26 +1,221 @@
 import sqlite3
 import os
-from typing import Optional
+import threading
+from typing import List, Optional, Tuple
+from .results import RESULT_COLUMNS, parse_chat_answer
 
 # Database configuration - using SQLite for better compatibility
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'chatbot.db')
+DB_PATH = os.getenv(
+    'CHATBOT_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'chatbot.db')
+)
+
+# Connection tuning
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+def _backfill_results(connection: sqlite3.Connection):
+    """Fill the structured result columns of existing rows from their formatted answers"""
+    # The columns as of migration 3; later migrations add more
+    columns = ('code', 'stdout', 'record_count', 'error', 'success')
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    rows = connection.execute("SELECT id, answer FROM chat_messages WHERE success IS NULL")
+    while True:
+        batch = rows.fetchmany(1000)
+        if not batch:
+            break
+        updates = []
+        for message_id, answer in batch:
+            fields = parse_chat_answer(answer)
+            if fields is not None:
+                updates.append(tuple(fields.get(column) for column in columns) + (message_id,))
+        connection.executemany(f"UPDATE chat_messages SET {assignments} WHERE id = ?", updates)
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# A step is either an SQL statement or a callable taking the connection.
+MIGRATIONS = [
+    # 1: indexes for per-session history reads
+    [
+        "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_created "
+        "ON chat_messages (session_id, created_at, id)",
+    ],
+    # 2: client-side message ids so write-behind batches can be replayed safely
+    [
+        "ALTER TABLE chat_messages ADD COLUMN message_uid TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_messages_uid ON chat_messages (message_uid)",
+    ],
+    # 3: structured query results next to the formatted answer
+    [
+        "ALTER TABLE chat_messages ADD COLUMN code TEXT",
+        "ALTER TABLE chat_messages ADD COLUMN stdout TEXT",
+        "ALTER TABLE chat_messages ADD COLUMN record_count INTEGER",
+        "ALTER TABLE chat_messages ADD COLUMN error TEXT",
+        "ALTER TABLE chat_messages ADD COLUMN success INTEGER",
+        "ALTER TABLE chat_messages ADD COLUMN llm_model TEXT",
+        "ALTER TABLE chat_messages ADD COLUMN code_cached INTEGER",
+        "ALTER TABLE chat_messages ADD COLUMN timings TEXT",  # JSON: generate_ms, execute_ms, total_ms
+        _backfill_results,
+    ],
+    # 4: compressed result_data snapshots, linked to messages by message_uid
+    [
+        """
+        CREATE TABLE IF NOT EXISTS result_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_uid TEXT UNIQUE NOT NULL,
+            session_id TEXT NOT NULL,
+            format TEXT NOT NULL,
+            columns TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            chunk_rows INTEGER NOT NULL,
+            segments TEXT NOT NULL,
+            stored_bytes INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ],
+    # 5: re-runs of stored code point at the message they refreshed
+    [
+        "ALTER TABLE chat_messages ADD COLUMN rerun_of TEXT",
+        # Rows stored before message_uid existed get one, so any message can be referenced
+        "UPDATE chat_messages SET message_uid = lower(hex(randomblob(16))) WHERE message_uid IS NULL",
+    ],
+    # 6: XML-RPC call trace summary (JSON) of each execution
+    [
+        "ALTER TABLE chat_messages ADD COLUMN trace TEXT",
+    ],
+    # 7: keyset paging of history (session_id, id < ? / id > ?, ORDER BY id)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id "
+        "ON chat_messages (session_id, id)",
+    ],
+    # 8: latest snapshot per session, part of the history ETag
+    [
+        "CREATE INDEX IF NOT EXISTS idx_result_snapshots_session_id "
+        "ON result_snapshots (session_id, id)",
+    ],
+]
+
+def history_query(session_id: str, limit: Optional[int] = None, before_id: Optional[int] = None,
+                  after_id: Optional[int] = None, since: Optional[str] = None) -> Tuple[str, List, bool]:
+    """Build the keyset-paged history query served by /session/{id}/history
+
+    `since` is a UTC timestamp in SQLite's CURRENT_TIMESTAMP format. One extra
+    row is fetched past `limit`, so the caller can tell whether more follow.
+
+    Returns:
+        Tuple of (SQL, parameters, whether rows come newest first)
+    """
+    conditions = ["session_id = ?"]
+    params = [session_id]
+    if after_id is not None:
+        conditions.append("id > ?")
+        params.append(after_id)
+    if before_id is not None:
+        conditions.append("id < ?")
+        params.append(before_id)
+    if since:
+        conditions.append("created_at > ?")
+        params.append(since)
+
+    # Newest-first when paging backwards or taking the latest page
+    newest_first = limit is not None and after_id is None and not since
+    query = (
+        f"SELECT id, message_uid, question, answer, created_at, {', '.join(RESULT_COLUMNS)}, "
+        "EXISTS (SELECT 1 FROM result_snapshots s WHERE s.message_uid = chat_messages.message_uid) AS has_result "
+        "FROM chat_messages WHERE "
+        + " AND ".join(conditions)
+        + (" ORDER BY id DESC" if newest_first else " ORDER BY id")
+    )
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit + 1)
+    return query, params, newest_first
+
+_local = threading.local()
+
+def _configure(connection: sqlite3.Connection):
+    """Apply per-connection pragmas"""
+    connection.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    connection.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    # Negative cache_size is in KiB rather than pages
+    connection.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+    connection.execute("PRAGMA temp_store = MEMORY")
 
 def get_db_connection():
-    """Get SQLite database connection"""
+    """Get this thread's SQLite connection, opening it on first use
+
+    Connections are reused for the life of the thread, so callers must not
+    close them.
+    """
     try:
-        connection = sqlite3.connect(DB_PATH)
-        connection.row_factory = sqlite3.Row  # Enable column access by name
+        connections = getattr(_local, 'connections', None)
+        if connections is None:
+            connections = _local.connections = {}
+        connection = connections.get(DB_PATH)
+        if connection is None:
+            connection = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+            connection.row_factory = sqlite3.Row  # Enable column access by name
+            _configure(connection)
+            connections[DB_PATH] = connection
+        elif connection.in_transaction:
+            # A previous request failed before committing
+            connection.rollback()
         return connection
     except Exception as e:
         print(f"Error connecting to database: {e}")
         return None
 
+def close_db_connection():
+    """Close this thread's connection, if any"""
+    connections = getattr(_local, 'connections', None) or {}
+    connection = connections.pop(DB_PATH, None)
+    if connection is not None:
+        connection.close()
+
+def migrate(connection: sqlite3.Connection) -> int:
+    """Bring an existing database up to the latest schema version in place
+
+    Each migration's DDL, backfill and version bump run in one transaction,
+    so a failed step leaves the database at the previous version, ready to retry.
+    """
+    connection.commit()
+    isolation_level = connection.isolation_level
+    # Manage transactions explicitly; SQLite DDL is transactional
+    connection.isolation_level = None
+    try:
+        while True:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Read under the write lock, so two processes never apply the same step
+                version = connection.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    connection.execute("COMMIT")
+                    return version
+                for statement in MIGRATIONS[version]:
+                    if callable(statement):
+                        statement(connection)
+                    else:
+                        connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {version + 1}")
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+    finally:
+        connection.isolation_level = isolation_level
+
 def init_database():
     """Initialize SQLite database and create tables"""
     try:
         connection = sqlite3.connect(DB_PATH)
         cursor = connection.cursor()
         
+        # WAL lets history reads run while a chat message is being written;
+        # the journal mode is stored in the file, so this also converts old databases
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Create sessions table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS chat_sessions (
@@ -42,6 +237,9 @@ def init_database():
             )
         """)
         
+        connection.commit()
+        migrate(connection)
+        cursor.execute("ANALYZE")
         connection.commit()
         cursor.close()
         connection.close()
@@ -51,4 +249,4 @@ def init_database():
         
     except Exception as e:
         print(f"Error initializing database: {e}")
-        return False 
\ No newline at end of file
+        return False
@@ -0,0 +1,95 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+# Pipeline limits
+MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', '16'))
+MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', '32'))
+EXECUTION_WORKERS = int(os.getenv('CHAT_EXECUTION_WORKERS', '8'))
+
+
+class CapacityError(Exception):
+    """Raised when the chat pipeline is full and a request must be rejected"""
+
+
+class ChatPipeline:
+    """Admission control and a bounded worker pool for the /chat pipeline"""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 workers: int = EXECUTION_WORKERS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.workers = max(1, workers)
+        self.executor = None
+        self._semaphore = None
+        self._admitted = 0
+        self._active = 0
+        self._running_jobs = 0
+        self._rejected = 0
+        self._completed = 0
+
+    @asynccontextmanager
+    async def admit(self):
+        """Reserve a pipeline slot, waiting in the queue or failing fast when full"""
+        if self._semaphore is None:
+            # Created lazily so it binds to the server's running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            self._rejected += 1
+            raise CapacityError("Chat pipeline is at capacity, please retry shortly")
+
+        self._admitted += 1
+        try:
+            async with self._semaphore:
+                self._active += 1
+                try:
+                    yield
+                finally:
+                    self._active -= 1
+                    self._completed += 1
+        finally:
+            self._admitted -= 1
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """Worker pool for blocking pipeline stages (created on first use)"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chat-worker")
+        return self.executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a blocking function on the worker pool without blocking the event loop
+
+        The caller's context goes along, so stage timings recorded by fn count
+        towards the request that awaited it.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        self._running_jobs += 1
+        try:
+            return await loop.run_in_executor(self.get_executor(), context.run, fn, *args)
+        finally:
+            self._running_jobs -= 1
+
+    def stats(self) -> Dict[str, int]:
+        """Current pipeline counters"""
+        return {
+            'active': self._active,
+            'queue_depth': self._admitted - self._active,
+            'executor_jobs': self._running_jobs,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'rejected': self._rejected,
+            'completed': self._completed
+        }
+
+    def shutdown(self) -> None:
+        """Wait for running jobs and release the worker threads"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+pipeline = ChatPipeline()
@@ -1,29 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager, AsyncExitStack
+from datetime import datetime, timezone
+from typing import Optional
+import hashlib
 import uuid
-import os
+import json
 from dotenv import load_dotenv
-from openai import OpenAI
-from .database import get_db_connection, init_database
-from .models import ChatMessage, ChatResponse, SessionResponse
+from ..core.llm import acomplete, close_llm_clients
+from ..core.metrics import METRICS_ENABLED, registry, stage, timed
+from ..core.sandbox import get_sandbox_pool, shutdown_sandbox_pool
+from .database import get_db_connection, history_query, init_database
+from .executor import CapacityError, pipeline
+from .persistence import writer
+from .results import RESULT_COLUMNS, format_chat_answer, from_row, result_fields, to_row
+from .snapshots import SNAPSHOTS_ENABLED, UnknownColumnsError, read_snapshot, store_snapshot
+from .models import ChatMessage, ChatResponse, RerunRequest, SessionResponse
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenRouter client
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-)
-
 # Initialize database on startup using lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    init_database()
+    # Startup; serving on a half-migrated schema only fails later, per request
+    if not init_database():
+        raise Exception("Database initialization failed")
+    get_sandbox_pool()  # Pre-start execution workers when SANDBOX_ENABLED=1
+    if writer:
+        await writer.start()
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    if writer:
+        await writer.stop()
+    pipeline.shutdown()
+    shutdown_sandbox_pool()
+    await close_llm_clients()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(title="Chatbot API", version="1.0.0", lifespan=lifespan)
@@ -79,25 +93,7 @@ def get_system_message():
 async def get_ai_response(question: str) -> str:
     """Get response from OpenRouter AI model"""
     try:
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://localhost:8001",  # Optional
-                "X-Title": "Chatbot API",  # Optional
-            },
-            extra_body={},
-            model="deepseek/deepseek-chat-v3-0324:free",
-            messages=[
-                {
-                    "role": "system",
-                    "content": get_system_message()
-                },
-                {
-                    "role": "user",
-                    "content": question
-                }
-            ]
-        )
-        return completion.choices[0].message.content
+        return await acomplete(get_system_message(), question, title="Chatbot API")
     except Exception as e:
         # Fallback response if API fails
         return f"I'm sorry, I encountered an error: {str(e)}"
@@ -119,13 +115,13 @@ async def create_new_session():
             raise HTTPException(status_code=500, detail="Database connection failed")
         
         cursor = connection.cursor()
-        cursor.execute(
-            "INSERT INTO chat_sessions (session_id) VALUES (?)",
-            (session_id,)
-        )
-        connection.commit()
+        with stage('db_write'):
+            cursor.execute(
+                "INSERT INTO chat_sessions (session_id) VALUES (?)",
+                (session_id,)
+            )
+            connection.commit()
         cursor.close()
-        connection.close()
         
         return SessionResponse(
             session_id=session_id,
@@ -135,96 +131,415 @@ async def create_new_session():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating session: {str(e)}")
 
+@timed('db_read')
+def session_exists(session_id: str) -> bool:
+    """Check whether a chat session exists (blocking)"""
+    connection = get_db_connection()
+    if not connection:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT session_id FROM chat_sessions WHERE session_id = ?",
+        (session_id,)
+    )
+    exists = cursor.fetchone() is not None
+    cursor.close()
+    return exists
+
+@timed('db_write')
+def save_chat_message(session_id: str, question: str, answer: str, fields: Optional[dict] = None,
+                      message_uid: Optional[str] = None):
+    """Store a chat message, its answer and result fields (blocking, runs on the worker pool)"""
+    connection = get_db_connection()
+    if not connection:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    
+    cursor = connection.cursor()
+    
+    # Check if session exists
+    cursor.execute(
+        "SELECT session_id FROM chat_sessions WHERE session_id = ?",
+        (session_id,)
+    )
+    session_row = cursor.fetchone()
+    
+    if not session_row:
+        cursor.close()
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    # Store chat message and response
+    cursor.execute(
+        f"INSERT INTO chat_messages (message_uid, session_id, question, answer, {', '.join(RESULT_COLUMNS)}) "
+        f"VALUES (?, ?, ?, ?{', ?' * len(RESULT_COLUMNS)})",
+        (message_uid, session_id, question, answer) + to_row(fields)
+    )
+    connection.commit()
+    cursor.close()
+
+async def persist_chat_message(session_id: str, question: str, answer: str,
+                               fields: Optional[dict] = None, session_checked: bool = False) -> str:
+    """Store a chat message, through the write-behind queue when it is enabled; return its uid"""
+    if writer is None:
+        message_uid = uuid.uuid4().hex
+        await pipeline.run(save_chat_message, session_id, question, answer, fields, message_uid)
+        return message_uid
+    if not session_checked and not await pipeline.run(session_exists, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return (await writer.enqueue(session_id, question, answer, fields))['message_uid']
+
+async def snapshot_result(session_id: str, store_result: Optional[bool], message_uid: str,
+                          result: dict) -> Optional[dict]:
+    """Store result_data as a compressed snapshot when requested; a failure only loses the snapshot"""
+    store = SNAPSHOTS_ENABLED if store_result is None else store_result
+    if not store or not result['success']:
+        return None
+    try:
+        return await pipeline.run(store_snapshot, message_uid, session_id, result['data'])
+    except Exception as e:
+        print(f"Error storing result snapshot: {e}")
+        return None
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_bot(chat_message: ChatMessage):
     """Process chat question with Odoo execution and return results"""
     try:
         # Import our core functionality
-        from ..core.query_processor import execute_odoo_query
-        
-        # Execute the Odoo query (this generates code AND runs it)
-        result = execute_odoo_query(chat_message.question)
-        
-        # Format the response with both code and execution results
-        if result['success']:
-            # Create comprehensive response with code and results
-            formatted_response = f"""
-📝 Generated Code:
-```python
-{result['code']}
-```
-
-🔍 Execution Results:
-{result['text_response']}
-
-📊 Data Summary: {len(result['data']) if result['data'] and isinstance(result['data'], list) else 'N/A'} records
-"""
-            if result.get('error'):
-                formatted_response += f"\n⚠️ Warning: {result['error']}"
-        else:
-            formatted_response = f"❌ Error: {result['error']}\n\n📝 Generated Code:\n```python\n{result.get('code', 'No code generated')}\n```"
-        
-        # Store in database
-        connection = get_db_connection()
-        if not connection:
-            raise HTTPException(status_code=500, detail="Database connection failed")
+        from ..core.query_processor import execute_odoo_query_async
         
-        cursor = connection.cursor()
-        
-        # Check if session exists
-        cursor.execute(
-            "SELECT session_id FROM chat_sessions WHERE session_id = ?",
-            (chat_message.session_id,)
-        )
-        session_exists = cursor.fetchone()
-        
-        if not session_exists:
-            cursor.close()
-            connection.close()
-            raise HTTPException(status_code=404, detail="Session not found")
+        async with pipeline.admit():
+            # Execute the Odoo query (this generates code AND runs it)
+            result = await execute_odoo_query_async(
+                chat_message.question, chat_message.use_code_cache, pipeline.get_executor()
+            )
+            
+            # Format the response with both code and execution results
+            formatted_response = format_chat_answer(result)
+            fields = result_fields(result)
+            
+            # Store in database
+            message_uid = await persist_chat_message(
+                chat_message.session_id, chat_message.question, formatted_response, fields
+            )
+            snapshot = await snapshot_result(
+                chat_message.session_id, chat_message.store_result, message_uid, result
+            )
         
-        # Store chat message and response
-        cursor.execute(
-            "INSERT INTO chat_messages (session_id, question, answer) VALUES (?, ?, ?)",
-            (chat_message.session_id, chat_message.question, formatted_response)
-        )
-        connection.commit()
-        cursor.close()
-        connection.close()
-        
-        return ChatResponse(
+        response = ChatResponse(
             session_id=chat_message.session_id,
             question=chat_message.question,
-            answer=formatted_response
+            answer=formatted_response,
+            message_uid=message_uid,
+            result_snapshot=snapshot,
+            **fields
         )
+        if not chat_message.include_timings:
+            response.timings = None
+        return response
         
+    except CapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+
+def sse_event(event: str, data) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_with_bot_stream(chat_message: ChatMessage):
+    """Process a chat question, streaming progress as Server-Sent Events
+    
+    Events, in order: 'token' (LLM output), 'code' (cleaned code ready),
+    'stdout' (each printed line), 'done' (record count and stored answer).
+    """
+    from ..core.query_processor import stream_odoo_query
+    
+    # Reserve a pipeline slot before the response starts so overload is still a 503
+    stack = AsyncExitStack()
+    try:
+        await stack.enter_async_context(pipeline.admit())
+        if not await pipeline.run(session_exists, chat_message.session_id):
+            raise HTTPException(status_code=404, detail="Session not found")
+    except CapacityError as e:
+        await stack.aclose()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except HTTPException:
+        await stack.aclose()
         raise
     except Exception as e:
+        await stack.aclose()
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+    async def events():
+        try:
+            async for event, payload in stream_odoo_query(
+                chat_message.question, chat_message.use_code_cache, pipeline.get_executor()
+            ):
+                if event == 'token':
+                    yield sse_event('token', {'text': payload})
+                elif event == 'code':
+                    yield sse_event('code', payload)
+                elif event == 'stdout':
+                    yield sse_event('stdout', {'line': payload})
+                else:
+                    formatted_response = format_chat_answer(payload)
+                    fields = result_fields(payload)
+                    message_uid = await persist_chat_message(
+                        chat_message.session_id, chat_message.question, formatted_response, fields,
+                        session_checked=True
+                    )
+                    snapshot = await snapshot_result(
+                        chat_message.session_id, chat_message.store_result, message_uid, payload
+                    )
+                    yield sse_event('done', dict(
+                        fields, answer=formatted_response, message_uid=message_uid, result_snapshot=snapshot
+                    ))
+        except Exception as e:
+            yield sse_event('error', {'detail': f"Error processing chat: {str(e)}"})
+        finally:
+            await stack.aclose()
+
+    # A client that disconnects before the body starts never runs events()' finally;
+    # the background task always runs, and closing the stack twice is harmless
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(stack.aclose)
+    )
+
+@app.get("/metrics")
+async def get_metrics():
+    """Per-stage latency histograms and counters in Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/pipeline/stats")
+async def get_pipeline_stats():
+    """Get chat pipeline concurrency and queue-depth counters"""
+    from ..core.pool import get_client_pool
+    sandbox = get_sandbox_pool()
+    return {
+        "pipeline": pipeline.stats(),
+        "odoo_pool": get_client_pool().stats(),
+        "sandbox": sandbox.stats() if sandbox else None,
+        "write_behind": writer.stats() if writer else None
+    }
+
+def to_utc_timestamp(value: str) -> str:
+    """Convert an ISO 8601 timestamp to a naive UTC 'YYYY-MM-DD HH:MM:SS[.ffffff]' string"""
+    try:
+        moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since timestamp: {value}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(sep=" ")
+
 @app.get("/session/{session_id}/history")
-async def get_chat_history(session_id: str):
-    """Get chat history for a session"""
+async def get_chat_history(
+    session_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[str] = None,
+):
+    """Get chat history for a session
+    
+    Without parameters every message is returned. `after_id`/`since` return
+    only newer messages (oldest first), `before_id` pages backwards, and
+    `limit` caps the page (the latest messages when no cursor is given).
+    Responses carry an ETag; a matching If-None-Match returns 304.
+    """
     try:
         connection = get_db_connection()
         if not connection:
             raise HTTPException(status_code=500, detail="Database connection failed")
         
         cursor = connection.cursor()
-        cursor.execute(
-            "SELECT question, answer, created_at FROM chat_messages WHERE session_id = ? ORDER BY created_at",
-            (session_id,)
+        
+        # Cheap index-only fingerprint of the session's messages and their snapshots,
+        # which are stored after the message and change has_result
+        with stage('db_read'):
+            cursor.execute(
+                "SELECT COUNT(*), MAX(id), "
+                "(SELECT MAX(id) FROM result_snapshots WHERE session_id = ?) "
+                "FROM chat_messages WHERE session_id = ?",
+                (session_id, session_id)
+            )
+            count, max_id, max_snapshot_id = cursor.fetchone()
+        pending = writer.pending_for(session_id) if writer else []
+        fingerprint = json.dumps([
+            session_id, count, max_id, max_snapshot_id, [message['message_uid'] for message in pending],
+            limit, before_id, after_id, since
+        ])
+        etag = f'W/"{hashlib.sha1(fingerprint.encode()).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            cursor.close()
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        query, params, newest_first = history_query(
+            session_id, limit, before_id, after_id, to_utc_timestamp(since) if since else None
         )
-        history = cursor.fetchall()
+        with stage('db_read'):
+            cursor.execute(query, params)
+            history = [from_row(dict(row)) for row in cursor.fetchall()]
         cursor.close()
-        connection.close()
         
-        return {"session_id": session_id, "history": history}
+        if newest_first:
+            history.reverse()
+        
+        # Answers still waiting in the write-behind queue are newer than any stored row;
+        # one written between the two reads above is already in history
+        stored_uids = {message['message_uid'] for message in history}
+        pending = [message for message in pending if message['message_uid'] not in stored_uids]
+        if pending and before_id is None:
+            history.extend(
+                dict({column: message.get(column) for column in RESULT_COLUMNS},
+                     id=None, message_uid=message['message_uid'], question=message['question'],
+                     answer=message['answer'],
+                     created_at=message['created_at'], pending=True)
+                for message in pending
+                if not since or message['created_at'] > to_utc_timestamp(since)
+            )
+        
+        # The limit applies to stored and pending messages together
+        has_more = limit is not None and len(history) > limit
+        if has_more:
+            history = history[-limit:] if newest_first else history[:limit]
+        
+        stored_ids = [message['id'] for message in history if message['id'] is not None]
+        next_before_id = None
+        if has_more and newest_first:
+            # A page of only pending messages continues with every stored one
+            next_before_id = stored_ids[0] if stored_ids else (max_id or 0) + 1
+        response.headers["ETag"] = etag
+        return {
+            "session_id": session_id,
+            "history": history,
+            "has_more": has_more,
+            "next_before_id": next_before_id,
+            "latest_id": max_id
+        }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chat history: {str(e)}")
 
+@timed('db_read')
+def resolve_message_uid(session_id: str, message_ref: str) -> Optional[str]:
+    """Message uid for a numeric message id or a message uid (blocking)"""
+    if not message_ref.isdigit():
+        return message_ref
+    connection = get_db_connection()
+    if not connection:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    row = connection.execute(
+        "SELECT message_uid FROM chat_messages WHERE id = ? AND session_id = ?",
+        (int(message_ref), session_id)
+    ).fetchone()
+    return row['message_uid'] if row else None
+
+@timed('db_read')
+def load_message(session_id: str, message_ref: str) -> Optional[dict]:
+    """Stored message by id or message_uid, including queued write-behind messages (blocking)"""
+    if writer and not message_ref.isdigit():
+        for message in writer.pending_for(session_id):
+            if message['message_uid'] == message_ref:
+                return message
+    connection = get_db_connection()
+    if not connection:
+        raise HTTPException(status_code=500, detail="Database connection failed")
+    column = "id" if message_ref.isdigit() else "message_uid"
+    row = connection.execute(
+        f"SELECT message_uid, question, code, llm_model FROM chat_messages WHERE {column} = ? AND session_id = ?",
+        (int(message_ref) if message_ref.isdigit() else message_ref, session_id)
+    ).fetchone()
+    return dict(row) if row else None
+
+@app.post("/session/{session_id}/messages/{message_ref}/rerun", response_model=ChatResponse)
+async def rerun_message(session_id: str, message_ref: str, rerun: Optional[RerunRequest] = None):
+    """Re-execute a message's stored code against fresh Odoo data, without the LLM
+    
+    The new result is stored as a new message whose `rerun_of` is the
+    original message_uid.
+    """
+    from ..core.query_processor import rerun_stored_code
+    
+    try:
+        async with pipeline.admit():
+            message = await pipeline.run(load_message, session_id, message_ref)
+            if message is None:
+                raise HTTPException(status_code=404, detail="Message not found")
+            if not message.get('code'):
+                raise HTTPException(status_code=409, detail="Message has no stored code to re-run")
+            
+            result = await pipeline.run(rerun_stored_code, message['question'], message['code'])
+            # Keep the model that wrote the code, not the one configured now
+            result['llm_model'] = message.get('llm_model') or result.get('llm_model')
+            result['rerun_of'] = message['message_uid']
+            
+            formatted_response = format_chat_answer(result)
+            fields = result_fields(result)
+            message_uid = await persist_chat_message(
+                session_id, message['question'], formatted_response, fields, session_checked=True
+            )
+            snapshot = await snapshot_result(
+                session_id, rerun.store_result if rerun else None, message_uid, result
+            )
+        
+        return ChatResponse(
+            session_id=session_id,
+            question=message['question'],
+            answer=formatted_response,
+            message_uid=message_uid,
+            result_snapshot=snapshot,
+            **fields
+        )
+        
+    except CapacityError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error re-running message: {str(e)}")
+
+@app.get("/session/{session_id}/messages/{message_ref}/result")
+async def get_message_result(
+    session_id: str,
+    message_ref: str,
+    columns: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+):
+    """Get a page of a message's stored result_data
+    
+    `message_ref` is the message id or message_uid. `columns` is a
+    comma-separated projection; only the matching compressed segments are read.
+    """
+    try:
+        message_uid = await pipeline.run(resolve_message_uid, session_id, message_ref)
+        selected = [column.strip() for column in columns.split(",") if column.strip()] if columns else None
+        page = None
+        if message_uid:
+            page = await pipeline.run(read_snapshot, message_uid, session_id, selected, offset, limit)
+        if page is None:
+            raise HTTPException(status_code=404, detail="No stored result for this message")
+        return dict(page, session_id=session_id, message_uid=message_uid)
+        
+    except UnknownColumnsError as e:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {e}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting message result: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
@@ -1,14 +1,32 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class ChatMessage(BaseModel):
     session_id: str
     question: str
+    use_code_cache: bool = True
+    store_result: Optional[bool] = None  # None = RESULT_SNAPSHOTS setting
+    include_timings: bool = True
+
+class RerunRequest(BaseModel):
+    store_result: Optional[bool] = None  # None = RESULT_SNAPSHOTS setting
 
 class ChatResponse(BaseModel):
     session_id: str
     question: str
     answer: str
+    code: Optional[str] = None
+    stdout: Optional[str] = None
+    record_count: Optional[int] = None
+    error: Optional[str] = None
+    success: Optional[bool] = None
+    llm_model: Optional[str] = None
+    code_cached: Optional[bool] = None
+    timings: Optional[Dict[str, float]] = None
+    rerun_of: Optional[str] = None
+    trace: Optional[Dict[str, Any]] = None
+    message_uid: Optional[str] = None
+    result_snapshot: Optional[Dict[str, Any]] = None
 
 class SessionResponse(BaseModel):
     session_id: str
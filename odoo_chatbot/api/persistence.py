@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.metrics import timed
+from .database import DB_PATH, get_db_connection
+from .results import RESULT_COLUMNS, to_row
+
+# Write-behind configuration
+WRITE_BEHIND_ENABLED = os.getenv('CHAT_WRITE_BEHIND', '1').lower() in ('1', 'true', 'yes')
+WRITE_BATCH_SIZE = int(os.getenv('CHAT_WRITE_BATCH_SIZE', '100'))
+WRITE_INTERVAL = float(os.getenv('CHAT_WRITE_INTERVAL', '0.5'))
+SPILL_PATH = os.getenv('CHAT_SPILL_PATH', DB_PATH + '.spill.jsonl')
+
+
+class ChatMessageWriter:
+    """Queue chat messages in memory and write them to SQLite in batches
+
+    Every queued message is also appended to a spill file and fsynced before
+    it is acknowledged, so messages that were answered but not yet committed
+    survive a crash or a power loss and are replayed on the next start. Each
+    message carries a unique id, which makes the replay idempotent.
+
+    Spill appends are group-committed: messages queued while an fsync is in
+    progress are written and fsynced together by the next one. Spill-file
+    I/O runs on its own thread, never on the event loop, and in order, so an
+    append and a compaction never interleave.
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, interval: float = WRITE_INTERVAL,
+                 spill_path: str = SPILL_PATH):
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.spill_path = spill_path
+        self._pending: List[Dict[str, Any]] = []
+        # Messages waiting for the next spill fsync (event loop only)
+        self._unsynced: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._syncing = False
+        self._sync_task = None
+        self._spill_lines = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._spill_executor = None
+        self._task = None
+        self._wakeup = None
+        self._flush_lock = None
+        self._batches = 0
+        self._written = 0
+        self._failures = 0
+
+    async def start(self):
+        """Replay the spill file and start the background flush task"""
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-writer")
+        # Separate from the SQLite writer, so appends never wait behind a batch
+        self._spill_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-spill")
+        self._wakeup = asyncio.Event()
+        # One flush at a time, so a batch is never written while another is in flight
+        self._flush_lock = asyncio.Lock()
+        with self._lock:
+            self._pending = self._read_spill()
+        self._spill_lines = len(self._pending)
+        if self._pending:
+            print(f"Replaying {len(self._pending)} unsaved chat messages")
+            await self.flush()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and durably write everything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Acknowledged messages only reach _pending once their spill append is done
+        while self._sync_task is not None and not self._sync_task.done():
+            await self._sync_task
+        if self._executor is not None:
+            await self.flush()
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._spill_executor is not None:
+            self._spill_executor.shutdown(wait=True)
+            self._spill_executor = None
+
+    async def enqueue(self, session_id: str, question: str, answer: str,
+                      fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a message and its structured result fields; return the queued row"""
+        message = {
+            'message_uid': uuid.uuid4().hex,
+            'session_id': session_id,
+            'question': question,
+            'answer': answer,
+            # Same format as SQLite's CURRENT_TIMESTAMP
+            'created_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        message.update({column: (fields or {}).get(column) for column in RESULT_COLUMNS})
+        synced = asyncio.get_running_loop().create_future()
+        self._unsynced.append((message, synced))
+        if not self._syncing:
+            self._syncing = True
+            self._sync_task = asyncio.create_task(self._sync_spill())
+        await synced
+        return message
+
+    def pending_for(self, session_id: str) -> List[Dict[str, Any]]:
+        """Messages for a session that are queued but not yet written"""
+        with self._lock:
+            return [message for message in self._pending if message['session_id'] == session_id]
+
+    async def flush(self):
+        """Write all queued messages in one transaction"""
+        async with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(self._executor, self._write_and_dequeue, batch)
+            except Exception as e:
+                self._failures += 1
+                print(f"Error writing chat messages: {e}")
+                return
+            await loop.run_in_executor(self._spill_executor, self._compact_spill)
+
+    def stats(self) -> Dict[str, int]:
+        """Write-behind counters"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'batches': self._batches,
+                'written': self._written,
+                'failures': self._failures
+            }
+
+    async def _sync_spill(self):
+        loop = asyncio.get_running_loop()
+        while self._unsynced:
+            group, self._unsynced = self._unsynced, []
+            try:
+                should_flush = await loop.run_in_executor(
+                    self._spill_executor, self._append, [message for message, _ in group]
+                )
+            except Exception as e:
+                for _, synced in group:
+                    if not synced.done():
+                        synced.set_exception(e)
+                continue
+            for _, synced in group:
+                if not synced.done():
+                    synced.set_result(None)
+            if should_flush and self._wakeup is not None:
+                self._wakeup.set()
+        self._syncing = False
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    @timed('db_write')
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        connection = get_db_connection()
+        if not connection:
+            raise RuntimeError("Database connection failed")
+        columns = ('message_uid', 'session_id', 'question', 'answer', 'created_at') + RESULT_COLUMNS
+        with connection:
+            connection.executemany(
+                f"INSERT OR IGNORE INTO chat_messages ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                [
+                    (m['message_uid'], m['session_id'], m['question'], m['answer'], m['created_at']) + to_row(m)
+                    for m in batch
+                ]
+            )
+
+    def _write_and_dequeue(self, batch: List[Dict[str, Any]]):
+        self._write_batch(batch)
+        # Dequeued on the writer thread, so history never sees a message both stored and pending
+        with self._lock:
+            written = {message['message_uid'] for message in batch}
+            self._pending = [message for message in self._pending if message['message_uid'] not in written]
+            self._batches += 1
+            self._written += len(batch)
+
+    def _append(self, messages: List[Dict[str, Any]]) -> bool:
+        # One write and one fsync for the whole group, before any of it is acknowledged
+        with open(self.spill_path, 'a', encoding='utf-8') as spill:
+            spill.write(''.join(json.dumps(message) + "\n" for message in messages))
+            spill.flush()
+            os.fsync(spill.fileno())
+        self._spill_lines += len(messages)
+        with self._lock:
+            self._pending.extend(messages)
+            return len(self._pending) >= self.batch_size
+
+    def _compact_spill(self):
+        # Appends run on this same thread, so none can slip in before the rewrite
+        with self._lock:
+            remaining = list(self._pending)
+        if remaining and self._spill_lines - len(remaining) < 4 * self.batch_size:
+            # Written messages left in the file only cost an INSERT OR IGNORE on replay
+            return
+        self._rewrite_spill(remaining)
+        self._spill_lines = len(remaining)
+
+    def _read_spill(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.spill_path):
+            return []
+        messages = []
+        with open(self.spill_path, encoding='utf-8') as spill:
+            for line in spill:
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    # A crash can leave a partially written last line
+                    continue
+        return messages
+
+    def _rewrite_spill(self, messages: List[Dict[str, Any]]):
+        if not messages:
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            return
+        temp_path = self.spill_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as spill:
+            for message in messages:
+                spill.write(json.dumps(message) + "\n")
+            spill.flush()
+            os.fsync(spill.fileno())
+        os.replace(temp_path, self.spill_path)
+
+
+writer: Optional[ChatMessageWriter] = ChatMessageWriter() if WRITE_BEHIND_ENABLED else None
@@ -0,0 +1,103 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+# Structured result columns stored next to the formatted answer, in insert order
+RESULT_COLUMNS = ('code', 'stdout', 'record_count', 'error', 'success', 'llm_model', 'code_cached', 'timings',
+                  'rerun_of', 'trace')
+
+# Columns holding JSON documents
+JSON_COLUMNS = ('timings', 'trace')
+
+def record_count(result: dict):
+    """Number of records in a query result, or 'N/A' if it is not a list"""
+    return len(result['data']) if result['data'] and isinstance(result['data'], list) else 'N/A'
+
+def format_chat_answer(result: dict) -> str:
+    """Format a query result as the stored chat answer"""
+    if result['success']:
+        # Create comprehensive response with code and results
+        formatted_response = f"""
+📝 Generated Code:
+```python
+{result['code']}
+```
+
+🔍 Execution Results:
+{result['text_response']}
+
+📊 Data Summary: {record_count(result)} records
+"""
+        if result.get('error'):
+            formatted_response += f"\n⚠️ Warning: {result['error']}"
+    else:
+        formatted_response = f"❌ Error: {result['error']}\n\n📝 Generated Code:\n```python\n{result.get('code', 'No code generated')}\n```"
+    return formatted_response
+
+def result_fields(result: dict) -> Dict[str, Any]:
+    """Structured fields of a query result, keyed by RESULT_COLUMNS"""
+    data = result.get('data')
+    return {
+        'code': result.get('code'),
+        'stdout': result.get('text_response'),
+        'record_count': len(data) if isinstance(data, list) else None,
+        'error': result.get('error'),
+        'success': result.get('success'),
+        'llm_model': result.get('llm_model'),
+        'code_cached': result.get('code_cached'),
+        'timings': result.get('timings'),
+        'rerun_of': result.get('rerun_of'),
+        'trace': result.get('trace'),
+    }
+
+def to_row(fields: Optional[Dict[str, Any]]) -> Tuple:
+    """Column values for RESULT_COLUMNS, with JSON_COLUMNS serialized"""
+    fields = fields or {}
+    return tuple(
+        json.dumps(fields[column]) if column in JSON_COLUMNS and fields.get(column) is not None
+        else fields.get(column)
+        for column in RESULT_COLUMNS
+    )
+
+def from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode the structured columns of a stored message in place"""
+    for column in JSON_COLUMNS:
+        if row.get(column):
+            row[column] = json.loads(row[column])
+    for column in ('success', 'code_cached', 'has_result'):
+        if row.get(column) is not None:
+            row[column] = bool(row[column])
+    return row
+
+def _strip_fence(section: str) -> str:
+    section = section.strip()
+    if section.startswith("```python"):
+        section = section[len("```python"):]
+    if section.endswith("```"):
+        section = section[:-3]
+    return section.strip()
+
+def parse_chat_answer(answer: str) -> Optional[Dict[str, Any]]:
+    """Recover structured fields from a formatted answer, or None for plain answers
+
+    Only used to backfill messages stored before the structured columns existed.
+    """
+    if answer.startswith("❌ Error:"):
+        error, _, code = answer[len("❌ Error:"):].partition("\n\n📝 Generated Code:")
+        return {'success': False, 'error': error.strip(), 'code': _strip_fence(code)}
+
+    if "📝 Generated Code:" not in answer or "🔍 Execution Results:" not in answer:
+        return None
+
+    code, _, rest = answer.partition("🔍 Execution Results:")
+    stdout, marker, summary = rest.rpartition("📊 Data Summary:")
+    if not marker:
+        stdout, summary = summary, ''
+    summary, _, warning = summary.partition("⚠️ Warning:")
+    count = summary.split()[0] if summary.split() else ''
+    return {
+        'success': True,
+        'code': _strip_fence(code.replace("📝 Generated Code:", "", 1)),
+        'stdout': stdout.strip(),
+        'record_count': int(count) if count.isdigit() else None,
+        'error': warning.strip() or None,
+    }
\ No newline at end of file
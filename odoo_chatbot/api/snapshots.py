@@ -0,0 +1,256 @@
+import gzip
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from .database import get_db_connection
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Snapshot configuration
+SNAPSHOTS_ENABLED = os.getenv('RESULT_SNAPSHOTS', '0').lower() in ('1', 'true', 'yes')
+SNAPSHOT_CHUNK_ROWS = int(os.getenv('RESULT_SNAPSHOT_CHUNK_ROWS', '1000'))
+SNAPSHOT_FORMAT = os.getenv('RESULT_SNAPSHOT_FORMAT', '')  # arrow, json-zstd or json-gzip; empty = best available
+
+
+class UnknownColumnsError(ValueError):
+    """Raised when a snapshot read asks for columns the snapshot does not have"""
+
+
+def default_format() -> str:
+    """Best snapshot encoding the installed packages support"""
+    if SNAPSHOT_FORMAT:
+        return SNAPSHOT_FORMAT
+    if pa is not None:
+        return 'arrow'
+    return 'json-zstd' if zstandard is not None else 'json-gzip'
+
+
+def _finite(values: list) -> list:
+    """NaN and +/-inf become None; JSON responses cannot carry them"""
+    return [None if isinstance(value, float) and not math.isfinite(value) else value for value in values]
+
+
+def _has_default_index(frame: Any) -> bool:
+    index = frame.index
+    return (type(index).__name__ == 'RangeIndex' and index.name is None
+            and index.start == 0 and index.step == 1)
+
+
+def to_columns(result_data: Any) -> Optional[Tuple[List[str], Dict[str, list]]]:
+    """Turn result_data into (column names, values per column), or None if there is nothing to store
+
+    DataFrames and lists of records keep their columns, plus the index when
+    it carries data (e.g. groupby keys); other lists and scalars become a
+    single 'value' column, and a plain dict becomes one row. Non-finite
+    floats are stored as None.
+    """
+    table = _to_columns(result_data)
+    if table is None:
+        return None
+    columns, data = table
+    return columns, {column: _finite(values) for column, values in data.items()}
+
+
+def _to_columns(result_data: Any) -> Optional[Tuple[List[str], Dict[str, list]]]:
+    if result_data is None:
+        return None
+    if hasattr(result_data, 'to_frame') and not hasattr(result_data, 'columns'):
+        # pandas Series, e.g. a value_counts() result
+        result_data = result_data.to_frame().reset_index()
+    if hasattr(result_data, 'columns') and hasattr(result_data, 'reset_index') \
+            and not _has_default_index(result_data):
+        # e.g. groupby(...).sum(), whose group keys live in the index
+        try:
+            result_data = result_data.reset_index()
+        except ValueError:
+            # An index level named like an existing column; keep the columns only
+            pass
+    if hasattr(result_data, 'columns') and hasattr(result_data, 'to_dict'):
+        columns = [str(column) for column in result_data.columns]
+        return columns, {str(column): result_data[column].tolist() for column in result_data.columns}
+    if isinstance(result_data, (list, tuple)):
+        if result_data and all(isinstance(row, dict) for row in result_data):
+            columns = list(dict.fromkeys(str(key) for row in result_data for key in row))
+            return columns, {
+                column: [row.get(column) for row in result_data] for column in columns
+            }
+        return ['value'], {'value': list(result_data)}
+    if isinstance(result_data, dict):
+        values = list(result_data.values())
+        if values and all(isinstance(value, list) for value in values) \
+                and len({len(value) for value in values}) == 1:
+            return [str(key) for key in result_data], {str(key): value for key, value in result_data.items()}
+        return [str(key) for key in result_data], {str(key): [value] for key, value in result_data.items()}
+    return ['value'], {'value': [result_data]}
+
+
+def _encode_segment(fmt: str, column: str, values: list) -> bytes:
+    if fmt == 'arrow':
+        table = pa.table({column: values})
+        sink = pa.BufferOutputStream()
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_stream(sink, table.schema, options=options) as stream:
+            stream.write_table(table)
+        return sink.getvalue().to_pybytes()
+    payload = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    if fmt == 'json-zstd':
+        return zstandard.ZstdCompressor(level=3).compress(payload)
+    return gzip.compress(payload, compresslevel=6)
+
+
+def _decode_segment(fmt: str, segment: bytes) -> list:
+    if fmt == 'arrow':
+        return pa.ipc.open_stream(pa.py_buffer(segment)).read_all().column(0).to_pylist()
+    if fmt == 'json-zstd':
+        return json.loads(zstandard.ZstdDecompressor().decompress(segment))
+    return json.loads(gzip.decompress(segment))
+
+
+def encode_snapshot(result_data: Any, fmt: Optional[str] = None,
+                    chunk_rows: int = SNAPSHOT_CHUNK_ROWS) -> Optional[Dict[str, Any]]:
+    """Encode result_data as compressed column segments of chunk_rows rows each
+
+    Every (row chunk, column) pair is compressed on its own, so a page of a
+    few columns is served by reading and decompressing only those segments.
+    Values Arrow cannot type (e.g. Odoo's False-or-[id, name] relations) fall
+    back to compressed JSON.
+    """
+    table = to_columns(result_data)
+    if table is None:
+        return None
+    columns, data = table
+    fmt = fmt or default_format()
+    chunk_rows = max(1, chunk_rows)
+    row_count = len(data[columns[0]]) if columns else 0
+
+    def encode(fmt):
+        blob = bytearray()
+        segments = []
+        for start in range(0, row_count, chunk_rows):
+            chunk = []
+            for column in columns:
+                segment = _encode_segment(fmt, column, data[column][start:start + chunk_rows])
+                chunk.append([len(blob), len(segment)])
+                blob += segment
+            segments.append(chunk)
+        return bytes(blob), segments
+
+    try:
+        blob, segments = encode(fmt)
+    except Exception:
+        if fmt != 'arrow':
+            raise
+        fmt = 'json-zstd' if zstandard is not None else 'json-gzip'
+        blob, segments = encode(fmt)
+    return {
+        'format': fmt,
+        'columns': columns,
+        'row_count': row_count,
+        'chunk_rows': chunk_rows,
+        'segments': segments,
+        'data': blob
+    }
+
+
+def store_snapshot(message_uid: str, session_id: str, result_data: Any) -> Optional[Dict[str, Any]]:
+    """Encode and store a message's result_data (blocking); return its summary"""
+    snapshot = encode_snapshot(result_data)
+    if snapshot is None:
+        return None
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("Database connection failed")
+    with connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO result_snapshots "
+            "(message_uid, session_id, format, columns, row_count, chunk_rows, segments, stored_bytes, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (message_uid, session_id, snapshot['format'], json.dumps(snapshot['columns']),
+             snapshot['row_count'], snapshot['chunk_rows'], json.dumps(snapshot['segments']),
+             len(snapshot['data']), snapshot['data'])
+        )
+    return {
+        'format': snapshot['format'],
+        'columns': snapshot['columns'],
+        'row_count': snapshot['row_count'],
+        'stored_bytes': len(snapshot['data'])
+    }
+
+
+def _read_ranges(connection, rowid: int, ranges: List[Tuple[int, int]]) -> List[bytes]:
+    if hasattr(connection, 'blobopen'):
+        # Incremental blob I/O reads only the pages holding the requested segments
+        with connection.blobopen('result_snapshots', 'data', rowid, readonly=True) as blob:
+            segments = []
+            for offset, length in ranges:
+                blob.seek(offset)
+                segments.append(blob.read(length))
+            return segments
+    expressions = ", ".join("substr(data, ?, ?)" for _ in ranges)
+    params = [value for offset, length in ranges for value in (offset + 1, length)]
+    row = connection.execute(
+        f"SELECT {expressions} FROM result_snapshots WHERE id = ?", params + [rowid]
+    ).fetchone()
+    return list(row)
+
+
+def read_snapshot(message_uid: str, session_id: str, columns: Optional[List[str]] = None,
+                  offset: int = 0, limit: int = 100) -> Optional[Dict[str, Any]]:
+    """Read one page of selected columns from a stored snapshot (blocking)
+
+    Returns:
+        Page dictionary, or None if the message has no snapshot
+    """
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("Database connection failed")
+    row = connection.execute(
+        "SELECT id, format, columns, row_count, chunk_rows, segments, stored_bytes "
+        "FROM result_snapshots WHERE message_uid = ? AND session_id = ?",
+        (message_uid, session_id)
+    ).fetchone()
+    if row is None:
+        return None
+
+    all_columns = json.loads(row['columns'])
+    selected = columns or all_columns
+    unknown = [column for column in selected if column not in all_columns]
+    if unknown:
+        raise UnknownColumnsError(", ".join(unknown))
+
+    end = min(row['row_count'], offset + limit)
+    values = {column: [] for column in selected}
+    if offset < end:
+        segments = json.loads(row['segments'])
+        chunk_rows = row['chunk_rows']
+        chunks = range(offset // chunk_rows, (end - 1) // chunk_rows + 1)
+        indexes = [all_columns.index(column) for column in selected]
+        ranges = [tuple(segments[chunk][index]) for chunk in chunks for index in indexes]
+        decoded = iter(_read_ranges(connection, row['id'], ranges))
+        for chunk in chunks:
+            start = chunk * chunk_rows
+            for column in selected:
+                chunk_values = _decode_segment(row['format'], bytes(next(decoded)))
+                # Snapshots stored before non-finite floats were mapped to None
+                values[column].extend(_finite(chunk_values[max(offset - start, 0):end - start]))
+
+    return {
+        'columns': all_columns,
+        'selected': selected,
+        'row_count': row['row_count'],
+        'offset': offset,
+        'limit': limit,
+        'has_more': end < row['row_count'],
+        'format': row['format'],
+        'stored_bytes': row['stored_bytes'],
+        'rows': [dict(zip(selected, row_values)) for row_values in zip(*(values[c] for c in selected))]
+    }
\ No newline at end of file
@@ -2,10 +2,17 @@
 Core functionality for Odoo integration.
 """
 
+from .cache import SearchReadCache, get_search_read_cache
 from .client import OdooClient
-from .query_processor import execute_odoo_query
+from .pool import OdooClientPool, get_client_pool
+from .query_processor import execute_odoo_query, execute_odoo_query_async
 
 __all__ = [
     "OdooClient", 
-    "execute_odoo_query"
+    "SearchReadCache",
+    "get_search_read_cache",
+    "OdooClientPool",
+    "get_client_pool",
+    "execute_odoo_query",
+    "execute_odoo_query_async"
 ] 
\ No newline at end of file
@@ -0,0 +1,225 @@
+"""
+Read-through result cache for OdooClient.search_read.
+"""
+
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+DEFAULT_MAX_BYTES = int(os.getenv('ODOO_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+DEFAULT_TTL = float(os.getenv('ODOO_CACHE_TTL', '60'))
+
+
+def _freeze(value: Any) -> Hashable:
+    """Turn nested lists/dicts from a domain into hashable tuples."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def make_key(model: str, domain: Optional[List], fields: Optional[List[str]],
+             limit: int = 0, offset: int = 0, order: Optional[str] = None,
+             scope: Tuple = ()) -> Tuple:
+    """
+    Build a normalized cache key for a search_read call.
+
+    Domain order is kept because Odoo's prefix operators depend on it;
+    field order is not. The cache is shared by every client in the process,
+    so scope must identify the server, database and user the rows are for.
+
+    Args:
+        model: The Odoo model name
+        domain: Search domain filters
+        fields: List of fields to retrieve
+        limit: Maximum number of records
+        offset: Number of records skipped
+        order: Sort specification
+        scope: Who the rows are visible to, e.g. (url, db, uid)
+
+    Returns:
+        Hashable key tuple
+    """
+    order = ','.join(part.strip().lower() for part in (order or '').split(',') if part.strip())
+    return (
+        model,
+        _freeze(domain or []),
+        tuple(sorted(set(fields or []))),
+        limit or 0,
+        offset or 0,
+        order,
+        tuple(scope)
+    )
+
+
+class _Entry:
+    __slots__ = ('payload', 'size', 'expires_at', 'fingerprint')
+
+    def __init__(self, payload: bytes, expires_at: float, fingerprint: Any):
+        self.payload = payload
+        self.size = len(payload)
+        self.expires_at = expires_at
+        self.fingerprint = fingerprint
+
+
+class SearchReadCache:
+    """
+    A bounded TTL + LRU cache of search_read results.
+
+    Results are stored pickled, which gives an exact byte size for the LRU
+    budget and hands every caller its own copy, so generated code that
+    mutates records cannot corrupt the cache.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, default_ttl: float = DEFAULT_TTL,
+                 model_ttls: Optional[Dict[str, float]] = None, check_freshness: bool = False):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total size budget for cached results
+            default_ttl: Seconds a result stays valid
+            model_ttls: Per-model TTL overrides (0 disables caching for a model)
+            check_freshness: Compare search_count and max(write_date) with the
+                values seen at fill time before serving a hit
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.model_ttls = dict(model_ttls or {})
+        self.check_freshness = check_freshness
+
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'stale': 0}
+
+    def ttl_for(self, model: str) -> float:
+        return self.model_ttls.get(model, self.default_ttl)
+
+    def get_or_fetch(self, key: Tuple, fetch: Callable[[], List[Dict[str, Any]]],
+                     fingerprint: Optional[Callable[[], Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Return a cached result for key, or call fetch() and cache its result.
+
+        Args:
+            key: Key built by make_key()
+            fetch: Callable performing the real search_read
+            fingerprint: Callable returning a cheap freshness marker, used
+                when check_freshness is enabled
+
+        Returns:
+            List of record dictionaries
+        """
+        ttl = self.ttl_for(key[0])
+        if ttl <= 0:
+            return fetch()
+
+        use_fingerprint = self.check_freshness and fingerprint is not None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expired'] += 1
+                entry = None
+
+        if entry is not None and use_fingerprint and fingerprint() != entry.fingerprint:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self._stats['stale'] += 1
+            entry = None
+
+        if entry is not None:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+            return pickle.loads(entry.payload)
+
+        with self._lock:
+            self._stats['misses'] += 1
+        marker = fingerprint() if use_fingerprint else None
+        result = fetch()
+        self._store(key, result, ttl, marker)
+        return result
+
+    def _store(self, key: Tuple, result: List[Dict[str, Any]], ttl: float, marker: Any) -> None:
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(payload, time.monotonic() + ttl, marker)
+            self._bytes += len(payload)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def invalidate(self, model: Optional[str] = None) -> None:
+        """
+        Drop cached results.
+
+        Args:
+            model: Only drop results for this model (None = everything)
+        """
+        with self._lock:
+            for key in [key for key in self._entries if model is None or key[0] == model]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hits, misses, evictions, expired, stale, entries and bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            return stats
+
+
+_shared_cache: Optional[SearchReadCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_search_read_cache() -> Optional[SearchReadCache]:
+    """
+    Get the process-wide cache, if enabled with ODOO_CACHE=1.
+
+    ODOO_CACHE_MODEL_TTLS sets per-model TTLs, e.g. "res.partner=300,account.move=30",
+    and ODOO_CACHE_CHECK_FRESHNESS=1 enables the write_date/count check.
+
+    Returns:
+        Shared SearchReadCache instance, or None when caching is disabled
+    """
+    global _shared_cache
+    if os.getenv('ODOO_CACHE', '0').lower() not in ('1', 'true', 'yes'):
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            model_ttls = {}
+            for item in os.getenv('ODOO_CACHE_MODEL_TTLS', '').split(','):
+                if '=' in item:
+                    model, ttl = item.split('=', 1)
+                    model_ttls[model.strip()] = float(ttl)
+            _shared_cache = SearchReadCache(
+                model_ttls=model_ttls,
+                check_freshness=os.getenv('ODOO_CACHE_CHECK_FRESHNESS', '0').lower() in ('1', 'true', 'yes')
+            )
+        return _shared_cache
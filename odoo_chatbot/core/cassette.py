@@ -0,0 +1,293 @@
+"""
+Record and replay LLM completions and Odoo XML-RPC traffic.
+
+In record mode every LLM completion and every XML-RPC response is appended
+to a cassette file together with how long it took. In replay mode the same
+requests are answered from the cassette, without network access, after the
+recorded latency multiplied by CASSETTE_LATENCY_SCALE (0.1 = ten times
+faster, 0 = no delay).
+
+Requests are matched by a hash of what determines the answer: the model,
+prompt and question for the LLM; the endpoint method, Odoo model, method
+and arguments for XML-RPC. Credentials are never hashed or stored, so a
+cassette recorded against production replays with any ODOO_* settings.
+A request seen several times replays its recorded answers in order.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import xmlrpc.client
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+CASSETTE_MODE = os.getenv('CASSETTE_MODE', 'off').lower()  # off, record or replay
+CASSETTE_PATH = os.getenv('CASSETTE_PATH', 'cassette.jsonl')
+CASSETTE_LATENCY_SCALE = float(os.getenv('CASSETTE_LATENCY_SCALE', '1'))
+
+# XML-RPC parameters that identify the caller rather than the request
+_CREDENTIAL_PARAMS = {'execute_kw': 3, 'execute': 3, 'authenticate': 4, 'login': 3}
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request the cassette has no answer for"""
+
+
+def _digest(parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def _pack(text: str) -> str:
+    return base64.b64encode(zlib.compress(text.encode('utf-8'), 6)).decode('ascii')
+
+
+def _unpack(body: str) -> str:
+    return zlib.decompress(base64.b64decode(body)).decode('utf-8')
+
+
+def llm_key(model: str, system_message: str, question: str) -> str:
+    """
+    Hash identifying an LLM completion.
+
+    Args:
+        model: Model identifier
+        system_message: System prompt
+        question: User question
+
+    Returns:
+        Hex digest
+    """
+    return _digest(['llm', model, system_message, question])
+
+
+def xmlrpc_key(handler: str, request_body: bytes) -> Tuple[str, str]:
+    """
+    Hash identifying an XML-RPC request, ignoring db, uid and password.
+
+    Args:
+        handler: Endpoint path, e.g. '/xmlrpc/2/object'
+        request_body: Marshalled request (gzip-encoded bodies are accepted)
+
+    Returns:
+        Tuple of (hex digest, readable label such as 'res.partner.search_read')
+    """
+    if request_body[:2] == b'\x1f\x8b':
+        request_body = xmlrpc.client.gzip_decode(request_body)
+    params, method_name = xmlrpc.client.loads(request_body, use_builtin_types=True)
+    params = list(params)[_CREDENTIAL_PARAMS.get(method_name, 0):]
+    if method_name == 'execute_kw' and len(params) >= 2:
+        label = f"{params[0]}.{params[1]}"
+    else:
+        label = method_name
+    return _digest(['xmlrpc', handler.rstrip('/').rsplit('/', 1)[-1], method_name, params]), label
+
+
+class Cassette:
+    """
+    Append-only file of recorded responses, loaded whole for replay.
+
+    Each line is one JSON entry: kind ('llm' or 'xmlrpc'), key, a readable
+    label, the recorded seconds and the zlib-compressed response body.
+    """
+
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE,
+                 latency_scale: float = CASSETTE_LATENCY_SCALE):
+        """
+        Initialize the cassette.
+
+        Args:
+            path: Cassette file
+            mode: 'record' appends to the file, 'replay' serves from it
+            latency_scale: Multiplier for recorded latencies when replaying
+
+        Raises:
+            Exception: If the mode is unknown or the replay file is missing
+        """
+        if mode not in ('record', 'replay'):
+            raise Exception(f"Unknown cassette mode '{mode}', expected record or replay")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = max(0.0, latency_scale)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+        if mode == 'replay':
+            if not os.path.exists(path):
+                raise Exception(f"Cassette file not found: {path}")
+            with open(path, encoding='utf-8') as cassette_file:
+                for line in cassette_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry['key'], []).append(entry)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def record(self, kind: str, key: str, label: str, seconds: float, body: str,
+               **extra: Any) -> None:
+        """
+        Append one response to the cassette.
+
+        Args:
+            kind: 'llm' or 'xmlrpc'
+            key: Request hash
+            label: Readable description of the request
+            seconds: How long the live call took
+            body: Response text
+            **extra: Additional JSON-serializable fields, e.g. token usage
+        """
+        entry = {'kind': kind, 'key': key, 'label': label, 'seconds': round(seconds, 6),
+                 'body': _pack(body), **extra}
+        line = json.dumps(entry, separators=(',', ':')) + "\n"
+        with self._lock:
+            # One write per entry, so concurrent recorders (sandbox workers) do not interleave lines
+            with open(self.path, 'a', encoding='utf-8') as cassette_file:
+                cassette_file.write(line)
+            self.stats['recorded'] += 1
+
+    def lookup(self, key: str, label: str = '') -> Dict[str, Any]:
+        """
+        Get the next recorded response for a request.
+
+        Args:
+            key: Request hash
+            label: Readable description used in the miss error
+
+        Returns:
+            Entry with its decoded 'text' and 'delay' (scaled seconds)
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats['misses'] += 1
+                raise CassetteMiss(f"No recorded response for {label or key} in {self.path}")
+            position = self._positions.get(key, 0)
+            # Repeated requests replay their answers in order, then keep the last one
+            entry = entries[min(position, len(entries) - 1)]
+            self._positions[key] = position + 1
+            self.stats['replayed'] += 1
+        return dict(entry, text=_unpack(entry['body']), delay=entry['seconds'] * self.latency_scale)
+
+
+class CassetteTransport(xmlrpc.client.Transport):
+    """
+    XML-RPC transport that records through, or replays instead of, a real transport.
+    """
+
+    def __init__(self, cassette: Cassette, inner: Optional[xmlrpc.client.Transport] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            cassette: Cassette to record to or replay from
+            inner: Transport used for live calls (record mode only)
+        """
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner
+        self.last_call: Dict[str, Any] = {}
+
+    def request(self, host, handler, request_body, verbose=False):
+        key, label = xmlrpc_key(handler, request_body)
+        if self.cassette.replaying:
+            entry = self.cassette.lookup(key, label)
+            if entry['delay']:
+                time.sleep(entry['delay'])
+            self.last_call = {'response_bytes': len(entry['text']), 'seconds': entry['delay']}
+            # Raises xmlrpc.client.Fault for recorded faults, like a live call would
+            params, _ = xmlrpc.client.loads(entry['text'], use_builtin_types=self._use_builtin_types)
+            return params
+
+        started = time.perf_counter()
+        try:
+            response = self.inner.request(host, handler, request_body, verbose)
+        except xmlrpc.client.Fault as fault:
+            body = xmlrpc.client.dumps(fault, allow_none=True)
+            self.cassette.record('xmlrpc', key, label, time.perf_counter() - started, body)
+            raise
+        self.last_call = dict(getattr(self.inner, 'last_call', {}) or {})
+        body = xmlrpc.client.dumps(response, methodresponse=True, allow_none=True)
+        self.cassette.record('xmlrpc', key, label, time.perf_counter() - started, body)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the live transport's counters, or the last replayed call.
+
+        Returns:
+            Dictionary with 'last_call' and, when recording, the inner 'totals'
+        """
+        if self.inner is not None and hasattr(self.inner, 'stats'):
+            return self.inner.stats()
+        return {'last_call': dict(self.last_call), 'totals': dict(self.cassette.stats)}
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Get the process-wide cassette, created from CASSETTE_MODE on first use.
+
+    Returns:
+        Shared Cassette, or None when cassettes are off
+    """
+    global _cassette
+    if _cassette is None and CASSETTE_MODE in ('record', 'replay'):
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette()
+    return _cassette
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """
+    Install a cassette for this process, overriding CASSETTE_MODE.
+
+    Clients created afterwards use it; sandbox workers still follow the
+    CASSETTE_* environment variables.
+
+    Args:
+        cassette: Cassette to use, or None to turn cassettes off
+    """
+    global _cassette
+    with _cassette_lock:
+        _cassette = cassette
+
+
+def cassette_transport_factory(
+    make_inner: Callable[[str], xmlrpc.client.Transport]
+) -> Optional[Callable[[str], xmlrpc.client.Transport]]:
+    """
+    Wrap a transport factory so every XML-RPC call goes through the cassette.
+
+    Args:
+        make_inner: Factory for live transports (used when recording)
+
+    Returns:
+        Transport factory, or None when cassettes are off
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+    if cassette.replaying:
+        return lambda url: CassetteTransport(cassette)
+    return lambda url: CassetteTransport(cassette, make_inner(url))
\ No newline at end of file
@@ -6,14 +6,30 @@ import xmlrpc.client
 import os
 import sys
 import io
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import contextvars
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterator, List, Any, Optional
 import pandas as pd
 from dotenv import load_dotenv
+from .cache import SearchReadCache, get_search_read_cache, make_key
+from .cassette import cassette_transport_factory
+from .compiled import get_compiled
+from .metrics import count_records, observe_stage, stage
+from .tracing import TRACE_ENABLED, CallTracer
+from .transport import make_transport
 
 # Load environment variables
 load_dotenv(override=True)
 
+DEFAULT_PARALLEL_WORKERS = int(os.getenv('ODOO_PARALLEL_WORKERS', '4'))
+MAX_OUTPUT_CHARS = int(os.getenv('EXEC_MAX_OUTPUT_CHARS', str(1024 * 1024)))
+
 
 class OdooClient:
     """
@@ -24,7 +40,9 @@ class OdooClient:
     """
     
     def __init__(self, url: Optional[str] = None, db: Optional[str] = None, 
-                 username: Optional[str] = None, password: Optional[str] = None):
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 transport_factory: Optional[Callable[[str], xmlrpc.client.Transport]] = None,
+                 cache: Optional[SearchReadCache] = None):
         """
         Initialize the Odoo client with credentials.
         
@@ -33,6 +51,11 @@ class OdooClient:
             db: Database name (defaults to ODOO_DB env var)
             username: Username (defaults to ODOO_USERNAME env var)
             password: Password (defaults to ODOO_PASSWORD env var)
+            transport_factory: Callable building an XML-RPC transport for an
+                endpoint URL (defaults to a keep-alive, gzip-aware transport,
+                wrapped in the cassette when CASSETTE_MODE is set)
+            cache: search_read result cache (defaults to the shared cache
+                when ODOO_CACHE=1, otherwise no caching)
             
         Raises:
             Exception: If any required credentials are missing
@@ -47,10 +70,48 @@ class OdooClient:
             raise Exception("Missing Odoo credentials. Please check your .env file.")
         
         self.uid = None
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
+        self._auth_lock = threading.RLock()
+        self._auth_generation = 0
+        # Extra object-endpoint proxies for background and parallel reads, kept for reuse
+        self._spare_proxies: "queue.SimpleQueue[xmlrpc.client.ServerProxy]" = queue.SimpleQueue()
+        self.tracer: Optional[CallTracer] = None
+        self.cache = cache if cache is not None else get_search_read_cache()
+        self.transport_factory = (
+            transport_factory or cassette_transport_factory(make_transport) or make_transport
+        )
+        common_url = f"{self.url}/xmlrpc/2/common"
+        self.common = xmlrpc.client.ServerProxy(
+            common_url, transport=self.transport_factory(common_url)
+        )
+        self.models = self.new_models_proxy()
         self.authenticate()
 
+    def new_models_proxy(self) -> xmlrpc.client.ServerProxy:
+        """
+        Create a fresh proxy for /xmlrpc/2/object with its own connection.
+        
+        Proxies are not thread-safe, so background work uses its own proxy.
+        
+        Returns:
+            A ServerProxy for the object endpoint
+        """
+        models_url = f"{self.url}/xmlrpc/2/object"
+        return xmlrpc.client.ServerProxy(
+            models_url, transport=self.transport_factory(models_url)
+        )
+
+    @contextmanager
+    def _spare_proxy(self) -> Iterator[xmlrpc.client.ServerProxy]:
+        """Borrow an object-endpoint proxy whose connection outlives the call."""
+        try:
+            proxy = self._spare_proxies.get_nowait()
+        except queue.Empty:
+            proxy = self.new_models_proxy()
+        try:
+            yield proxy
+        finally:
+            self._spare_proxies.put(proxy)
+
     def authenticate(self) -> None:
         """
         Authenticate with the Odoo server.
@@ -58,12 +119,83 @@ class OdooClient:
         Raises:
             Exception: If authentication fails
         """
-        self.uid = self.common.authenticate(self.db, self.username, self.password, {})
-        if not self.uid:
-            raise Exception("Authentication failed!")
+        # The common proxy's connection is shared, so one thread at a time
+        with self._auth_lock, stage('odoo_auth'):
+            self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+            self._auth_generation += 1
+            if not self.uid:
+                raise Exception("Authentication failed!")
+
+    def transport_stats(self) -> Dict[str, Any]:
+        """
+        Get wire byte and timing counters for the XML-RPC transports.
+        
+        Returns:
+            Dictionary of transport stats keyed by 'common' and 'models'
+        """
+        stats = {}
+        for name, proxy in (('common', self.common), ('models', self.models)):
+            transport = proxy("transport")
+            if hasattr(transport, 'stats'):
+                stats[name] = transport.stats()
+        return stats
+
+    def execute_kw(self, model: str, method: str, args: List,
+                   kwargs: Optional[Dict[str, Any]] = None,
+                   proxy: Optional[xmlrpc.client.ServerProxy] = None) -> Any:
+        """
+        Call a model method through XML-RPC, re-authenticating once on access errors.
+        
+        Long-lived (pooled) clients keep their cached uid, so an expired session
+        or a rotated password only surfaces as an access fault on the next call.
+        
+        Args:
+            model: The Odoo model name (e.g., 'res.partner')
+            method: The model method to call (e.g., 'search_read')
+            args: Positional arguments for the method
+            kwargs: Keyword arguments for the method
+            proxy: Object endpoint proxy to use (defaults to self.models)
+            
+        Returns:
+            The raw XML-RPC result
+        """
+        kwargs = kwargs or {}
+        proxy = proxy or self.models
+        tracer = self.tracer
+        if tracer is None:
+            return self._call(proxy, model, method, args, kwargs)
+        started = time.perf_counter()
+        try:
+            result = self._call(proxy, model, method, args, kwargs)
+        except Exception as e:
+            tracer.record(model, method, args, kwargs, None, time.perf_counter() - started,
+                          _last_response_bytes(proxy), str(e))
+            raise
+        tracer.record(model, method, args, kwargs, result, time.perf_counter() - started,
+                      _last_response_bytes(proxy))
+        return result
+
+    def _call(self, proxy: xmlrpc.client.ServerProxy, model: str, method: str,
+              args: List, kwargs: Dict[str, Any]) -> Any:
+        generation = self._auth_generation
+        try:
+            return proxy.execute_kw(
+                self.db, self.uid, self.password, model, method, args, kwargs
+            )
+        except xmlrpc.client.Fault as fault:
+            if not _is_access_error(fault):
+                raise
+            with self._auth_lock:
+                # Parallel readers hitting the same fault re-authenticate only once
+                if self._auth_generation == generation:
+                    self.authenticate()
+            return proxy.execute_kw(
+                self.db, self.uid, self.password, model, method, args, kwargs
+            )
 
     def search_read(self, model: str, domain: Optional[List] = None, 
-                   fields: Optional[List[str]] = None, limit: int = 0) -> List[Dict[str, Any]]:
+                   fields: Optional[List[str]] = None, limit: int = 0,
+                   offset: int = 0, order: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Execute a search_read operation on an Odoo model.
         
@@ -72,32 +204,288 @@ class OdooClient:
             domain: Search domain filters
             fields: List of fields to retrieve
             limit: Maximum number of records to return (0 = no limit)
+            offset: Number of matching records to skip
+            order: Sort specification (e.g., 'date_order desc, id')
             
         Returns:
             List of dictionaries containing the retrieved records
         """
         domain = domain or []
         fields = fields or []
-        return self.models.execute_kw(
-            self.db, self.uid, self.password,
-            model, 'search_read',
-            [domain],
-            {'fields': fields, 'limit': limit}
+        kwargs = {'fields': fields, 'limit': limit}
+        if offset:
+            kwargs['offset'] = offset
+        if order:
+            kwargs['order'] = order
+
+        def fetch():
+            return self.execute_kw(
+                model, 'search_read',
+                [domain],
+                kwargs
+            )
+
+        with stage('odoo_search_read'):
+            if self.cache is None:
+                records = fetch()
+            else:
+                records = self.cache.get_or_fetch(
+                    make_key(model, domain, fields, limit, offset, order, (self.url, self.db, self.uid)),
+                    fetch,
+                    lambda: self._freshness_marker(model, domain)
+                )
+        count_records(model, len(records))
+        return records
+
+    def _freshness_marker(self, model: str, domain: List) -> tuple:
+        """
+        Get a cheap marker that changes when matching records change.
+        
+        Args:
+            model: The Odoo model name
+            domain: Search domain filters
+            
+        Returns:
+            Tuple of (record count, latest write_date)
+        """
+        count = self.execute_kw(model, 'search_count', [domain])
+        latest = self.execute_kw(
+            model, 'search_read', [domain],
+            {'fields': ['write_date'], 'limit': 1, 'order': 'write_date desc'}
         )
+        return count, latest[0].get('write_date') if latest else None
+
+    def search(self, model: str, domain: Optional[List] = None, limit: int = 0,
+               offset: int = 0, order: Optional[str] = None) -> List[int]:
+        """
+        Execute a search operation on an Odoo model, returning ids only.
+
+        Args:
+            model: The Odoo model name (e.g., 'res.partner')
+            domain: Search domain filters
+            limit: Maximum number of ids to return (0 = no limit)
+            offset: Number of matching records to skip
+            order: Sort specification (e.g., 'date_order desc, id')
+
+        Returns:
+            List of matching record ids
+        """
+        domain = domain or []
+        kwargs = {'limit': limit}
+        if offset:
+            kwargs['offset'] = offset
+        if order:
+            kwargs['order'] = order
+        with stage('odoo_search'):
+            return self.execute_kw(model, 'search', [domain], kwargs)
+
+    def search_count(self, model: str, domain: Optional[List] = None) -> int:
+        """
+        Count the records matching a domain, without reading them.
+
+        Args:
+            model: The Odoo model name (e.g., 'res.partner')
+            domain: Search domain filters
+
+        Returns:
+            Number of matching records
+        """
+        with stage('odoo_search_count'):
+            return self.execute_kw(model, 'search_count', [domain or []])
+
+    def read_group(self, model: str, domain: Optional[List] = None,
+                   fields: Optional[List[str]] = None, groupby: Optional[List[str]] = None,
+                   limit: int = 0, offset: int = 0, orderby: Optional[str] = None,
+                   lazy: bool = True) -> List[Dict[str, Any]]:
+        """
+        Aggregate matching records inside Odoo, returning one row per group.
+
+        Aggregates are requested as 'field:function' (e.g., 'amount_total:sum',
+        'id:count'); date fields are grouped by period with 'field:granularity'
+        (e.g., 'date_order:month'). Each row holds the group values, the
+        aggregates and a '<groupby>_count' (or '__count' when lazy=False).
+
+        Args:
+            model: The Odoo model name (e.g., 'sale.order')
+            domain: Search domain filters
+            fields: Aggregates to compute (e.g., ['amount_total:sum'])
+            groupby: Fields to group by (e.g., ['partner_id'])
+            limit: Maximum number of groups to return (0 = no limit)
+            offset: Number of groups to skip
+            orderby: Sort specification for the groups (e.g., 'amount_total desc')
+            lazy: Group by the first groupby field only and return the rest
+                as sub-group domains; False groups by all fields at once
+
+        Returns:
+            List of dictionaries, one per group
+        """
+        domain = domain or []
+        fields = fields or []
+        groupby = groupby or []
+        kwargs = {'lazy': lazy}
+        if limit:
+            kwargs['limit'] = limit
+        if offset:
+            kwargs['offset'] = offset
+        if orderby:
+            kwargs['orderby'] = orderby
+        with stage('odoo_read_group'):
+            groups = self.execute_kw(model, 'read_group', [domain, fields, groupby], kwargs)
+        count_records(model, len(groups))
+        return groups
+
+    def iter_search_read(self, model: str, domain: Optional[List] = None,
+                         fields: Optional[List[str]] = None, batch_size: int = 500,
+                         order: Optional[str] = None,
+                         prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over matching records, fetching them from Odoo in batches.
+        
+        Without an explicit order, pages are keyed on id (id > last seen id),
+        which stays fast on large tables. With an order, pages use offset/limit.
+        Only one or two batches are held in memory at a time.
+        
+        Args:
+            model: The Odoo model name (e.g., 'account.move')
+            domain: Search domain filters
+            fields: List of fields to retrieve
+            batch_size: Number of records fetched per XML-RPC call
+            order: Sort specification; None pages by ascending id
+            prefetch: Fetch the next batch in a background thread while the
+                current one is being consumed
+            
+        Yields:
+            One record dictionary at a time
+        """
+        domain = list(domain or [])
+        fields = list(fields or [])
+        batch_size = max(1, batch_size)
+
+        def fetch(proxy, cursor):
+            kwargs = {'fields': fields, 'limit': batch_size}
+            if order:
+                kwargs['order'] = order
+                kwargs['offset'] = cursor
+                page_domain = domain
+            else:
+                kwargs['order'] = 'id asc'
+                page_domain = domain + [('id', '>', cursor)] if cursor else domain
+            with stage('odoo_search_read'):
+                batch = self.execute_kw(model, 'search_read', [page_domain], kwargs, proxy=proxy)
+            count_records(model, len(batch))
+            return batch
+
+        def next_cursor(cursor, batch):
+            return cursor + len(batch) if order else batch[-1]['id']
+
+        if not prefetch:
+            cursor = 0
+            while True:
+                batch = fetch(self.models, cursor)
+                yield from batch
+                if len(batch) < batch_size:
+                    return
+                cursor = next_cursor(cursor, batch)
+
+        with self._spare_proxy() as proxy, ThreadPoolExecutor(max_workers=1) as executor:
+            batch = fetch(self.models, 0)
+            cursor = 0
+            while batch:
+                pending = None
+                if len(batch) == batch_size:
+                    cursor = next_cursor(cursor, batch)
+                    # In the caller's context, so the page counts towards its request
+                    pending = executor.submit(contextvars.copy_context().run, fetch, proxy, cursor)
+                yield from batch
+                batch = pending.result() if pending else []
+
+    def parallel_search_read(self, model: str, domain: Optional[List] = None,
+                             fields: Optional[List[str]] = None, limit: int = 0,
+                             order: Optional[str] = None, shard_size: int = 1000,
+                             max_workers: int = DEFAULT_PARALLEL_WORKERS) -> List[Dict[str, Any]]:
+        """
+        Read a large result set by fetching id shards concurrently.
+        
+        Matching ids are searched once, split into shards and read over a
+        bounded thread pool, each shard over its own connection, so several
+        Odoo workers serve the export at once. The connections stay open on
+        the client for later calls. Results keep the search order.
+        
+        Args:
+            model: The Odoo model name (e.g., 'sale.order')
+            domain: Search domain filters
+            fields: List of fields to retrieve
+            limit: Maximum number of records to return (0 = no limit)
+            order: Sort specification applied to the initial search
+            shard_size: Number of ids read per XML-RPC call
+            max_workers: Maximum number of concurrent reads
+            
+        Returns:
+            List of dictionaries containing the retrieved records
+        """
+        domain = domain or []
+        fields = fields or []
+        search_kwargs = {'limit': limit}
+        if order:
+            search_kwargs['order'] = order
+        with stage('odoo_search'):
+            ids = self.execute_kw(model, 'search', [domain], search_kwargs)
+        if not ids:
+            return []
+
+        shard_size = max(1, shard_size)
+        shards = [ids[i:i + shard_size] for i in range(0, len(ids), shard_size)]
+        if len(shards) == 1 or max_workers <= 1:
+            records = self._read_ordered(model, shards, fields, self.models)
+            count_records(model, len(records))
+            return records
+
+        def read_shard(context, shard):
+            # Proxies go back to the client, so later calls reuse their connections
+            with self._spare_proxy() as proxy:
+                return context.run(self._read_shard, model, shard, fields, proxy)
+
+        # One copy of the caller's context per shard; a context cannot be entered twice at once
+        contexts = [contextvars.copy_context() for _ in shards]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(shards))) as executor:
+            batches = list(executor.map(read_shard, contexts, shards))
+        records = _merge_in_order(ids, batches)
+        count_records(model, len(records))
+        return records
+
+    def _read_ordered(self, model: str, shards: List[List[int]], fields: List[str],
+                      proxy: xmlrpc.client.ServerProxy) -> List[Dict[str, Any]]:
+        ids = [record_id for shard in shards for record_id in shard]
+        batches = [self._read_shard(model, shard, fields, proxy) for shard in shards]
+        return _merge_in_order(ids, batches)
+
+    def _read_shard(self, model: str, shard: List[int], fields: List[str],
+                    proxy: xmlrpc.client.ServerProxy) -> List[Dict[str, Any]]:
+        with stage('odoo_read'):
+            return self.execute_kw(model, 'read', [shard], {'fields': fields}, proxy=proxy)
 
-    def execute_code(self, code_to_execute: str) -> Dict[str, Any]:
+    def execute_code(self, code_to_execute: str,
+                     on_output: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Execute dynamically generated Python code with access to the Odoo client.
         
         Args:
             code_to_execute: Python code string to execute
+            on_output: Called with each complete line printed by the code, as
+                soon as it is printed
             
         Returns:
             Dictionary containing execution results:
             - text_output: Captured print statements
             - data: Any data assigned to 'result_data' variable
             - error: Error message if execution failed
+            - trace: Summary of the XML-RPC calls the code made (when ODOO_TRACE=1)
         """
+        # Parse and compile once per distinct snippet
+        compiled = get_compiled(code_to_execute)
+        if not compiled.valid:
+            return {'text_output': '', 'data': None, 'error': compiled.error}
+        
         # Create a local namespace with the odoo client available
         local_namespace = {
             'odoo': self,
@@ -106,11 +494,9 @@ class OdooClient:
             'pd': pd
         }
         
-        # Capture stdout to get any print statements
-        stdout_capture = io.StringIO()
-        original_stdout = sys.stdout
-        
-        sys.stdout = stdout_capture
+        # Capture print statements for this execution only; other threads
+        # and coroutines keep writing to the real stdout
+        stdout_capture = _OutputCapture(MAX_OUTPUT_CHARS, on_output)
         
         result = {
             'text_output': '',
@@ -118,9 +504,15 @@ class OdooClient:
             'error': None
         }
         
+        # Trace every execute_kw call, including those on parallel read threads
+        self.tracer = CallTracer() if TRACE_ENABLED else None
+        
+        _install_stdout_router()
+        capture_token = _current_capture.set(stdout_capture)
+        started = time.perf_counter()
         try:
             # Execute the code in the local namespace
-            exec(code_to_execute, globals(), local_namespace)
+            exec(compiled.code_object, globals(), local_namespace)
             
             # Capture any return value assigned to 'result_data'
             if 'result_data' in local_namespace:
@@ -133,12 +525,136 @@ class OdooClient:
             result['error'] = str(e)
             
         finally:
-            # Restore stdout
-            sys.stdout = original_stdout
+            # Stop routing this context's output to the capture
+            _current_capture.reset(capture_token)
+            stdout_capture.flush_partial()
+            # Includes the Odoo calls the code makes; they are also timed on their own
+            observe_stage('exec', time.perf_counter() - started, failed=result['error'] is not None)
+            if self.tracer is not None:
+                result['trace'] = self.tracer.summary()
+                self.tracer = None
             
         return result
 
 
+class _OutputCapture(io.StringIO):
+    """
+    Per-execution output buffer with a size cap.
+    
+    Optionally reports every completed line to a callback as it is written.
+    """
+
+    def __init__(self, max_chars: int, on_line: Optional[Callable[[str], None]] = None):
+        super().__init__()
+        self._remaining = max_chars
+        self._truncated = False
+        self._on_line = on_line
+        self._partial = ''
+
+    def write(self, text: str) -> int:
+        if self._truncated:
+            return len(text)
+        if len(text) > self._remaining:
+            text = text[:self._remaining] + '\n... [output truncated]\n'
+            self._truncated = True
+        self._remaining -= len(text)
+        super().write(text)
+        if self._on_line:
+            lines = (self._partial + text).split('\n')
+            self._partial = lines.pop()
+            for line in lines:
+                self._on_line(line)
+        return len(text)
+
+    def flush_partial(self) -> None:
+        if self._on_line and self._partial:
+            self._on_line(self._partial)
+            self._partial = ''
+
+
+# Capture buffer of the execution running in the current thread/context
+_current_capture: ContextVar[Optional[_OutputCapture]] = ContextVar('odoo_output_capture', default=None)
+
+
+class _StdoutRouter:
+    """
+    Stand-in for sys.stdout that sends writes to the current context's capture.
+    
+    Writes from contexts without an active execution go to the original stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        capture = _current_capture.get()
+        if capture is not None:
+            return capture.write(text)
+        return self._stream.write(text)
+
+    def flush(self) -> None:
+        if _current_capture.get() is None:
+            self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_router_lock = threading.Lock()
+
+
+def _install_stdout_router() -> None:
+    """Wrap sys.stdout in a _StdoutRouter once (again if someone replaced it)."""
+    with _router_lock:
+        if not isinstance(sys.stdout, _StdoutRouter):
+            sys.stdout = _StdoutRouter(sys.stdout)
+
+
+def _merge_in_order(ids: List[int], batches: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge shard results back into the order of the original id list.
+    
+    Args:
+        ids: Ids in the order returned by search
+        batches: Records returned by each shard read
+        
+    Returns:
+        Records ordered like ids; ids deleted in the meantime are skipped
+    """
+    by_id = {record['id']: record for batch in batches for record in batch}
+    return [by_id[record_id] for record_id in ids if record_id in by_id]
+
+
+def _last_response_bytes(proxy: xmlrpc.client.ServerProxy) -> int:
+    """
+    Get the wire size of the last response received through a proxy.
+    
+    Args:
+        proxy: Object endpoint proxy; each is used by one thread at a time
+        
+    Returns:
+        Response bytes, or 0 if the transport does not count them
+    """
+    last_call = getattr(proxy("transport"), 'last_call', None) or {}
+    return last_call.get('response_bytes', 0)
+
+
+def _is_access_error(fault: xmlrpc.client.Fault) -> bool:
+    """
+    Check whether an XML-RPC fault means the cached credentials were rejected.
+    
+    Args:
+        fault: The fault raised by the Odoo server
+        
+    Returns:
+        True if re-authenticating may fix the call
+    """
+    message = f"{fault.faultCode} {fault.faultString}".lower()
+    return any(marker in message for marker in (
+        'accessdenied', 'access denied', 'session expired', 'invalid uid'
+    ))
+
+
 def get_odoo_client() -> OdooClient:
     """
     Factory function to create OdooClient with credentials from environment.
@@ -0,0 +1,269 @@
+"""
+Persistent cache of generated code keyed on normalized question text.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+# Same SQLite file as the API's chat_sessions/chat_messages tables
+DB_PATH = os.getenv(
+    'CHATBOT_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'chatbot.db')
+)
+CODE_CACHE_ENABLED = os.getenv('CODE_CACHE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+CODE_CACHE_MAX_ENTRIES = int(os.getenv('CODE_CACHE_MAX_ENTRIES', '5000'))
+
+# Hit counters are written in batches, not on every lookup
+HIT_FLUSH_EVERY = 100
+
+# Part of every question hash; bump it when normalize_question() changes meaning,
+# so entries stored under the old rules stop matching and age out
+NORMALIZATION_VERSION = 2
+
+_MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10,
+    'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+}
+_MONTH_PATTERN = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+
+# Relative date phrases mapped to one canonical spelling. Only true synonyms:
+# "past day" (the last 24 hours) is not "yesterday", and "the last week" (the
+# last 7 days) is not "last week" (the previous calendar week).
+_DATE_PHRASES = [
+    (r'\b(?:the )?(current|present|ongoing) (day)\b', 'today'),
+    (r'\b(?:the )?(current|present) (week|month|quarter|year)\b', r'this \2'),
+    (r'\b(?:the )?(previous|prior) (day)\b', 'yesterday'),
+    (r'\b(?:the )?(previous|prior) (week|month|quarter|year)\b', r'last \2'),
+    (r'\b(past|previous|prior) (\d+) (days?|weeks?|months?|years?)\b', r'last \2 \3'),
+    (r'\b(\d+) (day|week|month|quarter|year)s\b', r'\1 \2'),
+    (r'\b(this|last|next) (\d+) (day|week|month|quarter|year)s?\b', r'\1 \2 \3'),
+    (r'\bduring (this|last|next|today|yesterday)\b', r'\1'),
+]
+
+
+def _normalize_dates(text: str) -> str:
+    """Rewrite absolute dates to ISO form and relative phrases to one spelling."""
+    # 05/01/2024 or 5-1-2024 are ambiguous, so only handle unambiguous forms
+    text = re.sub(r'\b(\d{4})[/.](\d{1,2})[/.](\d{1,2})\b',
+                  lambda m: f"{m.group(1)}-{int(m.group(2)):02d}-{int(m.group(3)):02d}", text)
+    text = re.sub(rf'\b({_MONTH_PATTERN})\.? (\d{{1,2}})(?:st|nd|rd|th)?,? (\d{{4}})\b',
+                  lambda m: f"{m.group(3)}-{_MONTHS[m.group(1)]:02d}-{int(m.group(2)):02d}", text)
+    text = re.sub(rf'\b(\d{{1,2}})(?:st|nd|rd|th)? (?:of )?({_MONTH_PATTERN})\.?,? (\d{{4}})\b',
+                  lambda m: f"{m.group(3)}-{_MONTHS[m.group(2)]:02d}-{int(m.group(1)):02d}", text)
+    for pattern, replacement in _DATE_PHRASES:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so trivially different phrasings share a cache entry.
+
+    Lowercases, drops sentence punctuation (keeping comparison operators and
+    decimal points), collapses whitespace and canonicalizes date phrases.
+
+    Args:
+        question: Natural language question
+
+    Returns:
+        Normalized question text
+    """
+    text = question.lower()
+    text = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', text)
+    text = re.sub(r'[?!,;:"\'`()\[\]{}]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    text = _normalize_dates(text)
+    return text
+
+
+def prompt_version(system_message: str, model: str) -> str:
+    """
+    Fingerprint the prompt and model so prompt changes invalidate the cache.
+
+    Args:
+        system_message: System prompt sent to the LLM
+        model: LLM model identifier
+
+    Returns:
+        Short hex digest
+    """
+    return hashlib.sha256(f"{model}\n{system_message}".encode('utf-8')).hexdigest()[:16]
+
+
+class CodeCache:
+    """
+    A SQLite-backed map from normalized question to cleaned generated code.
+
+    Each thread keeps its own connection. Lookups only read; hit counts and
+    last-used times are kept in memory and written with the next put() or
+    every HIT_FLUSH_EVERY hits. Each put() drops the question's entries for
+    other prompt versions and evicts the least recently used entries beyond
+    max_entries.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_entries: int = CODE_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache and create its table if needed.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_entries: Entries kept before the least recently used are evicted (0 = unlimited)
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._hits: Dict[Tuple[str, str], int] = {}
+        self._hits_lock = threading.Lock()
+        self._init_table()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.db_path, timeout=10)
+        return connection
+
+    def _init_table(self) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS generated_code_cache (
+                    question_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    normalized_question TEXT NOT NULL,
+                    code TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (question_hash, prompt_version)
+                )
+            """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generated_code_cache_last_used "
+                "ON generated_code_cache(last_used_at)"
+            )
+
+    @staticmethod
+    def _hash(normalized: str) -> str:
+        return hashlib.sha256(f"{NORMALIZATION_VERSION}\n{normalized}".encode('utf-8')).hexdigest()
+
+    def get(self, question: str, version: str) -> Optional[str]:
+        """
+        Look up cached code for a question.
+
+        Args:
+            question: Natural language question (normalized internally)
+            version: Prompt version from prompt_version()
+
+        Returns:
+            Cached code, or None on a miss
+        """
+        question_hash = self._hash(normalize_question(question))
+        row = self._connect().execute(
+            "SELECT code FROM generated_code_cache WHERE question_hash = ? AND prompt_version = ?",
+            (question_hash, version)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._hits_lock:
+            key = (question_hash, version)
+            self._hits[key] = self._hits.get(key, 0) + 1
+            flush = sum(self._hits.values()) >= HIT_FLUSH_EVERY
+        if flush:
+            self.flush_hits()
+        return row[0]
+
+    def flush_hits(self) -> None:
+        """Write the hit counts and last-used times collected since the last flush."""
+        with self._hits_lock:
+            hits, self._hits = self._hits, {}
+        if not hits:
+            return
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "UPDATE generated_code_cache SET hits = hits + ?, last_used_at = CURRENT_TIMESTAMP "
+                "WHERE question_hash = ? AND prompt_version = ?",
+                [(count, question_hash, version) for (question_hash, version), count in hits.items()]
+            )
+
+    def put(self, question: str, version: str, code: str) -> None:
+        """
+        Store code for a question, replacing any previous entry.
+
+        Args:
+            question: Natural language question (normalized internally)
+            version: Prompt version from prompt_version()
+            code: Cleaned generated code
+        """
+        normalized = normalize_question(question)
+        question_hash = self._hash(normalized)
+        # Eviction goes by last_used_at, so bring it up to date first
+        self.flush_hits()
+        connection = self._connect()
+        with connection:
+            # The question's prompt changed (new schema or model), so older entries can never hit again
+            connection.execute(
+                "DELETE FROM generated_code_cache WHERE question_hash = ? AND prompt_version != ?",
+                (question_hash, version)
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO generated_code_cache "
+                "(question_hash, prompt_version, normalized_question, code) VALUES (?, ?, ?, ?)",
+                (question_hash, version, normalized, code)
+            )
+            if self.max_entries > 0:
+                connection.execute(
+                    "DELETE FROM generated_code_cache WHERE rowid IN ("
+                    "SELECT rowid FROM generated_code_cache ORDER BY last_used_at DESC, rowid DESC "
+                    "LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def purge_other_versions(self, version: str) -> int:
+        """
+        Delete entries generated with any other prompt version.
+
+        Args:
+            version: Prompt version to keep
+
+        Returns:
+            Number of deleted rows
+        """
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute(
+                "DELETE FROM generated_code_cache WHERE prompt_version != ?", (version,)
+            )
+        return cursor.rowcount
+
+
+_code_cache: Optional[CodeCache] = None
+
+
+def get_code_cache() -> Optional[CodeCache]:
+    """
+    Get the shared code cache, unless disabled with CODE_CACHE_ENABLED=0.
+
+    Returns:
+        CodeCache instance, or None if disabled or the database is unavailable
+    """
+    global _code_cache
+    if not CODE_CACHE_ENABLED:
+        return None
+    if _code_cache is None:
+        try:
+            _code_cache = CodeCache()
+        except Exception as e:
+            print(f"Error initializing code cache: {e}")
+            return None
+    return _code_cache
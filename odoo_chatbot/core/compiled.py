@@ -0,0 +1,164 @@
+"""
+Compiled code-object cache with a one-time static analysis of generated code.
+"""
+
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Dict, FrozenSet, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+MAX_COMPILED_ENTRIES = int(os.getenv('COMPILED_CODE_CACHE_SIZE', '256'))
+
+
+class CompiledCode:
+    """
+    A parsed and compiled snippet of generated code.
+
+    Attributes:
+        code_object: Compiled code, or None if the snippet is invalid
+        error: Syntax error message, or None if the snippet is valid
+        models: Odoo model names passed to odoo.<method>() calls
+        assigns_result_data: Whether the snippet assigns 'result_data'
+    """
+
+    __slots__ = ('code_object', 'error', 'models', 'assigns_result_data')
+
+    def __init__(self, code_object: Optional[CodeType], error: Optional[str],
+                 models: FrozenSet[str], assigns_result_data: bool):
+        self.code_object = code_object
+        self.error = error
+        self.models = models
+        self.assigns_result_data = assigns_result_data
+
+    @property
+    def valid(self) -> bool:
+        return self.code_object is not None
+
+
+def _analyze(tree: ast.AST) -> tuple:
+    models = set()
+    assigns_result_data = False
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id == 'result_data' and isinstance(node.ctx, ast.Store):
+            assigns_result_data = True
+        elif (isinstance(node, ast.Call)
+              and isinstance(node.func, ast.Attribute)
+              and isinstance(node.func.value, ast.Name)
+              and node.func.value.id == 'odoo'):
+            model = node.args[0] if node.args else next(
+                (kw.value for kw in node.keywords if kw.arg == 'model'), None
+            )
+            if isinstance(model, ast.Constant) and isinstance(model.value, str):
+                models.add(model.value)
+    return frozenset(models), assigns_result_data
+
+
+def compile_generated_code(code: str) -> CompiledCode:
+    """
+    Parse, analyze and compile a snippet without caching.
+
+    Args:
+        code: Cleaned Python code
+
+    Returns:
+        CompiledCode describing the snippet
+    """
+    try:
+        tree = ast.parse(code, filename='<generated>', mode='exec')
+        # Top-level return, break, await or nonlocal parse fine and only fail here
+        code_object = compile(tree, '<generated>', 'exec')
+    except SyntaxError as e:
+        return CompiledCode(None, f"SyntaxError: {e.msg} (line {e.lineno})", frozenset(), False)
+    except ValueError as e:
+        return CompiledCode(None, str(e), frozenset(), False)
+    models, assigns_result_data = _analyze(tree)
+    return CompiledCode(code_object, None, models, assigns_result_data)
+
+
+class CompiledCodeCache:
+    """
+    A bounded LRU cache of CompiledCode keyed by the SHA-256 of the code text.
+    """
+
+    def __init__(self, max_entries: int = MAX_COMPILED_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of compiled snippets kept
+        """
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, CompiledCode]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, code: str) -> CompiledCode:
+        """
+        Get the compiled form of a snippet, compiling it on first use.
+
+        Args:
+            code: Cleaned Python code
+
+        Returns:
+            CompiledCode describing the snippet
+        """
+        key = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return compiled
+            self._misses += 1
+
+        compiled = compile_generated_code(code)
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hits, misses and entries
+        """
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'entries': len(self._entries)}
+
+
+_compiled_cache = CompiledCodeCache()
+
+
+def get_compiled(code: str) -> CompiledCode:
+    """
+    Get the compiled form of a snippet from the shared cache.
+
+    Args:
+        code: Cleaned Python code
+
+    Returns:
+        CompiledCode describing the snippet
+    """
+    return _compiled_cache.get(code)
+
+
+def get_compiled_cache() -> CompiledCodeCache:
+    """
+    Get the shared compiled-code cache.
+
+    Returns:
+        CompiledCodeCache instance
+    """
+    return _compiled_cache
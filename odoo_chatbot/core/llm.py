@@ -0,0 +1,245 @@
+"""
+Shared OpenRouter LLM clients for code generation.
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+from .cassette import Cassette, get_cassette, llm_key
+from .metrics import count_tokens
+
+# Load environment variables
+load_dotenv(override=True)
+
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', "https://openrouter.ai/api/v1")
+MODEL_NAME = os.getenv('LLM_MODEL', "deepseek/deepseek-chat-v3-0324:free")
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '120'))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', '10'))
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '100'))
+LLM_MAX_KEEPALIVE = int(os.getenv('LLM_MAX_KEEPALIVE', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+# Characters per chunk when replaying a recorded stream
+STREAM_REPLAY_CHARS = 16
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE
+    )
+
+
+def get_llm_client() -> OpenAI:
+    """
+    Get the shared synchronous OpenRouter client.
+
+    Returns:
+        OpenAI client reusing one connection pool for every call
+    """
+    global _client
+    if _client is None:
+        _client = OpenAI(
+            base_url=LLM_BASE_URL,
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.Client(limits=_limits(), timeout=_timeout())
+        )
+    return _client
+
+
+def get_async_llm_client() -> AsyncOpenAI:
+    """
+    Get the shared asynchronous OpenRouter client.
+
+    Returns:
+        AsyncOpenAI client whose calls never block the event loop
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            base_url=LLM_BASE_URL,
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            max_retries=LLM_MAX_RETRIES,
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+        )
+    return _async_client
+
+
+def _request_kwargs(system_message: str, question: str, title: str, model: str) -> dict:
+    return {
+        'extra_headers': {
+            "HTTP-Referer": "https://localhost:8001",
+            "X-Title": title,
+        },
+        'model': model,
+        'messages': [
+            {
+                "role": "system",
+                "content": system_message
+            },
+            {
+                "role": "user",
+                "content": question
+            }
+        ]
+    }
+
+
+def _usage(response) -> dict:
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return {}
+    return {
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None)
+    }
+
+
+def _count_usage(response) -> dict:
+    usage = _usage(response)
+    if usage:
+        count_tokens(usage['prompt_tokens'], usage['completion_tokens'])
+    return usage
+
+
+def _replay(cassette: Cassette, key: str, model: str) -> dict:
+    entry = cassette.lookup(key, f"LLM completion ({model})")
+    count_tokens(entry.get('prompt_tokens'), entry.get('completion_tokens'))
+    return entry
+
+
+def complete(system_message: str, question: str, title: str = "Odoo Chatbot",
+             model: str = MODEL_NAME) -> str:
+    """
+    Run a chat completion synchronously.
+
+    Args:
+        system_message: System prompt
+        question: User question
+        title: X-Title header sent to OpenRouter
+        model: Model identifier
+
+    Returns:
+        Completion text
+    """
+    cassette = get_cassette()
+    key = llm_key(model, system_message, question) if cassette else None
+    if cassette and cassette.replaying:
+        entry = _replay(cassette, key, model)
+        time.sleep(entry['delay'])
+        return entry['text']
+
+    started = time.perf_counter()
+    completion = get_llm_client().chat.completions.create(
+        **_request_kwargs(system_message, question, title, model)
+    )
+    usage = _count_usage(completion)
+    content = completion.choices[0].message.content
+    if cassette:
+        cassette.record('llm', key, model, time.perf_counter() - started, content, **usage)
+    return content
+
+
+async def acomplete(system_message: str, question: str, title: str = "Odoo Chatbot",
+                    model: str = MODEL_NAME) -> str:
+    """
+    Run a chat completion without blocking the event loop.
+
+    Args:
+        system_message: System prompt
+        question: User question
+        title: X-Title header sent to OpenRouter
+        model: Model identifier
+
+    Returns:
+        Completion text
+    """
+    cassette = get_cassette()
+    key = llm_key(model, system_message, question) if cassette else None
+    if cassette and cassette.replaying:
+        entry = _replay(cassette, key, model)
+        await asyncio.sleep(entry['delay'])
+        return entry['text']
+
+    started = time.perf_counter()
+    completion = await get_async_llm_client().chat.completions.create(
+        **_request_kwargs(system_message, question, title, model)
+    )
+    usage = _count_usage(completion)
+    content = completion.choices[0].message.content
+    if cassette:
+        cassette.record('llm', key, model, time.perf_counter() - started, content, **usage)
+    return content
+
+
+async def astream(system_message: str, question: str, title: str = "Odoo Chatbot",
+                  model: str = MODEL_NAME) -> AsyncIterator[str]:
+    """
+    Stream a chat completion token by token.
+
+    Args:
+        system_message: System prompt
+        question: User question
+        title: X-Title header sent to OpenRouter
+        model: Model identifier
+
+    Yields:
+        Content deltas as they arrive
+    """
+    cassette = get_cassette()
+    key = llm_key(model, system_message, question) if cassette else None
+    if cassette and cassette.replaying:
+        entry = _replay(cassette, key, model)
+        # First token after the recorded wait, the rest spread over the remaining time
+        first_delay = min(entry['delay'], entry.get('first_token_seconds', 0.0) * cassette.latency_scale)
+        await asyncio.sleep(first_delay)
+        text = entry['text']
+        pieces = [text[start:start + STREAM_REPLAY_CHARS] for start in range(0, len(text), STREAM_REPLAY_CHARS)]
+        gap = (entry['delay'] - first_delay) / max(1, len(pieces) - 1)
+        for index, piece in enumerate(pieces):
+            if index and gap:
+                await asyncio.sleep(gap)
+            yield piece
+        return
+
+    started = time.perf_counter()
+    first_token = None
+    pieces = []
+    usage = {}
+    stream = await get_async_llm_client().chat.completions.create(
+        stream=True, stream_options={"include_usage": True},
+        **_request_kwargs(system_message, question, title, model)
+    )
+    async for chunk in stream:
+        # The final chunk carries usage and no choices
+        usage = _count_usage(chunk) or usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            pieces.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    if cassette:
+        cassette.record('llm', key, model, time.perf_counter() - started, ''.join(pieces),
+                        first_token_seconds=round(first_token or 0.0, 6), **usage)
+
+
+async def close_llm_clients() -> None:
+    """Close the shared clients' connection pools (call on app shutdown)."""
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,342 @@
+"""
+Per-stage latency histograms and counters, rendered in Prometheus text format.
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    """
+    A monotonically increasing count per label combination.
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labelvalues) -> None:
+        """
+        Add to the counter.
+
+        Args:
+            amount: Non-negative increment
+            *labelvalues: One value per label name
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}_total{_format_labels(self.labelnames, labels)} {value:g}"
+            for labels, value in sorted(values.items())
+        ]
+
+
+class Histogram:
+    """
+    Cumulative bucket counts, sum and count per label combination.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per labels: [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value (seconds for durations)
+            *labelvalues: One value per label name
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {labels: list(state) for labels, state in self._values.items()}
+        lines = []
+        for labels, state in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    A set of metrics rendered together for a /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        for metric in self._metrics:
+            name = metric.name + ('_total' if metric.kind == 'counter' else '')
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'chatbot_stage_duration_seconds', 'Time spent in each pipeline stage.', ('stage',)
+)
+STAGE_ERRORS = registry.counter('chatbot_stage_errors', 'Failed calls per pipeline stage.', ('stage',))
+LLM_TOKENS = registry.counter('chatbot_llm_tokens', 'LLM tokens used, by prompt or completion.', ('type',))
+ODOO_RECORDS = registry.counter('chatbot_odoo_records', 'Records returned by Odoo reads.', ('model',))
+
+
+class StageTimings:
+    """
+    Everything recorded while one request runs, for its own timings block.
+
+    Events are (kind, label, value) tuples, so a sandbox worker can send them
+    back to the parent process, which replays them into its own metrics.
+    """
+
+    def __init__(self):
+        self.events: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def active(self) -> Iterator["StageTimings"]:
+        """
+        Make this the recorder of the current context for the block.
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def run(self, fn: Callable, *args) -> Any:
+        """
+        Call fn with this recorder active, e.g. on an executor thread.
+
+        Args:
+            fn: Function to call
+            *args: Positional arguments for fn
+
+        Returns:
+            Whatever fn returns
+        """
+        with self.active():
+            return fn(*args)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Get per-request totals.
+
+        Returns:
+            Dictionary of '<stage>_ms' (summed milliseconds), 'odoo_records'
+            and 'llm_<type>_tokens'
+        """
+        totals: Dict[str, float] = {}
+        for kind, label, value in self.events:
+            if kind == 'duration':
+                key, value = f"{label}_ms", value * 1000
+            elif kind == 'records':
+                key = 'odoo_records'
+            elif kind == 'tokens':
+                key = f"llm_{label}_tokens"
+            else:
+                continue
+            totals[key] = totals.get(key, 0.0) + value
+        return {key: round(value, 1) for key, value in totals.items()}
+
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar('stage_timings', default=None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    """
+    Get the recorder of the request running in this context, if any.
+
+    Returns:
+        StageTimings or None
+    """
+    return _current.get()
+
+
+def observe_stage(name: str, seconds: float, failed: bool = False,
+                  timings: Optional[StageTimings] = None) -> None:
+    """
+    Record one completed stage.
+
+    Args:
+        name: Stage name, e.g. 'llm' or 'odoo_search_read'
+        seconds: Time the stage took
+        failed: Whether the stage failed
+        timings: Recorder to add to (defaults to the current one)
+    """
+    timings = timings or _current.get()
+    if timings is not None:
+        timings.events.append(('duration', name, seconds))
+        if failed:
+            timings.events.append(('error', name, 1))
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, name)
+        if failed:
+            STAGE_ERRORS.inc(1, name)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a block as one pipeline stage; an exception counts as a stage error.
+
+    Args:
+        name: Stage name
+    """
+    if not METRICS_ENABLED and _current.get() is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_stage(name, time.perf_counter() - started, failed=True)
+        raise
+    observe_stage(name, time.perf_counter() - started)
+
+
+def timed(name: str) -> Callable:
+    """
+    Decorator form of stage().
+
+    Args:
+        name: Stage name
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_records(model: str, count: int) -> None:
+    """
+    Count records returned by an Odoo read.
+
+    Args:
+        model: The Odoo model name
+        count: Number of records returned
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.events.append(('records', model, count))
+    if METRICS_ENABLED:
+        ODOO_RECORDS.inc(count, model)
+
+
+def count_tokens(prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    """
+    Count LLM tokens reported in a completion's usage.
+
+    Args:
+        prompt_tokens: Prompt tokens, if reported
+        completion_tokens: Completion tokens, if reported
+    """
+    timings = _current.get()
+    for kind, count in (('prompt', prompt_tokens), ('completion', completion_tokens)):
+        if not count:
+            continue
+        if timings is not None:
+            timings.events.append(('tokens', kind, count))
+        if METRICS_ENABLED:
+            LLM_TOKENS.inc(count, kind)
+
+
+def replay(events: List[Tuple[str, str, float]]) -> None:
+    """
+    Record events captured by a StageTimings in another process.
+
+    Args:
+        events: StageTimings.events from the other process
+    """
+    for kind, label, value in events:
+        if kind == 'duration':
+            observe_stage(label, value)
+        elif kind == 'error':
+            timings = _current.get()
+            if timings is not None:
+                timings.events.append(('error', label, value))
+            if METRICS_ENABLED:
+                STAGE_ERRORS.inc(value, label)
+        elif kind == 'records':
+            count_records(label, int(value))
+        elif kind == 'tokens':
+            count_tokens(*((value, None) if label == 'prompt' else (None, value)))
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Process-wide pool of authenticated Odoo clients.
+"""
+
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+from .client import OdooClient
+
+# Load environment variables
+load_dotenv(override=True)
+
+DEFAULT_POOL_SIZE = int(os.getenv('ODOO_POOL_SIZE', '8'))
+DEFAULT_ACQUIRE_TIMEOUT = float(os.getenv('ODOO_POOL_TIMEOUT', '30'))
+
+
+class OdooClientPool:
+    """
+    A bounded pool of long-lived, authenticated OdooClient instances.
+
+    Each client keeps its cached uid, so handing one out skips the
+    authenticate() round trip. A client is used by one caller at a time
+    because xmlrpc.client proxies are not thread-safe.
+    """
+
+    def __init__(self, url: Optional[str] = None, db: Optional[str] = None,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 max_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_ACQUIRE_TIMEOUT):
+        """
+        Initialize the pool. Clients are created lazily on first use.
+
+        Args:
+            url: Odoo instance URL (defaults to ODOO_URL env var)
+            db: Database name (defaults to ODOO_DB env var)
+            username: Username (defaults to ODOO_USERNAME env var)
+            password: Password (defaults to ODOO_PASSWORD env var)
+            max_size: Maximum number of clients alive at once
+            timeout: Seconds to wait for a free client before giving up
+        """
+        self.url = url
+        self.db = db
+        self.username = username
+        self.password = password
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+
+        self._idle: List[OdooClient] = []
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self._hits = 0
+        self._misses = 0
+
+    def _create_client(self) -> OdooClient:
+        return OdooClient(self.url, self.db, self.username, self.password)
+
+    def acquire(self) -> OdooClient:
+        """
+        Take an authenticated client from the pool, creating one if needed.
+
+        Returns:
+            An OdooClient reserved for the caller until release()
+
+        Raises:
+            Exception: If no client frees up within the timeout, or if
+                creating a new client fails
+        """
+        with self._lock:
+            while not self._idle and self._in_use >= self.max_size:
+                if not self._lock.wait(self.timeout):
+                    raise Exception("Timed out waiting for a free Odoo connection")
+            self._in_use += 1
+            if self._idle:
+                self._hits += 1
+                return self._idle.pop()
+            self._misses += 1
+
+        # Authenticate outside the lock so other callers are not blocked
+        try:
+            return self._create_client()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, client: OdooClient, discard: bool = False) -> None:
+        """
+        Return a client to the pool.
+
+        Args:
+            client: A client previously returned by acquire()
+            discard: Drop the client instead of keeping it for reuse
+        """
+        with self._lock:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append(client)
+            self._lock.notify()
+
+    @contextmanager
+    def client(self) -> Iterator[OdooClient]:
+        """
+        Context manager that acquires a client and always releases it.
+
+        The client is discarded when the block raises anything, including
+        SystemExit from generated code.
+
+        Yields:
+            An authenticated OdooClient
+        """
+        odoo = self.acquire()
+        try:
+            yield odoo
+        except BaseException:
+            self.release(odoo, discard=True)
+            raise
+        else:
+            self.release(odoo)
+
+    def clear(self) -> None:
+        """Drop all idle clients so the next acquire() re-authenticates."""
+        with self._lock:
+            self._idle.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get pool usage counters.
+
+        Returns:
+            Dictionary with hits, misses, idle, in_use and max_size
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'max_size': self.max_size
+            }
+
+
+_pools: Dict[Tuple[Optional[str], Optional[str], Optional[str], str], OdooClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_client_pool(url: Optional[str] = None, db: Optional[str] = None,
+                    username: Optional[str] = None,
+                    password: Optional[str] = None) -> OdooClientPool:
+    """
+    Get the process-wide pool for a set of credentials.
+
+    Args:
+        url: Odoo instance URL (defaults to ODOO_URL env var)
+        db: Database name (defaults to ODOO_DB env var)
+        username: Username (defaults to ODOO_USERNAME env var)
+        password: Password (defaults to ODOO_PASSWORD env var)
+
+    Returns:
+        Shared OdooClientPool instance
+    """
+    # Keyed on a hash of the password too, so changed credentials never reuse old sessions
+    password_hash = hashlib.sha256((password or os.getenv('ODOO_PASSWORD') or '').encode()).hexdigest()
+    key = (url or os.getenv('ODOO_URL'), db or os.getenv('ODOO_DB'),
+           username or os.getenv('ODOO_USERNAME'), password_hash)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = OdooClientPool(url, db, username, password)
+            _pools[key] = pool
+        return pool
@@ -2,30 +2,40 @@
 Natural language query processing for Odoo data.
 """
 
-import os
-from typing import Dict, Any
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
-from .client import OdooClient
+from .code_cache import get_code_cache, prompt_version
+from .compiled import get_compiled
+from .llm import MODEL_NAME, acomplete, astream, complete
+from .metrics import StageTimings, observe_stage, stage
+from .pool import get_client_pool
+from .sandbox import get_sandbox_pool
+from .schema import get_schema_registry
 
 # Load environment variables
 load_dotenv(override=True)
 
-
-def get_system_message() -> str:
-    """
-    Get the system message for the LLM to generate Odoo code.
-    
-    Returns:
-        System message string with instructions for code generation
-    """
-    return """
+_BASE_SYSTEM_MESSAGE = """
     You are an expert at generating Odoo XML-RPC query code based on natural language questions.
     Given a question, create Python code that queries an Odoo database using XML-RPC to answer it.
     
     CONTEXT:
     You have access to an OdooClient class with XML-RPC connectivity:
-    - odoo.search_read(model, domain, fields, limit) - Primary method for querying
+    - odoo.search_read(model, domain, fields, limit, offset, order) - Primary method for querying
+    - odoo.search_count(model, domain) - Number of matching records, without reading them
+    - odoo.search(model, domain, limit, offset, order) - Matching record ids only
+    - odoo.read_group(model, domain, fields, groupby, limit, offset, orderby, lazy) - Aggregates
+      computed by Odoo, one row per group, e.g. fields=['amount_total:sum'],
+      groupby=['partner_id'] or groupby=['date_order:month']; each row has a
+      '<groupby>_count' (or '__count' with lazy=False)
+    - odoo.iter_search_read(model, domain, fields, batch_size, order) - Generator yielding
+      records batch by batch; use it instead of limit=0 when scanning large tables
+    - odoo.parallel_search_read(model, domain, fields, limit, order) - Reads large result
+      sets over several connections at once; use it when full records are needed in memory
     - Pre-imported libraries: datetime, timedelta, pandas (as pd)
     
     EXECUTION PATTERN:
@@ -38,9 +48,12 @@ def get_system_message() -> str:
     1. Store main result as 'result_data' variable
     2. Print user-friendly summary using print() statements
     3. Use parameter names 'fields' and 'limit' in search_read calls
-    4. Use pandas for data manipulation when needed
+    4. Use pandas for data manipulation when needed; for large scans, aggregate while
+       iterating iter_search_read instead of loading every record at once
     5. Provide plain text summaries, not pandas/complex formats
     6. Answer only the specific question asked
+    7. For counts use search_count, and for totals, averages or per-group figures use
+       read_group, instead of reading records and aggregating them in Python
     
     ODOO MODEL PATTERNS:
     - Partners: 'res.partner'
@@ -58,41 +71,94 @@ def get_system_message() -> str:
     """
 
 
-def get_ai_response(question: str) -> str:
+def get_system_message(question: Optional[str] = None) -> str:
+    """
+    Get the system message for the LLM to generate Odoo code.
+    
+    Args:
+        question: When given, the fields of the models the question mentions
+            are appended from the schema registry
+        
+    Returns:
+        System message string with instructions for code generation
+    """
+    return _BASE_SYSTEM_MESSAGE + (_schema_section(question) if question else '')
+
+
+def _schema_section(question: str) -> str:
+    registry = get_schema_registry()
+    if registry is None:
+        return ''
+    try:
+        described = registry.describe(get_client_pool(), question)
+    except Exception as e:
+        # The prompt still works without field lists
+        print(f"Error loading Odoo schema: {str(e)}")
+        return ''
+    if not described:
+        return ''
+    return (
+        "\n    FIELDS OF THE RELEVANT MODELS IN THIS DATABASE (use these exact field names):\n"
+        + "\n".join(f"    {line}" for line in described.splitlines())
+        + "\n"
+    )
+
+
+async def _run_blocking(executor: Optional[Executor], fn: Callable, *args) -> Any:
+    # On the caller's executor and in a copy of its context, so stage() timings count on the request
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, contextvars.copy_context().run, fn, *args)
+
+
+async def _cached_code_async(question: str, use_code_cache: bool, system_message: str,
+                             executor: Optional[Executor] = None) -> Optional[str]:
+    if not use_code_cache or get_code_cache() is None:
+        return None
+    # The lookup is a SQLite read, so it runs off the event loop
+    return await _run_blocking(executor, _cached_code, question, use_code_cache, system_message)
+
+
+async def _system_message_async(question: str, executor: Optional[Executor] = None) -> str:
+    # A schema refresh is blocking XML-RPC, so it runs off the event loop
+    return await _run_blocking(executor, get_system_message, question)
+
+
+def get_ai_response(question: str, system_message: Optional[str] = None) -> str:
     """
     Get response from OpenRouter AI model.
     
     Args:
         question: Natural language question about Odoo data
+        system_message: Prompt already built with get_system_message(question)
         
     Returns:
         Generated Python code string
     """
     try:
-        # Initialize OpenRouter client
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-        )
+        system_message = system_message or get_system_message(question)
+        with stage('llm'):
+            return complete(system_message, question)
+    except Exception as e:
+        return f"Error generating code: {str(e)}"
+
+
+async def get_ai_response_async(question: str, system_message: Optional[str] = None,
+                                executor: Optional[Executor] = None) -> str:
+    """
+    Get response from OpenRouter AI model without blocking the event loop.
+    
+    Args:
+        question: Natural language question about Odoo data
+        system_message: Prompt already built with get_system_message(question)
+        executor: Executor for building the prompt when system_message is not given
         
-        completion = client.chat.completions.create(
-            extra_headers={
-                "HTTP-Referer": "https://localhost:8001",
-                "X-Title": "Odoo Chatbot",
-            },
-            model="deepseek/deepseek-chat-v3-0324:free",
-            messages=[
-                {
-                    "role": "system",
-                    "content": get_system_message()
-                },
-                {
-                    "role": "user",
-                    "content": question
-                }
-            ]
-        )
-        return completion.choices[0].message.content
+    Returns:
+        Generated Python code string
+    """
+    try:
+        system_message = system_message or await _system_message_async(question, executor)
+        with stage('llm'):
+            return await acomplete(system_message, question)
     except Exception as e:
         return f"Error generating code: {str(e)}"
 
@@ -118,12 +184,156 @@ def clean_generated_code(code: str) -> str:
     return code
 
 
-def execute_odoo_query(question: str) -> Dict[str, Any]:
+def _error_result(question: str, error: str, code: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'success': False,
+        'error': error,
+        'question': question,
+        'code': code,
+        'text_response': None,
+        'data': None
+    }
+
+
+def _with_stage_info(result: Dict[str, Any], code_cached: bool, generate_seconds: float,
+                     execute_seconds: float, timings: Optional[StageTimings] = None) -> Dict[str, Any]:
+    result['code_cached'] = code_cached
+    result['llm_model'] = MODEL_NAME
+    result['timings'] = {
+        'generate_ms': round(generate_seconds * 1000, 1),
+        'execute_ms': round(execute_seconds * 1000, 1),
+        'total_ms': round((generate_seconds + execute_seconds) * 1000, 1)
+    }
+    if timings is not None:
+        # Per-stage totals: llm_ms, odoo_auth_ms, odoo_search_read_ms, exec_ms, odoo_records...
+        result['timings'].update(timings.summary())
+    return result
+
+
+def _cached_code(question: str, use_code_cache: bool, system_message: str) -> Optional[str]:
+    code_cache = get_code_cache() if use_code_cache else None
+    if code_cache is None:
+        return None
+    # The prompt includes the question's schema section, so changed fields miss the cache
+    return code_cache.get(question, prompt_version(system_message, MODEL_NAME))
+
+
+def generate_code(question: str, use_code_cache: bool = True) -> Tuple[str, bool, str]:
+    """
+    Get cleaned code for a question, from the code cache or the LLM.
+    
+    Args:
+        question: Natural language question about Odoo data
+        use_code_cache: Look the question up in the generated-code cache first
+        
+    Returns:
+        Tuple of (cleaned code, whether it came from the cache, system message used)
+    """
+    system_message = get_system_message(question)
+    cached = _cached_code(question, use_code_cache, system_message)
+    if cached is not None:
+        return cached, True, system_message
+    return clean_generated_code(get_ai_response(question, system_message)), False, system_message
+
+
+async def generate_code_async(question: str, use_code_cache: bool = True,
+                              executor: Optional[Executor] = None) -> Tuple[str, bool, str]:
+    """
+    Async variant of generate_code() that awaits the LLM.
+    
+    Args:
+        question: Natural language question about Odoo data
+        use_code_cache: Look the question up in the generated-code cache first
+        executor: Executor for the schema and code-cache lookups
+        
+    Returns:
+        Tuple of (cleaned code, whether it came from the cache, system message used)
+    """
+    system_message = await _system_message_async(question, executor)
+    cached = await _cached_code_async(question, use_code_cache, system_message, executor)
+    if cached is not None:
+        return cached, True, system_message
+    return clean_generated_code(await get_ai_response_async(question, system_message)), False, system_message
+
+
+def execute_generated_code(question: str, cleaned_code: str, code_cached: bool = False,
+                           use_code_cache: bool = True,
+                           on_output: Optional[Callable[[str], None]] = None,
+                           system_message: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Execute already generated code against Odoo and build the query result.
+    
+    Args:
+        question: Natural language question the code answers
+        cleaned_code: Code returned by generate_code()
+        code_cached: Whether the code came from the generated-code cache
+        use_code_cache: Store the code in the cache if it runs cleanly
+        on_output: Called with each line the code prints, as it is printed
+        system_message: Prompt the code was generated with, which keys the
+            cache entry (defaults to rebuilding it for the question)
+        
+    Returns:
+        Same dictionary as execute_odoo_query()
+    """
+    # Reject code that cannot run before paying for an Odoo connection
+    compiled = get_compiled(cleaned_code)
+    if not compiled.valid:
+        return _error_result(question, f'Generated code is invalid: {compiled.error}', cleaned_code)
+
+    sandbox = get_sandbox_pool()
+    if sandbox is not None:
+        # Run in an isolated, pre-warmed worker process
+        try:
+            result = sandbox.execute(cleaned_code, on_output)
+        except Exception as e:
+            return _error_result(question, f'Error executing code: {str(e)}', cleaned_code)
+    else:
+        # Borrow an authenticated client from the shared pool; it goes back however the code ends
+        connected = False
+        try:
+            with get_client_pool().client() as odoo:
+                connected = True
+                result = odoo.execute_code(cleaned_code, on_output)
+        except SystemExit as e:
+            # exit() in generated code must not end the worker thread
+            return _error_result(question, f'Error executing code: generated code called exit({e.code})',
+                                 cleaned_code)
+        except Exception as e:
+            if not connected:
+                return _error_result(question, f'Failed to connect to Odoo: {str(e)}', cleaned_code)
+            return _error_result(question, f'Error executing code: {str(e)}', cleaned_code)
+
+    # Only remember code that ran cleanly
+    code_cache = get_code_cache() if use_code_cache else None
+    if code_cache and not code_cached and not result.get('error'):
+        if system_message is None:
+            system_message = get_system_message(question)
+        code_cache.put(question, prompt_version(system_message, MODEL_NAME), cleaned_code)
+
+    # Prepare the response
+    response = {
+        'success': True,
+        'question': question,
+        'code': cleaned_code,
+        'text_response': result['text_output'],
+        'data': result['data'],
+        'error': result.get('error'),
+        'code_cached': code_cached,
+        'odoo_models': sorted(compiled.models),
+        'trace': result.get('trace')
+    }
+    
+    return response
+
+
+def execute_odoo_query(question: str, use_code_cache: bool = True) -> Dict[str, Any]:
     """
     Main function to generate and execute Odoo query code based on natural language question.
     
     Args:
         question: Natural language question about Odoo data
+        use_code_cache: Reuse code previously generated for the same normalized
+            question instead of calling the LLM
         
     Returns:
         Dictionary containing:
@@ -133,66 +343,169 @@ def execute_odoo_query(question: str) -> Dict[str, Any]:
         - text_response: Human-readable output from code execution
         - data: Structured data returned from the query
         - error: Error message if any
+        - code_cached: Whether the code came from the generated-code cache
+        - odoo_models: Odoo models the code queries, from static analysis
+        - trace: XML-RPC calls grouped by query shape, with suspected N+1 loops
+        - llm_model: LLM model the code was generated with
+        - timings: Milliseconds spent generating and executing the code, plus
+          per-stage totals (llm_ms, odoo_search_read_ms, exec_ms, ...)
     """
     try:
         if not question or not question.strip():
-            return {
-                'success': False,
-                'error': 'Question cannot be empty',
-                'question': question,
-                'code': None,
-                'text_response': None,
-                'data': None
-            }
-
-        # Generate code using LLM
-        generated_code = get_ai_response(question)
-        cleaned_code = clean_generated_code(generated_code)
-
-        # Create Odoo client
-        try:
-            odoo = OdooClient()
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Failed to connect to Odoo: {str(e)}',
-                'question': question,
-                'code': cleaned_code,
-                'text_response': None,
-                'data': None
-            }
-
-        # Execute the generated code
-        try:
-            result = odoo.execute_code(cleaned_code)
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f'Error executing code: {str(e)}',
-                'question': question,
-                'code': cleaned_code,
-                'text_response': None,
-                'data': None
-            }
-
-        # Prepare the response
-        response = {
-            'success': True,
-            'question': question,
-            'code': cleaned_code,
-            'text_response': result['text_output'],
-            'data': result['data'],
-            'error': result.get('error')
-        }
+            return _error_result(question, 'Question cannot be empty')
+
+        timings = StageTimings()
+        started = time.perf_counter()
+        cleaned_code, code_cached, system_message = timings.run(generate_code, question, use_code_cache)
+        generated = time.perf_counter()
+        result = timings.run(
+            execute_generated_code, question, cleaned_code, code_cached, use_code_cache, None, system_message
+        )
+        return _with_stage_info(
+            result, code_cached, generated - started, time.perf_counter() - generated, timings
+        )
+        
+    except Exception as e:
+        return _error_result(question, f'Unexpected error: {str(e)}')
+
+
+def rerun_stored_code(question: str, code: str) -> Dict[str, Any]:
+    """
+    Execute previously generated code against current Odoo data, skipping the LLM.
+    
+    Args:
+        question: Question the code was generated for
+        code: Stored cleaned code
+        
+    Returns:
+        Same dictionary as execute_odoo_query(), with code_cached set
+    """
+    try:
+        if not code or not code.strip():
+            return _error_result(question, 'No stored code to run')
+
+        timings = StageTimings()
+        started = time.perf_counter()
+        result = timings.run(execute_generated_code, question, code, True, False)
+        return _with_stage_info(result, True, 0.0, time.perf_counter() - started, timings)
         
-        return response
+    except Exception as e:
+        return _error_result(question, f'Unexpected error: {str(e)}', code)
+
+
+async def execute_odoo_query_async(question: str, use_code_cache: bool = True,
+                                   executor: Optional[Executor] = None) -> Dict[str, Any]:
+    """
+    Async variant of execute_odoo_query() that never blocks the event loop.
+    
+    The LLM call is awaited; the XML-RPC calls and exec() run on an executor.
+    
+    Args:
+        question: Natural language question about Odoo data
+        use_code_cache: Reuse code previously generated for the same normalized
+            question instead of calling the LLM
+        executor: Executor for the blocking lookups and execution step
+            (defaults to the event loop's default executor)
         
+    Returns:
+        Same dictionary as execute_odoo_query()
+    """
+    try:
+        if not question or not question.strip():
+            return _error_result(question, 'Question cannot be empty')
+
+        timings = StageTimings()
+        started = time.perf_counter()
+        with timings.active():
+            cleaned_code, code_cached, system_message = await generate_code_async(
+                question, use_code_cache, executor
+            )
+        generated = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            executor, timings.run, execute_generated_code, question, cleaned_code, code_cached,
+            use_code_cache, None, system_message
+        )
+        return _with_stage_info(
+            result, code_cached, generated - started, time.perf_counter() - generated, timings
+        )
+        
+    except Exception as e:
+        return _error_result(question, f'Unexpected error: {str(e)}')
+
+
+async def stream_odoo_query(question: str, use_code_cache: bool = True,
+                            executor: Optional[Executor] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Generate and execute Odoo query code, reporting progress as it happens.
+    
+    Args:
+        question: Natural language question about Odoo data
+        use_code_cache: Reuse code previously generated for the same normalized
+            question instead of calling the LLM
+        executor: Executor for the blocking lookups and execution step
+        
+    Yields:
+        (event, payload) tuples, in order:
+        - ('token', str) for each LLM content delta (skipped on cache hits)
+        - ('code', {'code': str, 'code_cached': bool}) once the code is ready
+        - ('stdout', str) for each line printed by the executing code
+        - ('result', dict) with the same dictionary as execute_odoo_query()
+    """
+    if not question or not question.strip():
+        yield 'result', _error_result(question, 'Question cannot be empty')
+        return
+
+    try:
+        timings = StageTimings()
+        started = time.perf_counter()
+        # No yield inside the block, so the recorder cannot leak into the consumer
+        with timings.active():
+            system_message = await _system_message_async(question, executor)
+            cleaned_code = await _cached_code_async(question, use_code_cache, system_message, executor)
+        code_cached = cleaned_code is not None
+        if not code_cached:
+            chunks = []
+            # Timed by hand: a context variable set here would leak into the consumer between yields
+            llm_started = time.perf_counter()
+            try:
+                async for token in astream(system_message, question):
+                    chunks.append(token)
+                    yield 'token', token
+                generated_code = ''.join(chunks)
+                observe_stage('llm', time.perf_counter() - llm_started, timings=timings)
+            except Exception as e:
+                generated_code = f"Error generating code: {str(e)}"
+                observe_stage('llm', time.perf_counter() - llm_started, failed=True, timings=timings)
+            cleaned_code = clean_generated_code(generated_code)
+        generated = time.perf_counter()
+        yield 'code', {'code': cleaned_code, 'code_cached': code_cached}
+
+        # Forward printed lines from the worker thread to this coroutine
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+
+        def on_output(line: str) -> None:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+
+        execution = loop.run_in_executor(
+            executor, timings.run, execute_generated_code, question, cleaned_code, code_cached,
+            use_code_cache, on_output, system_message
+        )
+        while not execution.done() or not lines.empty():
+            getter = asyncio.ensure_future(lines.get())
+            await asyncio.wait({getter, execution}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield 'stdout', getter.result()
+            else:
+                getter.cancel()
+        # Lines scheduled just before completion are delivered on the next loop turn
+        await asyncio.sleep(0)
+        while not lines.empty():
+            yield 'stdout', lines.get_nowait()
+        yield 'result', _with_stage_info(
+            execution.result(), code_cached, generated - started, time.perf_counter() - generated, timings
+        )
+
     except Exception as e:
-        return {
-            'success': False,
-            'error': f'Unexpected error: {str(e)}',
-            'question': question,
-            'code': None,
-            'text_response': None,
-            'data': None
-        } 
\ No newline at end of file
+        yield 'result', _error_result(question, f'Unexpected error: {str(e)}')
@@ -0,0 +1,345 @@
+"""
+Pre-forked worker processes for running generated code in isolation.
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+from .metrics import StageTimings, replay
+
+# Load environment variables
+load_dotenv(override=True)
+
+SANDBOX_ENABLED = os.getenv('SANDBOX_ENABLED', '0').lower() in ('1', 'true', 'yes')
+SANDBOX_WORKERS = int(os.getenv('SANDBOX_WORKERS', '2'))
+SANDBOX_TIMEOUT = float(os.getenv('SANDBOX_TIMEOUT', '60'))
+SANDBOX_MAX_RSS_MB = int(os.getenv('SANDBOX_MAX_RSS_MB', '1024'))
+SANDBOX_MAX_JOBS = int(os.getenv('SANDBOX_MAX_JOBS', '500'))
+
+_POLL_INTERVAL = 0.05
+
+
+def _worker_main(conn, client_kwargs: Dict[str, Any]) -> None:
+    """
+    Worker process loop: keep a warm client, run jobs until told to stop.
+
+    Jobs arrive as (job_id, code, stream_output). Messages sent back to the
+    parent are ('ready', None, error), ('line', job_id, text) and
+    ('result', job_id, dict).
+    """
+    # Heavy imports happen once per worker, not once per job
+    import pandas  # noqa: F401
+    from .client import OdooClient
+
+    client = None
+    try:
+        client = OdooClient(**client_kwargs)
+        conn.send(('ready', None, None))
+    except Exception as e:
+        # Still serve jobs; they report the connection error
+        conn.send(('ready', None, str(e)))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        job_id, code, stream_output = job
+        if client is None:
+            try:
+                client = OdooClient(**client_kwargs)
+            except Exception as e:
+                conn.send(('result', job_id, {
+                    'text_output': '',
+                    'data': None,
+                    'error': f'Failed to connect to Odoo: {str(e)}'
+                }))
+                continue
+
+        on_output = (lambda line: conn.send(('line', job_id, line))) if stream_output else None
+        timings = StageTimings()
+        result = timings.run(client.execute_code, code, on_output)
+        # The parent replays these into its own metrics and request timings
+        result['stage_events'] = timings.events
+        try:
+            conn.send(('result', job_id, result))
+        except Exception as e:
+            # result_data could not be pickled; keep the text output
+            result['data'] = None
+            result['error'] = result['error'] or f'Result data could not be returned: {str(e)}'
+            conn.send(('result', job_id, result))
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    def __init__(self, context, client_kwargs: Dict[str, Any]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, client_kwargs), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> None:
+        """
+        Wait for the worker's start-up message.
+
+        Raises:
+            Exception: If the worker did not start within timeout seconds
+        """
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise Exception(f'Sandbox worker did not start within {timeout:g} seconds')
+        kind = self.conn.recv()[0]
+        if kind != 'ready':
+            raise Exception(f"Unexpected '{kind}' message from a starting sandbox worker")
+        self.ready = True
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    A pool of pre-started worker processes that execute generated code.
+
+    Each worker imports pandas and authenticates an OdooClient once at
+    start-up. A job that exceeds its wall-clock or RSS limit gets its worker
+    killed and replaced, so one runaway query cannot take the API down. A
+    replacement that fails to start is retried by the next execute().
+    """
+
+    def __init__(self, workers: int = SANDBOX_WORKERS, timeout: float = SANDBOX_TIMEOUT,
+                 max_rss_mb: int = SANDBOX_MAX_RSS_MB, max_jobs: int = SANDBOX_MAX_JOBS,
+                 client_kwargs: Optional[Dict[str, Any]] = None):
+        """
+        Start the worker processes.
+
+        Args:
+            workers: Number of worker processes
+            timeout: Wall-clock seconds allowed per job
+            max_rss_mb: Resident memory allowed per worker (0 = unlimited)
+            max_jobs: Recycle a worker after this many jobs (0 = never)
+            client_kwargs: OdooClient arguments (defaults to env credentials)
+        """
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.max_jobs = max_jobs
+        self.client_kwargs = client_kwargs or {}
+
+        methods = multiprocessing.get_all_start_methods()
+        # forkserver forks from a clean single-threaded process, unlike the API
+        self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        if 'forkserver' in methods:
+            self._context.set_forkserver_preload(['pandas'])
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._all: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._stats = {'jobs': 0, 'timeouts': 0, 'memory_kills': 0, 'crashes': 0,
+                       'start_failures': 0, 'respawns': 0, 'spawn_failures': 0}
+        self._missing = 0
+        self._job_ids = itertools.count(1)
+        for _ in range(max(1, workers)):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.client_kwargs)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _replace(self, worker: _Worker, reason: Optional[str]) -> None:
+        worker.kill()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+            if reason:
+                self._stats[reason] += 1
+            self._stats['respawns'] += 1
+        self._restore()
+
+    def _restore(self) -> None:
+        """Start a worker in place of a lost one, or count it as missing."""
+        try:
+            worker = self._spawn()
+        except Exception as e:
+            print(f"Error starting sandbox worker: {str(e)}")
+            with self._lock:
+                self._missing += 1
+                self._stats['spawn_failures'] += 1
+            return
+        self._idle.put(worker)
+
+    def execute(self, code: str, on_output: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Run code in a worker process.
+
+        Args:
+            code: Python code string to execute
+            on_output: Called with each printed line as it arrives
+
+        Returns:
+            Same dictionary as OdooClient.execute_code()
+        """
+        # Retry workers that could not be started, so the pool does not shrink for good
+        with self._lock:
+            missing, self._missing = self._missing, 0
+        for _ in range(missing):
+            self._restore()
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            return self._failure([], f'No sandbox worker became free within {self.timeout:g} seconds')
+        try:
+            worker.wait_ready(self.timeout)
+        except Exception as e:
+            # A late 'ready' would otherwise be read as this job's result
+            self._replace(worker, 'start_failures')
+            return self._failure([], f'Sandbox worker unavailable: {str(e)}')
+        with self._lock:
+            self._stats['jobs'] += 1
+            job_id = next(self._job_ids)
+
+        try:
+            worker.conn.send((job_id, code, on_output is not None))
+        except (OSError, ValueError) as e:
+            self._replace(worker, 'crashes')
+            return {'text_output': '', 'data': None, 'error': f'Sandbox worker unavailable: {str(e)}'}
+
+        deadline = time.monotonic() + self.timeout
+        lines: List[str] = []
+        while True:
+            message = None
+            try:
+                if worker.conn.poll(_POLL_INTERVAL):
+                    message = worker.conn.recv()
+                    kind, message_job_id, payload = message
+            except (EOFError, OSError):
+                self._replace(worker, 'crashes')
+                return self._failure(lines, 'Execution process crashed')
+            except Exception as e:
+                # Undecodable or malformed message: the pipe can no longer be trusted
+                self._replace(worker, 'crashes')
+                return self._failure(lines, f'Sandbox worker failed: {str(e)}')
+
+            # Replies left over from start-up or an earlier job are never this job's answer
+            if message is not None and message_job_id == job_id:
+                if kind == 'line':
+                    lines.append(payload)
+                    if on_output:
+                        on_output(payload)
+                    continue
+                if kind != 'result' or not isinstance(payload, dict):
+                    self._replace(worker, 'crashes')
+                    return self._failure(lines, f"Sandbox worker sent an unexpected '{kind}' message")
+                worker.jobs += 1
+                if self.max_jobs and worker.jobs >= self.max_jobs:
+                    self._replace(worker, None)
+                else:
+                    self._idle.put(worker)
+                replay(payload.pop('stage_events', []))
+                return payload
+
+            if time.monotonic() > deadline:
+                self._replace(worker, 'timeouts')
+                return self._failure(lines, f'Execution timed out after {self.timeout:g} seconds')
+
+            if self.max_rss:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.max_rss:
+                    self._replace(worker, 'memory_kills')
+                    return self._failure(
+                        lines, f'Execution exceeded the {self.max_rss // (1024 * 1024)} MB memory limit'
+                    )
+
+    @staticmethod
+    def _failure(lines: List[str], error: str) -> Dict[str, Any]:
+        return {
+            'text_output': '\n'.join(lines) + ('\n' if lines else ''),
+            'data': None,
+            'error': error
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get sandbox counters.
+
+        Returns:
+            Dictionary with jobs, timeouts, memory_kills, crashes,
+            start_failures, respawns, spawn_failures, workers and idle
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['workers'] = len(self._all)
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+    def shutdown(self) -> None:
+        """Stop all worker processes."""
+        with self._lock:
+            workers = list(self._all)
+            self._all.clear()
+        for worker in workers:
+            worker.stop()
+
+
+_sandbox_pool: Optional[SandboxPool] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> Optional[SandboxPool]:
+    """
+    Get the shared sandbox pool, if enabled with SANDBOX_ENABLED=1.
+
+    Returns:
+        SandboxPool instance, or None when code runs in-process
+    """
+    global _sandbox_pool
+    if not SANDBOX_ENABLED:
+        return None
+    with _sandbox_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool()
+        return _sandbox_pool
+
+
+def shutdown_sandbox_pool() -> None:
+    """Stop the shared sandbox pool if it was started."""
+    global _sandbox_pool
+    with _sandbox_lock:
+        if _sandbox_pool is not None:
+            _sandbox_pool.shutdown()
+            _sandbox_pool = None
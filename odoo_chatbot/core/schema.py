@@ -0,0 +1,374 @@
+"""
+Odoo model and field metadata, cached on disk and matched to questions for the prompt.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from .cassette import get_cassette
+from .metrics import stage
+
+# Load environment variables
+load_dotenv(override=True)
+
+SCHEMA_REGISTRY_ENABLED = os.getenv('SCHEMA_REGISTRY', '1').lower() in ('1', 'true', 'yes')
+SCHEMA_CACHE_PATH = os.getenv(
+    'SCHEMA_CACHE_PATH',
+    os.path.join(os.path.dirname(__file__), '..', '..', 'odoo_schema.json')
+)
+SCHEMA_REFRESH_SECONDS = float(os.getenv('SCHEMA_REFRESH_SECONDS', '3600'))
+SCHEMA_RETRY_SECONDS = float(os.getenv('SCHEMA_RETRY_SECONDS', '60'))
+SCHEMA_PROMPT_MODELS = int(os.getenv('SCHEMA_PROMPT_MODELS', '3'))
+SCHEMA_PROMPT_FIELDS = int(os.getenv('SCHEMA_PROMPT_FIELDS', '40'))
+
+SNAPSHOT_VERSION = 1
+FIELD_ATTRIBUTES = ['string', 'type', 'relation', 'selection', 'store', 'required']
+
+# Everyday words for models whose technical names do not contain them
+SYNONYMS = {
+    'customer': ['res.partner'], 'client': ['res.partner'], 'contact': ['res.partner'],
+    'vendor': ['res.partner'], 'supplier': ['res.partner'], 'partner': ['res.partner'],
+    'sale': ['sale.order'], 'quotation': ['sale.order'], 'order': ['sale.order'], 'revenue': ['sale.order'],
+    'invoice': ['account.move'], 'bill': ['account.move'], 'refund': ['account.move'],
+    'payment': ['account.move', 'account.payment'], 'receivable': ['account.move'],
+    'product': ['product.product'], 'item': ['product.product'], 'article': ['product.product'],
+    'purchase': ['purchase.order'], 'employee': ['hr.employee'], 'staff': ['hr.employee'],
+    'stock': ['stock.quant'], 'inventory': ['stock.quant'], 'warehouse': ['stock.warehouse'],
+    'delivery': ['stock.picking'], 'shipment': ['stock.picking'], 'transfer': ['stock.picking'],
+    'lead': ['crm.lead'], 'opportunity': ['crm.lead'], 'pipeline': ['crm.lead'],
+    'task': ['project.task'], 'project': ['project.project'], 'user': ['res.users'],
+    'salesperson': ['res.users'], 'country': ['res.country'], 'company': ['res.company'],
+}
+
+_STOP_WORDS = {
+    'the', 'and', 'for', 'with', 'show', 'list', 'get', 'how', 'many', 'much', 'what', 'which',
+    'who', 'all', 'our', 'per', 'each', 'from', 'this', 'last', 'that', 'are', 'have', 'has',
+    'total', 'count', 'number', 'top', 'by', 'in', 'of', 'me', 'do', 'we', 'res', 'ir'
+}
+# Technical models that are never what a business question is about
+_SKIPPED_PREFIXES = ('ir.', 'base.', 'bus.', 'res.config', 'web.', 'mail.', 'report.', '_')
+_SKIPPED_FIELD_PREFIXES = ('message_', 'activity_', 'website_message', '__')
+_TYPE_ABBREVIATIONS = {'many2one': 'm2o', 'one2many': 'o2m', 'many2many': 'm2m'}
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def keywords(text: str) -> List[str]:
+    """
+    Split text into stemmed, lowercase words without stop words.
+
+    Args:
+        text: Question, model name or model description
+
+    Returns:
+        Keywords in order of appearance
+    """
+    words = re.findall(r'[a-z][a-z0-9]+', text.lower().replace('_', ' ').replace('.', ' '))
+    return [_stem(word) for word in words if word not in _STOP_WORDS]
+
+
+def _compact_field(description: Dict[str, Any]) -> Dict[str, Any]:
+    field = {'type': description.get('type')}
+    if description.get('relation'):
+        field['relation'] = description['relation']
+    if isinstance(description.get('selection'), list):
+        field['selection'] = [str(option[0]) for option in description['selection'][:8]]
+    if description.get('store') is False:
+        field['store'] = False
+    if description.get('required'):
+        field['required'] = True
+    return field
+
+
+def format_field(name: str, field: Dict[str, Any]) -> str:
+    """
+    Render one field as e.g. 'partner_id:m2o(res.partner)' or 'state:selection(draft|sale)'.
+
+    Args:
+        name: Field name
+        field: Compact description from the registry
+
+    Returns:
+        Field summary for the prompt
+    """
+    kind = _TYPE_ABBREVIATIONS.get(field['type'], field['type'])
+    if field.get('relation'):
+        return f"{name}:{kind}({field['relation']})"
+    if field.get('selection'):
+        return f"{name}:{kind}({'|'.join(field['selection'])})"
+    return f"{name}:{kind}"
+
+
+def _field_priority(item: Tuple[str, Dict[str, Any]]) -> tuple:
+    name, field = item
+    # Stored fields can be filtered on; name/required/relational fields are the ones queries use most
+    return (field.get('store') is False, name not in ('id', 'name', 'display_name'),
+            not field.get('required'), 'relation' not in field, name)
+
+
+class SchemaRegistry:
+    """
+    Model list and per-model field lists of one Odoo database.
+
+    The model list (ir.model) is read once; fields_get runs the first time a
+    model is relevant to a question. Everything is kept in a JSON snapshot, so
+    restarts cost no calls, and refreshed incrementally: models whose fields
+    changed since the last check (ir.model.fields write_date) are re-read.
+
+    Odoo calls run without holding the registry lock; concurrent questions
+    needing the same refresh or model wait for the one call in flight. After
+    a failed call, Odoo is left alone for retry_seconds and questions are
+    described from what is already known.
+    """
+
+    def __init__(self, path: Optional[str] = SCHEMA_CACHE_PATH, refresh_seconds: float = SCHEMA_REFRESH_SECONDS,
+                 prompt_models: int = SCHEMA_PROMPT_MODELS, prompt_fields: int = SCHEMA_PROMPT_FIELDS,
+                 url: Optional[str] = None, db: Optional[str] = None,
+                 retry_seconds: float = SCHEMA_RETRY_SECONDS):
+        """
+        Initialize the registry and load its snapshot, if one matches.
+
+        Args:
+            path: Snapshot file (None = keep the schema in memory only)
+            refresh_seconds: Minimum seconds between incremental refreshes
+            prompt_models: Models described per prompt
+            prompt_fields: Fields listed per model
+            url: Odoo instance URL the snapshot belongs to (defaults to ODOO_URL)
+            db: Database name the snapshot belongs to (defaults to ODOO_DB)
+            retry_seconds: Seconds to wait after a failed Odoo call before trying again
+        """
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.prompt_models = prompt_models
+        self.prompt_fields = prompt_fields
+        self.retry_seconds = retry_seconds
+        self.source = {'url': url or os.getenv('ODOO_URL'), 'db': db or os.getenv('ODOO_DB')}
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.synced_at: Optional[str] = None
+        self.checked_at = 0.0
+        self.retry_at = 0.0
+        self._lock = threading.RLock()
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError) as e:
+            print(f"Error reading schema snapshot: {e}")
+            return
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('source') != self.source:
+            return
+        self.models = snapshot.get('models', {})
+        self.synced_at = snapshot.get('synced_at')
+        self.checked_at = snapshot.get('checked_at', 0.0)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'source': self.source,
+            'synced_at': self.synced_at,
+            'checked_at': self.checked_at,
+            'models': self.models
+        }
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error writing schema snapshot: {e}")
+
+    def refresh(self, odoo) -> None:
+        """
+        Bring the model list up to date and forget field lists that changed.
+
+        Args:
+            odoo: Authenticated OdooClient
+        """
+        with stage('schema_refresh'):
+            # Field changes are looked up from just before this refresh, in server (UTC) time
+            started = (datetime.now(timezone.utc) - timedelta(seconds=5)).strftime('%Y-%m-%d %H:%M:%S')
+            with self._lock:
+                since = self.synced_at
+            rows = odoo.search_read('ir.model', [], ['model', 'name', 'transient'])
+            stale = None
+            if since:
+                try:
+                    changed = odoo.search_read('ir.model.fields', [('write_date', '>', since)], ['model'])
+                    stale = {row['model'] for row in changed}
+                except Exception:
+                    # No access to ir.model.fields: re-read every field list lazily
+                    stale = None
+
+        with self._lock:
+            known = self.models
+            self.models = {}
+            for row in rows:
+                if row.get('transient') or row['model'].startswith(_SKIPPED_PREFIXES):
+                    continue
+                entry = known.get(row['model'], {})
+                entry['name'] = row.get('name') or row['model']
+                self.models[row['model']] = entry
+            if since:
+                for model in (set(self.models) if stale is None else stale & set(self.models)):
+                    self.models[model].pop('fields', None)
+            self.synced_at = started
+            self.checked_at = time.time()
+            self._save()
+
+    def fields(self, odoo, model: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get a model's compact field descriptions, reading them from Odoo if needed.
+
+        Args:
+            odoo: Authenticated OdooClient
+            model: Odoo model name
+
+        Returns:
+            Field name to description ('type' plus 'relation', 'selection', ...)
+        """
+        with self._lock:
+            entry = self.models.get(model)
+            if entry is not None and 'fields' in entry:
+                return entry['fields']
+        with stage('schema_fields'):
+            described = odoo.execute_kw(model, 'fields_get', [], {'attributes': FIELD_ATTRIBUTES})
+        fields = {
+            name: _compact_field(description) for name, description in described.items()
+            if not name.startswith(_SKIPPED_FIELD_PREFIXES) and description.get('type') != 'binary'
+        }
+        with self._lock:
+            self.models.setdefault(model, {'name': model})['fields'] = fields
+            self._save()
+        return fields
+
+    def _once(self, key: str, work: Callable[[], Any]) -> None:
+        """Run work(), or wait for the thread already running the work for this key."""
+        with self._lock:
+            pending = self._in_flight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._in_flight[key] = threading.Event()
+        if not owner:
+            pending.wait()
+            return
+        try:
+            work()
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.set()
+
+    def match(self, question: str) -> List[str]:
+        """
+        Pick the models a question is most likely about.
+
+        Args:
+            question: Natural language question
+
+        Returns:
+            Up to prompt_models model names, best match first
+        """
+        words = set(keywords(question))
+        scores: Dict[str, float] = {}
+        with self._lock:
+            models = dict(self.models)
+        for word in words:
+            for model in SYNONYMS.get(word, []):
+                if model in models:
+                    scores[model] = scores.get(model, 0) + 3
+        for model, entry in models.items():
+            technical = set(keywords(model))
+            described = set(keywords(entry.get('name', '')))
+            score = 2 * len(words & technical) + len(words & (described - technical))
+            if score:
+                # Shorter names win ties, so 'sale.order' beats 'sale.order.line'
+                scores[model] = scores.get(model, 0) + score - len(model) / 1000
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [model for model, score in ranked if score > 0][:self.prompt_models]
+
+    def describe(self, pool, question: str) -> str:
+        """
+        Describe the models relevant to a question, one line per model.
+
+        Odoo is only contacted when the snapshot is due for a refresh or a
+        matched model's fields have not been read yet.
+
+        Args:
+            pool: OdooClientPool to borrow a client from when needed
+            question: Natural language question
+
+        Returns:
+            Lines like '- sale.order "Sales Order": name:char, partner_id:m2o(res.partner), ...',
+            or an empty string when nothing matches
+        """
+        with self._lock:
+            now = time.time()
+            due = not self.models or now - self.checked_at > self.refresh_seconds
+            cold = due or any('fields' not in self.models[model] for model in self.match(question))
+            backing_off = now < self.retry_at
+        if cold and not backing_off:
+            try:
+                with pool.client() as odoo:
+                    if due:
+                        self._once('', lambda: self.refresh(odoo))
+                    for model in self.match(question):
+                        self._once(model, lambda model=model: self.fields(odoo, model))
+            except Exception:
+                with self._lock:
+                    self.retry_at = time.time() + self.retry_seconds
+                raise
+
+        lines = []
+        with self._lock:
+            for model in self.match(question):
+                entry = self.models.get(model, {})
+                if 'fields' not in entry:
+                    # Another thread's read of this model failed
+                    continue
+                fields = sorted(entry['fields'].items(), key=_field_priority)
+                listed = ', '.join(format_field(name, field) for name, field in fields[:self.prompt_fields])
+                more = f", ... ({len(fields) - self.prompt_fields} more)" if len(fields) > self.prompt_fields else ''
+                lines.append(f"- {model} \"{entry['name']}\": {listed}{more}")
+        return "\n".join(lines)
+
+
+_registry: Optional[SchemaRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry() -> Optional[SchemaRegistry]:
+    """
+    Get the process-wide registry, if enabled with SCHEMA_REGISTRY=1.
+
+    Returns:
+        Shared SchemaRegistry instance, or None when disabled
+    """
+    global _registry
+    if not SCHEMA_REGISTRY_ENABLED:
+        return None
+    with _registry_lock:
+        if _registry is None:
+            if get_cassette() is not None:
+                # Recording and replaying must make the same schema calls: no snapshot, no timed refresh
+                _registry = SchemaRegistry(path=None, refresh_seconds=float('inf'))
+            else:
+                _registry = SchemaRegistry()
+        return _registry
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+XML-RPC call tracing for one execution of generated code, with N+1 detection.
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+TRACE_ENABLED = os.getenv('ODOO_TRACE', '0').lower() in ('1', 'true', 'yes')
+TRACE_TOP_SHAPES = int(os.getenv('ODOO_TRACE_TOP_SHAPES', '10'))
+N_PLUS_ONE_THRESHOLD = int(os.getenv('ODOO_TRACE_N_PLUS_ONE', '5'))
+
+# Methods whose first positional argument is a domain
+_DOMAIN_METHODS = ('search_read', 'search', 'search_count', 'read_group')
+
+
+def _shape(value: Any) -> str:
+    """Render a domain or id list with its values replaced by '?'."""
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return '[]'
+        if len(value) == 3 and isinstance(value[0], str) and isinstance(value[1], str):
+            return f"('{value[0]}', '{value[1]}', ?)"
+        if all(isinstance(item, (list, tuple, str)) for item in value):
+            return '[' + ', '.join(f"'{item}'" if isinstance(item, str) else _shape(item) for item in value) + ']'
+        return '[?]'
+    return '?'
+
+
+def _single_id(method: str, args: List) -> bool:
+    """Whether a call targets one record: read([id]) or a domain pinned to one id."""
+    if not args:
+        return False
+    first = args[0]
+    if method not in _DOMAIN_METHODS:
+        return isinstance(first, int) or (isinstance(first, (list, tuple)) and len(first) == 1)
+    for leaf in first if isinstance(first, (list, tuple)) else []:
+        if isinstance(leaf, (list, tuple)) and len(leaf) == 3:
+            operator, value = leaf[1], leaf[2]
+            if operator == '=' and isinstance(value, int) and not isinstance(value, bool):
+                return True
+            if operator == 'in' and isinstance(value, (list, tuple)) and len(value) == 1:
+                return True
+    return False
+
+
+class CallTracer:
+    """
+    Aggregate every execute_kw call of one execution by query shape.
+
+    A shape is the model, method and domain with its values masked, so a
+    loop issuing the same query for hundreds of ids collapses to one row.
+    """
+
+    def __init__(self, top_shapes: int = TRACE_TOP_SHAPES,
+                 n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        """
+        Initialize the tracer.
+
+        Args:
+            top_shapes: Number of shapes kept in the summary, slowest first
+            n_plus_one_threshold: Single-id calls of one shape that count as N+1
+        """
+        self.top_shapes = top_shapes
+        self.n_plus_one_threshold = max(2, n_plus_one_threshold)
+        self._shapes: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, method: str, args: List, kwargs: Dict[str, Any],
+               result: Any, seconds: float, response_bytes: int, error: Optional[str] = None) -> None:
+        """
+        Record one execute_kw call.
+
+        Args:
+            model: The Odoo model name
+            method: The model method called
+            args: Positional arguments of the call
+            kwargs: Keyword arguments of the call
+            result: Raw result, or None if the call failed
+            seconds: Wall-clock duration
+            response_bytes: Bytes received on the wire
+            error: Error message if the call failed
+        """
+        domain = _shape(args[0]) if args and method in _DOMAIN_METHODS else ('[?]' if args else '')
+        key = (model, method, domain)
+        records = len(result) if isinstance(result, list) else 0
+        with self._lock:
+            shape = self._shapes.get(key)
+            if shape is None:
+                shape = self._shapes[key] = {
+                    'model': model,
+                    'method': method,
+                    'domain': domain,
+                    'fields': len(kwargs.get('fields') or []),
+                    'calls': 0,
+                    'single_id_calls': 0,
+                    'records': 0,
+                    'response_bytes': 0,
+                    'duration_ms': 0.0,
+                    'max_ms': 0.0,
+                    'errors': 0
+                }
+            shape['calls'] += 1
+            shape['single_id_calls'] += _single_id(method, args)
+            shape['records'] += records
+            shape['response_bytes'] += response_bytes
+            shape['duration_ms'] += seconds * 1000
+            shape['max_ms'] = max(shape['max_ms'], seconds * 1000)
+            shape['errors'] += error is not None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get a compact summary suitable for storing with a chat message.
+
+        Returns:
+            Dictionary with totals, the slowest shapes and suspected N+1 shapes
+        """
+        with self._lock:
+            shapes = [dict(shape) for shape in self._shapes.values()]
+        for shape in shapes:
+            shape['duration_ms'] = round(shape['duration_ms'], 1)
+            shape['max_ms'] = round(shape['max_ms'], 1)
+        shapes.sort(key=lambda shape: shape['duration_ms'], reverse=True)
+        return {
+            'calls': sum(shape['calls'] for shape in shapes),
+            'records': sum(shape['records'] for shape in shapes),
+            'response_bytes': sum(shape['response_bytes'] for shape in shapes),
+            'duration_ms': round(sum(shape['duration_ms'] for shape in shapes), 1),
+            'errors': sum(shape['errors'] for shape in shapes),
+            'shapes': shapes[:self.top_shapes],
+            'other_shapes': max(0, len(shapes) - self.top_shapes),
+            'n_plus_one': [
+                {key: shape[key] for key in ('model', 'method', 'domain', 'single_id_calls', 'duration_ms')}
+                for shape in shapes
+                if shape['single_id_calls'] >= self.n_plus_one_threshold
+            ]
+        }
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Keep-alive, gzip-aware XML-RPC transports with per-call byte counters.
+"""
+
+import os
+import threading
+import time
+import xmlrpc.client
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(override=True)
+
+DEFAULT_TIMEOUT = float(os.getenv('ODOO_TIMEOUT', '120'))
+# Odoo does not decompress request bodies on its own, so request gzip is opt-in
+_gzip_threshold = os.getenv('ODOO_GZIP_THRESHOLD')
+DEFAULT_GZIP_THRESHOLD = int(_gzip_threshold) if _gzip_threshold else None
+
+
+class _CountingReader:
+    """File-like wrapper that counts the raw bytes read from a response."""
+
+    def __init__(self, response):
+        self._response = response
+        self.bytes_read = 0
+
+    def read(self, *args) -> bytes:
+        data = self._response.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+
+class _TransportMixin:
+    """
+    Shared behaviour for the HTTP and HTTPS transports.
+
+    The underlying xmlrpc.client transports already reuse one HTTP/1.1
+    connection per host; this adds a socket timeout, optional gzip request
+    bodies and byte accounting for every call.
+    """
+
+    def _setup(self, timeout: Optional[float], gzip_threshold: Optional[int]) -> None:
+        self.timeout = timeout
+        # xmlrpc.client gzips request bodies larger than this many bytes
+        self.encode_threshold = gzip_threshold
+        self._stats_lock = threading.Lock()
+        self.last_call: Dict[str, Any] = {}
+        self.totals: Dict[str, Any] = {
+            'calls': 0,
+            'request_bytes': 0,
+            'response_bytes': 0,
+            'decoded_bytes': 0,
+            'seconds': 0.0
+        }
+
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = self.timeout
+        return connection
+
+    def request(self, host, handler, request_body, verbose=False):
+        self._call = {
+            'request_bytes': 0,
+            'response_bytes': 0,
+            'decoded_bytes': 0,
+            'seconds': 0.0
+        }
+        start = time.perf_counter()
+        try:
+            return super().request(host, handler, request_body, verbose)
+        finally:
+            self._call['seconds'] = time.perf_counter() - start
+            self._record(self._call)
+
+    def send_content(self, connection, request_body):
+        # request_body is already gzip-encoded here when above the threshold
+        self._call['request_bytes'] = len(request_body)
+        super().send_content(connection, request_body)
+
+    def parse_response(self, response):
+        raw = _CountingReader(response)
+        if response.getheader("Content-Encoding", "") == "gzip":
+            stream = xmlrpc.client.GzipDecodedResponse(raw)
+        else:
+            stream = raw
+
+        parser, unmarshaller = self.getparser()
+        decoded = 0
+        while True:
+            data = stream.read(1024)
+            if not data:
+                break
+            decoded += len(data)
+            parser.feed(data)
+
+        if stream is not raw:
+            stream.close()
+        parser.close()
+
+        self._call['response_bytes'] = raw.bytes_read
+        self._call['decoded_bytes'] = decoded
+        return unmarshaller.close()
+
+    def _record(self, call: Dict[str, Any]) -> None:
+        with self._stats_lock:
+            self.last_call = dict(call)
+            self.totals['calls'] += 1
+            for key in ('request_bytes', 'response_bytes', 'decoded_bytes', 'seconds'):
+                self.totals[key] += call[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get byte and timing counters for this transport.
+
+        Returns:
+            Dictionary with 'last_call' and cumulative 'totals'
+        """
+        with self._stats_lock:
+            return {'last_call': dict(self.last_call), 'totals': dict(self.totals)}
+
+
+class OdooTransport(_TransportMixin, xmlrpc.client.Transport):
+    """Persistent HTTP transport for Odoo XML-RPC endpoints."""
+
+    def __init__(self, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 gzip_threshold: Optional[int] = DEFAULT_GZIP_THRESHOLD):
+        super().__init__()
+        self._setup(timeout, gzip_threshold)
+
+
+class OdooSafeTransport(_TransportMixin, xmlrpc.client.SafeTransport):
+    """Persistent HTTPS transport for Odoo XML-RPC endpoints."""
+
+    def __init__(self, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 gzip_threshold: Optional[int] = DEFAULT_GZIP_THRESHOLD):
+        super().__init__()
+        self._setup(timeout, gzip_threshold)
+
+
+def make_transport(url: str, timeout: Optional[float] = DEFAULT_TIMEOUT,
+                   gzip_threshold: Optional[int] = DEFAULT_GZIP_THRESHOLD) -> xmlrpc.client.Transport:
+    """
+    Build the right transport for an Odoo URL.
+
+    Args:
+        url: Odoo endpoint URL
+        timeout: Socket timeout in seconds (None = no timeout)
+        gzip_threshold: Gzip request bodies larger than this (None = never)
+
+    Returns:
+        An OdooTransport or OdooSafeTransport instance
+    """
+    if urlparse(url).scheme == 'https':
+        return OdooSafeTransport(timeout, gzip_threshold)
+    return OdooTransport(timeout, gzip_threshold)
@@ -11,6 +11,10 @@ if 'session_id' not in st.session_state:
     st.session_state.session_id = None
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
+if 'server_history' not in st.session_state:
+    st.session_state.server_history = []
+if 'history_etag' not in st.session_state:
+    st.session_state.history_etag = None
 
 def create_new_session():
     """Create a new chat session"""
@@ -20,6 +24,8 @@ def create_new_session():
             data = response.json()
             st.session_state.session_id = data['session_id']
             st.session_state.chat_history = []
+            st.session_state.server_history = []
+            st.session_state.history_etag = None
             return True, data['message']
         else:
             return False, f"Error: {response.status_code}"
@@ -48,13 +54,79 @@ def send_message(question):
     except requests.exceptions.RequestException as e:
         return False, f"Connection error: {str(e)}"
 
+def stream_message(question, placeholder):
+    """Send a message through the streaming endpoint, showing progress as it arrives"""
+    if not st.session_state.session_id:
+        return False, "No active session. Please create a new session first."
+    
+    payload = {
+        "session_id": st.session_state.session_id,
+        "question": question
+    }
+    generated = ""
+    output_lines = []
+    try:
+        with requests.post(f"{API_BASE_URL}/chat/stream", json=payload, stream=True) as response:
+            if response.status_code != 200:
+                return False, f"Error: {response.status_code} - {response.text}"
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    if event == "token":
+                        generated += data['text']
+                        placeholder.code(generated, language='python')
+                    elif event == "code":
+                        generated = data['code']
+                        placeholder.code(generated, language='python')
+                    elif event == "stdout":
+                        output_lines.append(data['line'])
+                        placeholder.code(generated + "\n\n# Output:\n# " + "\n# ".join(output_lines), language='python')
+                    elif event == "done":
+                        return True, data
+                    elif event == "error":
+                        return False, data['detail']
+        return False, "Stream ended before the answer was complete"
+    except requests.exceptions.RequestException as e:
+        return False, f"Connection error: {str(e)}"
+
 def get_chat_history():
-    """Get chat history for current session"""
+    """Get chat history for current session
+    
+    Only messages newer than the last stored one are downloaded; returns
+    (True, None) when the server reports nothing changed.
+    """
     if not st.session_state.session_id:
         return False, "No active session"
     
+    stored_ids = [chat['id'] for chat in st.session_state.server_history if chat.get('id')]
+    params = {"after_id": max(stored_ids)} if stored_ids else {}
+    headers = {"If-None-Match": st.session_state.history_etag} if st.session_state.history_etag else {}
+    try:
+        response = requests.get(
+            f"{API_BASE_URL}/session/{st.session_state.session_id}/history",
+            params=params,
+            headers=headers
+        )
+        if response.status_code == 304:
+            return True, None
+        if response.status_code == 200:
+            st.session_state.history_etag = response.headers.get("ETag")
+            return True, response.json()
+        else:
+            return False, f"Error: {response.status_code}"
+    except requests.exceptions.RequestException as e:
+        return False, f"Connection error: {str(e)}"
+
+def get_message_result(message_uid, limit=100):
+    """Get the first page of a message's stored result data"""
     try:
-        response = requests.get(f"{API_BASE_URL}/session/{st.session_state.session_id}/history")
+        response = requests.get(
+            f"{API_BASE_URL}/session/{st.session_state.session_id}/messages/{message_uid}/result",
+            params={"limit": limit}
+        )
         if response.status_code == 200:
             return True, response.json()
         else:
@@ -62,6 +134,19 @@ def get_chat_history():
     except requests.exceptions.RequestException as e:
         return False, f"Connection error: {str(e)}"
 
+def rerun_message(message_uid):
+    """Re-run a message's stored code against fresh Odoo data"""
+    try:
+        response = requests.post(
+            f"{API_BASE_URL}/session/{st.session_state.session_id}/messages/{message_uid}/rerun"
+        )
+        if response.status_code == 200:
+            return True, response.json()
+        else:
+            return False, f"Error: {response.status_code} - {response.text}"
+    except requests.exceptions.RequestException as e:
+        return False, f"Connection error: {str(e)}"
+
 def check_api_status():
     """Check if the API is running"""
     try:
@@ -110,8 +195,15 @@ with st.sidebar:
     # Refresh history button
     if st.button("🔄 Refresh History") and st.session_state.session_id:
         success, data = get_chat_history()
-        if success:
-            st.session_state.chat_history = data.get('history', [])
+        if success and data is None:
+            st.success("History is up to date")
+        elif success:
+            new_messages = data.get('history', [])
+            st.session_state.server_history.extend(chat for chat in new_messages if chat.get('id'))
+            # Messages still queued on the server have no id yet
+            st.session_state.chat_history = st.session_state.server_history + [
+                chat for chat in new_messages if not chat.get('id')
+            ]
             st.success("History refreshed!")
         else:
             st.error(f"Failed to refresh: {data}")
@@ -136,14 +228,12 @@ with col1:
                 st.error("Please create a new session first!")
             else:
                 with st.spinner("Generating code..."):
-                    success, response = send_message(question)
+                    success, response = stream_message(question, st.empty())
                     if success:
                         # Add to local history
-                        st.session_state.chat_history.append({
-                            'question': question,
-                            'answer': response['answer'],
-                            'created_at': datetime.now().isoformat()
-                        })
+                        st.session_state.chat_history.append(
+                            dict(response, question=question, created_at=datetime.now().isoformat())
+                        )
                         st.success("Message sent!")
                         st.rerun()
                     else:
@@ -168,11 +258,9 @@ with col2:
                 with st.spinner("Processing..."):
                     success, response = send_message(example)
                     if success:
-                        st.session_state.chat_history.append({
-                            'question': example,
-                            'answer': response['answer'],
-                            'created_at': datetime.now().isoformat()
-                        })
+                        st.session_state.chat_history.append(
+                            dict(response, question=example, created_at=datetime.now().isoformat())
+                        )
                         st.rerun()
             else:
                 st.error("Please create a session first!")
@@ -185,9 +273,61 @@ if st.session_state.chat_history:
         with st.container():
             st.markdown(f"**Q{len(st.session_state.chat_history)-i}:** {chat['question']}")
             
-            # Parse and display the formatted response
             answer = chat['answer']
-            if "📝 Generated Code:" in answer and "🔍 Execution Results:" in answer:
+            if chat.get('success') is not None:
+                # Structured result fields
+                if not chat['success']:
+                    st.error(f"❌ Execution Error: {chat.get('error')}")
+                st.subheader("📝 Generated Code")
+                st.code(chat.get('code') or '', language='python')
+                
+                if chat['success']:
+                    st.subheader("🔍 Execution Results")
+                    if (chat.get('stdout') or '').strip():
+                        st.text(chat['stdout'])
+                    else:
+                        st.info("Code executed successfully (no output)")
+                    
+                    record_count = chat.get('record_count')
+                    st.info(f"📊 {record_count if record_count is not None else 'N/A'} records")
+                    
+                    if chat.get('error'):
+                        st.warning(f"⚠️ {chat['error']}")
+                    
+                    if (chat.get('result_snapshot') or chat.get('has_result')) and chat.get('message_uid'):
+                        if st.button("📋 Show stored data", key=f"result_{chat['message_uid']}"):
+                            success, page = get_message_result(chat['message_uid'])
+                            if success:
+                                st.dataframe(page['rows'])
+                                if page['has_more']:
+                                    st.caption(f"First {len(page['rows'])} of {page['row_count']} rows")
+                            else:
+                                st.error(f"Failed to load data: {page}")
+                
+                if chat.get('code') and chat.get('message_uid'):
+                    if st.button("🔁 Re-run with fresh data", key=f"rerun_{chat['message_uid']}"):
+                        with st.spinner("Re-running stored code..."):
+                            success, response = rerun_message(chat['message_uid'])
+                        if success:
+                            st.session_state.chat_history.append(
+                                dict(response, created_at=datetime.now().isoformat())
+                            )
+                            st.rerun()
+                        else:
+                            st.error(f"Failed to re-run: {response}")
+                
+                trace = chat.get('trace')
+                for suspect in (trace or {}).get('n_plus_one', []):
+                    st.warning(f"🐢 N+1 query: {suspect['single_id_calls']} single-record "
+                               f"{suspect['method']} calls on {suspect['model']} "
+                               f"({suspect['duration_ms']:.0f} ms)")
+                
+                timings = chat.get('timings')
+                if timings:
+                    cached = " (cached code)" if chat.get('code_cached') else ""
+                    st.caption(f"⏱️ generate {timings['generate_ms']:.0f} ms{cached}, "
+                               f"execute {timings['execute_ms']:.0f} ms · {chat.get('llm_model')}")
+            elif "📝 Generated Code:" in answer and "🔍 Execution Results:" in answer:
                 # Split into sections
                 parts = answer.split("🔍 Execution Results:")
                 if len(parts) >= 2:
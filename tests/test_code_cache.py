@@ -0,0 +1,17 @@
+from odoo_chatbot.core.code_cache import normalize_question
+
+
+def test_synonymous_phrasings_share_a_key():
+    assert normalize_question("Sales for the previous month?") == normalize_question("sales for last month")
+    assert normalize_question("Invoices in the past 7 days") == normalize_question("invoices in the last 7 day")
+    assert normalize_question("Orders of the current week") == normalize_question("orders of this week")
+    assert normalize_question("Orders on Jan 5, 2024") == normalize_question("orders on 2024/01/05")
+
+
+def test_different_date_ranges_get_different_keys():
+    # A rolling 24 hours is not the previous calendar day
+    assert normalize_question("sales in the past day") != normalize_question("sales yesterday")
+    # The last 7 days is not the previous calendar week
+    assert normalize_question("sales in the last week") != normalize_question("sales last week")
+    assert normalize_question("sales over the last month") != normalize_question("sales last month")
+    assert normalize_question("orders from the last days") != normalize_question("orders from the last day")